@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for scholar_crawler.py against mock_s2_server.py.
+
+Starts the mock API in a subprocess, generates a search plan from its
+fixture (or uses --input), runs the crawler's main() in a child process
+pointed at the mock with --api-base, and reports directives/s,
+requests/s, wall time and the crawler's peak RSS. Everything is seeded,
+so the same arguments give the same request stream.
+
+Arguments after `--` are passed to the crawler unchanged. With
+--local-dataset the fixture is also written as dataset shards, ingested
+once (timed) and every run uses the crawler's local backend; the mock then
+only confirms that no request reaches the network.
+
+Usage:
+    python benchmark.py --seeds 5 --queries 20 --latency-ms 80 -- --concurrency 4
+    python benchmark.py --error-429 0.05 --repeat 3 --json bench.json -- --depth 2
+    python benchmark.py --papers 100000 --local-dataset -- --concurrency 4
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.request import Request, urlopen
+
+from mock_s2_server import build_synthetic_fixture, load_fixture, write_dataset_dumps
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+CRAWLER = SCRIPT_DIR / 'scholar_crawler.py'
+MOCK_SERVER = SCRIPT_DIR / 'mock_s2_server.py'
+
+
+def build_plan(fixture: Dict, num_seeds: int, num_queries: int, seed: int) -> str:
+    """Write SEED directives for the most cited fixture papers and QUERY directives from their titles."""
+    rng = random.Random(seed)
+    papers = fixture['papers']
+    lines = ['# Benchmark search plan', '']
+    number = 0
+
+    for paper in sorted(papers, key=lambda p: -(p.get('citationCount') or 0))[:num_seeds]:
+        number += 1
+        authors = paper.get('authors') or [{'name': 'Anonymous'}]
+        surname = authors[0]['name'].split()[-1]
+        title_words = ' '.join((paper.get('title') or '').split()[:4])
+        words = (paper.get('title') or 'flow').lower().split()
+        keywords = ' '.join(f'"{w}"' for w in rng.sample(words, min(2, len(words))))
+        lines.append(f'{number}. SEED: "{surname} {title_words} {paper.get("year") or ""}" | FILTER: {keywords}')
+
+    for _ in range(num_queries):
+        number += 1
+        words = (rng.choice(papers).get('title') or 'porous media').lower().split()
+        terms = rng.sample(words, min(2, len(words)))
+        lines.append(f'{number}. QUERY: ' + ' AND '.join(f'"{t}"' for t in terms))
+
+    return '\n'.join(lines) + '\n'
+
+
+def count_directives(plan_path: Path) -> int:
+    sys.path.insert(0, str(SCRIPT_DIR))
+    from search_plan import iter_directives
+    return sum(1 for _ in iter_directives([plan_path]))
+
+
+def start_mock_server(fixture_path: Path, args) -> Tuple[subprocess.Popen, str]:
+    cmd = [sys.executable, str(MOCK_SERVER), '--port', '0', '--fixture', str(fixture_path),
+           '--seed', str(args.seed), '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+           '--error-429', str(args.error_429), '--error-5xx', str(args.error_5xx),
+           '--retry-after', str(args.retry_after), '--rate-limit', str(args.server_rate_limit)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    url = proc.stdout.readline().strip()
+    if not url:
+        proc.kill()
+        raise RuntimeError("mock server did not start")
+    return proc, url
+
+
+def server_call(api_base: str, path: str, method: str = 'GET') -> Dict:
+    root = api_base.split('/graph/v1')[0]
+    request = Request(root + path, method=method, data=b'' if method == 'POST' else None)
+    with urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def run_crawler(cmd: List[str], log_path: Path) -> Tuple[int, float, Optional[float]]:
+    """Run the crawler; returns (exit code, wall seconds, peak RSS in MB or None)."""
+    peak_rss = None
+    # stderr goes to a file: a pipe nobody drains while we wait would block the crawler
+    with open(log_path, 'w', encoding='utf-8') as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=log)
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(proc.pid, 0)
+            wall = time.perf_counter() - start
+            proc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+            # ru_maxrss is KiB on Linux and bytes on macOS
+            peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+        else:
+            proc.wait()
+            wall = time.perf_counter() - start
+
+    if proc.returncode != 0:
+        tail = log_path.read_text(encoding='utf-8', errors='replace')[-2000:]
+        print(f"WARNING: crawler exited with {proc.returncode}:\n{tail}", file=sys.stderr)
+    return proc.returncode, wall, peak_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark scholar_crawler.py offline against the mock Semantic Scholar API",
+        epilog="Arguments after -- are passed to scholar_crawler.py")
+    parser.add_argument("--fixture", type=str, default=None,
+                       help="Fixture JSON for the mock server (default: synthetic)")
+    parser.add_argument("--papers", type=int, default=5000,
+                       help="Synthetic fixture size (default: 5000)")
+    parser.add_argument("--seed", type=int, default=7,
+                       help="Seed for fixture, plan and fault injection (default: 7)")
+    parser.add_argument("--input", type=str, default=None,
+                       help="Use this search plan instead of a generated one")
+    parser.add_argument("--seeds", type=int, default=5,
+                       help="SEED directives in the generated plan (default: 5)")
+    parser.add_argument("--queries", type=int, default=20,
+                       help="QUERY directives in the generated plan (default: 20)")
+    parser.add_argument("--latency-ms", type=float, default=50.0,
+                       help="Mock server latency per request in ms (default: 50)")
+    parser.add_argument("--jitter-ms", type=float, default=20.0,
+                       help="Mock server latency jitter in ms (default: 20)")
+    parser.add_argument("--error-429", type=float, default=0.0,
+                       help="Probability of injected 429 responses (default: 0)")
+    parser.add_argument("--error-5xx", type=float, default=0.0,
+                       help="Probability of injected 5xx responses (default: 0)")
+    parser.add_argument("--retry-after", type=float, default=0.2,
+                       help="Retry-After seconds for injected 429s (default: 0.2)")
+    parser.add_argument("--server-rate-limit", type=float, default=0.0,
+                       help="Mock server answers 429 above this many requests/s (default: off)")
+    parser.add_argument("--rate", type=float, default=50.0,
+                       help="Crawler request rate in requests/s, via --delay-min/--delay-max (default: 50)")
+    parser.add_argument("--adaptive", action="store_true",
+                       help="Use the crawler's adaptive rate limiter instead of --rate; the learned rate "
+                            "carries over between --repeat runs")
+    parser.add_argument("--local-dataset", action="store_true",
+                       help="Ingest the fixture as dataset shards and run the crawler with --backend local")
+    parser.add_argument("--repeat", type=int, default=1,
+                       help="Number of runs; with --with-cache later runs see a warm cache (default: 1)")
+    parser.add_argument("--with-cache", action="store_true",
+                       help="Keep the response cache and local corpus enabled (in a temp directory shared by all runs)")
+    parser.add_argument("--json", type=str, default=None,
+                       help="Also write the results to this JSON file")
+
+    argv = sys.argv[1:]
+    crawler_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, crawler_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='scholar-bench-') as tmp:
+        tmp_dir = Path(tmp)
+        fixture = load_fixture(args.fixture) if args.fixture else build_synthetic_fixture(args.papers, seed=args.seed)
+        fixture_path = tmp_dir / 'fixture.json'
+        fixture_path.write_text(json.dumps(fixture), encoding='utf-8')
+
+        if args.input:
+            plan_path = Path(args.input)
+        else:
+            plan_path = tmp_dir / 'plan.md'
+            plan_path.write_text(build_plan(fixture, args.seeds, args.queries, args.seed), encoding='utf-8')
+        
+        backend_args = []
+        ingest = None
+        if args.local_dataset:
+            dataset_dir = tmp_dir / 'dataset'
+            write_dataset_dumps(fixture, str(tmp_dir / 'dumps'))
+            returncode, wall, peak_rss = run_crawler(
+                [sys.executable, str(CRAWLER), '--ingest', str(tmp_dir / 'dumps'), '--dataset-dir', str(dataset_dir)],
+                tmp_dir / 'ingest.log')
+            ingest = {'exit_code': returncode, 'papers': len(fixture['papers']), 'wall_s': round(wall, 3),
+                      'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None}
+            print(f"ingest: {ingest['papers']} papers in {wall:.2f}s "
+                  f"({ingest['papers'] / wall:.0f} papers/s), peak RSS {ingest['peak_rss_mb']} MB")
+            backend_args = ['--backend', 'local', '--dataset-dir', str(dataset_dir)]
+        del fixture
+        directives = count_directives(plan_path)
+
+        server, api_base = start_mock_server(fixture_path, args)
+        results = []
+        try:
+            delay = 1.0 / max(args.rate, 0.001)
+            for run in range(1, args.repeat + 1):
+                server_call(api_base, '/__reset', 'POST')
+                cmd = [sys.executable, str(CRAWLER), '--input', str(plan_path), '--api-base', api_base,
+                       '--output-dir', str(tmp_dir / f'run{run}'), '--no-fallback']
+                if args.adaptive:
+                    cmd += ['--rate-state', str(tmp_dir / 'rate_state.json')]
+                else:
+                    cmd += ['--delay-min', str(delay), '--delay-max', str(delay)]
+                if args.with_cache:
+                    cmd += ['--cache-dir', str(tmp_dir / 'cache'), '--corpus-db', str(tmp_dir / 'corpus.sqlite3')]
+                else:
+                    cmd += ['--no-cache', '--no-corpus']
+                cmd += backend_args + crawler_args
+
+                returncode, wall, peak_rss = run_crawler(cmd, tmp_dir / f'run{run}.log')
+                stats = server_call(api_base, '/__stats')
+                result = {
+                    'run': run,
+                    'exit_code': returncode,
+                    'directives': directives,
+                    'wall_s': round(wall, 3),
+                    'directives_per_s': round(directives / wall, 3) if wall else None,
+                    'requests': stats['requests'],
+                    'requests_per_s': round(stats['requests'] / wall, 3) if wall else None,
+                    'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+                    'by_endpoint': stats['by_endpoint'],
+                    'by_status': stats['by_status'],
+                }
+                results.append(result)
+                rss = f"{result['peak_rss_mb']:.1f} MB" if peak_rss is not None else 'n/a'
+                print(f"run {run}: {directives} directives in {wall:.2f}s "
+                      f"({result['directives_per_s']:.2f} directives/s), {stats['requests']} requests "
+                      f"({result['requests_per_s']:.1f} req/s), peak RSS {rss}, statuses {stats['by_status']}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        report = {
+            'config': {k: v for k, v in vars(args).items() if k != 'json'},
+            'crawler_args': crawler_args,
+            'ingest': ingest,
+            'runs': results,
+        }
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"INFO: Results written to {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4999 @@
+"""
+Academic Literature Crawler - Semantic Scholar (Primary) + Google Scholar (Fallback)
+
+Crawler implementation behind scholar_crawler.py: search backends, BM25
+ranking, deduplication, caching, the run journal and the output writers.
+It lives in its own module so that its bytecode is cached between runs;
+the command line entry point is scholar_crawler.py.
+"""
+
+import sys
+import os
+import re
+import copy
+import json
+import time
+import csv
+import io
+import random
+import gzip
+import hashlib
+import heapq
+import importlib
+import importlib.util
+import mmap
+import sqlite3
+import threading
+import unicodedata
+import zlib
+from array import array
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Iterable, List, Dict, Iterator, Optional, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache
+from collections import Counter, deque
+from contextlib import contextmanager
+from itertools import chain, count, islice
+
+from search_plan import (IDS_BATCH_SIZE, SearchDirective, extract_directives_from_md,
+                         iter_directives, normalize_paper_id)
+
+
+
+class _LazyModule:
+    """
+    Stand-in for an optional heavy dependency that is imported on first
+    attribute access. `scholarly` alone pulls in selenium and takes hundreds
+    of milliseconds to import, which `--test-mode` and S2-only runs never
+    need; availability is checked up front with `find_spec`, which does not
+    execute the package.
+    """
+    
+    def __init__(self, name: str, attr: Optional[str] = None):
+        self._name = name
+        self._attr = attr
+        self._target = None
+    
+    def __getattr__(self, item):
+        if self._target is None:
+            # The first import is not the cost of whichever profiled stage happens to need it
+            with PROFILER.paused():
+                module = importlib.import_module(self._name)
+            self._target = getattr(module, self._attr) if self._attr else module
+        return getattr(self._target, item)
+
+
+def _has_module(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+REQUESTS_AVAILABLE = _has_module('requests')
+requests = _LazyModule('requests')
+
+SCHOLARLY_AVAILABLE = _has_module('scholarly')
+scholarly = _LazyModule('scholarly', 'scholarly')
+
+NUMPY_AVAILABLE = _has_module('numpy')
+np = _LazyModule('numpy')
+if not NUMPY_AVAILABLE:
+    print("WARNING: numpy not installed, BM25 falls back to keyword counting. Install with: pip install numpy", file=sys.stderr)
+
+PYARROW_AVAILABLE = _has_module('pyarrow')
+pa = _LazyModule('pyarrow')
+pq = _LazyModule('pyarrow.parquet')
+
+
+# Author strings from Google Scholar or older CSVs: "A; B", "A, B" or BibTeX-style "A and B"
+_AUTHOR_SEP_RE = re.compile(r';|\s+and\s+')
+
+
+def _split_authors(text: str) -> List[str]:
+    authors = []
+    for part in _AUTHOR_SEP_RE.split(text):
+        family, comma, given = part.partition(',')
+        words = family.split()
+        # One comma after a one-word family name (and any particles) is "Family, Given", not a list
+        if comma and ',' not in given and words and all(w in _NAME_PARTICLES for w in words[:-1]):
+            authors.append(part)
+        else:
+            authors.extend(part.split(','))
+    return [a.strip() for a in authors]
+
+
+def _intern(value) -> str:
+    return sys.intern(str(value)) if value else ''
+
+
+def _clean_abstract(abstract) -> str:
+    return ' '.join(str(abstract).split())[:500] if abstract else ''
+
+
+class Paper:
+    """
+    Compact, normalized record for one paper.
+    
+    Uses `__slots__` instead of a per-instance dict, stores authors as a tuple
+    and interns strings that repeat across large result sets (author names,
+    venue, source, directive metadata), so 100k-paper aggregations stay small.
+    Build instances with `from_s2()` / `from_gs()` rather than by hand.
+    """
+    
+    __slots__ = (
+        'paper_id', 'title', 'authors', 'year', 'abstract', 'citations', 'url',
+        'venue', 'doi', 'volume', 'issue', 'pages', 'source',
+        'seed_paper', 'filter_applied', 'sort_method', 'is_seed_source',
+        'query_group', 'bm25_score', 'relevance_score'
+    )
+    
+    def __init__(self, title: str = '', authors=(), year: int = 0, abstract: str = '',
+                 citations: int = 0, url: str = '', venue: str = '', doi: str = '',
+                 volume: str = '', issue: str = '', pages: str = '', source: str = '',
+                 seed_paper: str = '', filter_applied: str = '', sort_method: str = '',
+                 is_seed_source: bool = False, query_group: str = '',
+                 bm25_score: float = 0.0, relevance_score: float = 0.0, paper_id: str = ''):
+        if isinstance(authors, str):
+            authors = _split_authors(authors)
+        self.paper_id = paper_id or ''
+        self.title = title or ''
+        self.authors = tuple(_intern(a) for a in authors if a)
+        self.year = year or 0
+        self.abstract = abstract or ''
+        self.citations = citations or 0
+        self.url = url or ''
+        self.venue = _intern(venue)
+        self.doi = doi or ''
+        self.volume = str(volume or '')
+        self.issue = str(issue or '')
+        self.pages = str(pages or '')
+        self.source = _intern(source)
+        self.seed_paper = _intern(seed_paper)
+        self.filter_applied = _intern(filter_applied)
+        self.sort_method = _intern(sort_method)
+        self.is_seed_source = is_seed_source
+        self.query_group = _intern(query_group)
+        self.bm25_score = bm25_score
+        self.relevance_score = relevance_score
+    
+    @classmethod
+    def from_s2(cls, item: Dict, source: str = 'Semantic Scholar') -> 'Paper':
+        """Normalize a Semantic Scholar Graph API paper object."""
+        external_ids = item.get('externalIds') or {}
+        journal_info = item.get('journal') or {}
+        return cls(
+            paper_id=item.get('paperId') or '',
+            title=item.get('title') or '',
+            authors=[a.get('name', '') for a in item.get('authors') or []],
+            year=item.get('year') or 0,
+            abstract=_clean_abstract(item.get('abstract')),
+            citations=item.get('citationCount') or 0,
+            url=item.get('url') or '',
+            venue=item.get('venue') or '',
+            doi=external_ids.get('DOI') or '',
+            volume=journal_info.get('volume') or '',
+            issue=journal_info.get('issue') or '',
+            pages=journal_info.get('pages') or '',
+            source=source
+        )
+    
+    @classmethod
+    def from_gs(cls, pub: Dict) -> 'Paper':
+        """Normalize a `scholarly` Google Scholar publication."""
+        bib = pub.get('bib', {}) or {}
+        pub_year = str(bib.get('pub_year', '') or '')
+        return cls(
+            title=bib.get('title', ''),
+            authors=bib.get('author', []) or [],
+            year=int(pub_year) if pub_year.isdigit() else 0,
+            abstract=_clean_abstract(bib.get('abstract', '')),
+            citations=pub.get('num_citations', 0),
+            url=pub.get('pub_url', ''),
+            venue=bib.get('venue', ''),
+            source='Google Scholar'
+        )
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Paper':
+        return cls(**{k: v for k, v in data.items() if k in cls.__slots__})
+    
+    def to_dict(self) -> Dict:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['authors'] = list(self.authors)
+        return data
+    
+    def __repr__(self):
+        return f"Paper({self.title[:40]!r}, year={self.year}, citations={self.citations})"
+
+
+@dataclass
+class FilterConditions:
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    keywords: List[str] = field(default_factory=list)
+    
+    def matches(self, paper: Paper) -> bool:
+        year = paper.year
+        
+        if self.year_min is not None and year > 0 and year < self.year_min:
+            return False
+        if self.year_max is not None and year > 0 and year > self.year_max:
+            return False
+        
+        return True
+
+
+@dataclass
+class SnowballConfig:
+    """
+    Breadth-first expansion of SEED directives over the citation graph.
+    
+    Level 1 holds the papers citing (forward) and/or cited by (backward)
+    the resolved seed; each further level expands the best `level_cap`
+    papers of the previous one. Every expansion is one citations or
+    references page of at most `fanout` papers, and a SEED stops expanding
+    once it has spent `max_requests` of them.
+    """
+    depth: int = 1
+    direction: str = 'both'
+    fanout: int = 100
+    level_cap: int = 10
+    max_requests: int = 100
+    
+    @property
+    def directions(self) -> Tuple[str, ...]:
+        return ('forward', 'backward') if self.direction == 'both' else (self.direction,)
+
+
+@dataclass
+class PlannedWork:
+    """Network work shared by several directives (see `ScholarCrawler.plan_requests`)."""
+    directives: int = 0
+    # Citations page size for a SEED, result limit for a QUERY: the widest any directive needs
+    limit: int = 0
+    sorts: set = field(default_factory=set)
+    # The first directive to run fetches into `future`; it is dropped once every planned directive has claimed it
+    future: Optional['Future'] = None
+    unclaimed: int = 0
+
+
+class SharedStream:
+    """
+    Replayable view of an iterator for several consumers. Items are pulled
+    from the source at most once, under a lock, so a consumer that reaches
+    the end of what has been fetched so far either fetches the next page
+    itself or waits for the one already in flight.
+    """
+    
+    def __init__(self, source: Iterator):
+        self._source = source
+        self._items: List = []
+        self._exhausted = False
+        self._lock = threading.Lock()
+    
+    def __iter__(self) -> Iterator:
+        index = 0
+        end = object()
+        while True:
+            with self._lock:
+                if index >= len(self._items) and not self._exhausted:
+                    item = next(self._source, end)
+                    if item is end:
+                        self._exhausted = True
+                    else:
+                        self._items.append(item)
+                if index >= len(self._items):
+                    return
+                item = self._items[index]
+            index += 1
+            yield item
+
+
+_CJK_RANGES = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN_RE = re.compile(f'[{_CJK_RANGES}]+|[^\\W{_CJK_RANGES}_]+')
+_CJK_RE = re.compile(f'[{_CJK_RANGES}]')
+
+
+@lru_cache(maxsize=262144)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """
+    Lowercase, CJK-aware tokenizer shared by documents and queries.
+    
+    Latin-script text is split into alphanumeric words (so "physics-informed"
+    yields "physics", "informed"); runs of Chinese characters, which carry no
+    spaces, are emitted as overlapping character bigrams.
+    """
+    text = text.lower()
+    if not _CJK_RE.search(text):
+        return tuple(_TOKEN_RE.findall(text))
+    
+    tokens = []
+    for run in _TOKEN_RE.findall(text):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tuple(tokens)
+
+
+def paper_tokens(paper: Paper) -> Tuple[str, ...]:
+    return tokenize(paper.title + ' ' + paper.abstract)
+
+
+class CorpusStats:
+    """
+    Document frequencies accumulated across every directive of a run.
+    
+    Per-directive candidate sets are often a few dozen papers, which makes
+    their local IDF noisy; sharing one `CorpusStats` gives every BM25Index the
+    IDF of all papers seen so far. Papers are counted once, keyed by
+    paperId/DOI/title.
+    """
+    
+    def __init__(self):
+        self.doc_count = 0
+        self.doc_freq: Dict[str, int] = {}
+        self._seen = set()
+        self._lock = threading.Lock()
+    
+    def add(self, papers: List[Paper]):
+        with self._lock:
+            for paper in papers:
+                key = paper.paper_id or paper.doi or paper.title.lower()
+                if key in self._seen:
+                    continue
+                self._seen.add(key)
+                self.doc_count += 1
+                for term in set(paper_tokens(paper)):
+                    self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+    
+    def idf(self, terms: List[str]) -> 'np.ndarray':
+        with self._lock:
+            n = self.doc_count
+            df = np.array([self.doc_freq.get(t, 0) for t in terms], dtype=np.float64)
+        return np.log((n - df + 0.5) / (df + 0.5) + 1.0)
+
+
+class BM25Index:
+    """
+    NumPy inverted index for Okapi BM25 over a fixed set of documents.
+    
+    Term frequencies are stored as term-sorted postings (CSR layout) and the
+    length-normalized TF component is precomputed once, so scoring a query is
+    a handful of vectorized gathers per query term. IDF uses the non-negative
+    form log((N - df + 0.5) / (df + 0.5) + 1), either from this index or from
+    shared `CorpusStats`.
+    
+    Args:
+        documents: Pre-tokenized documents
+        k1: Term frequency saturation
+        b: Length normalization strength
+        corpus_stats: Optional global statistics used for IDF
+    """
+    
+    def __init__(self, documents: List[Tuple[str, ...]], k1: float = 1.5, b: float = 0.75,
+                 corpus_stats: Optional[CorpusStats] = None):
+        self.k1 = k1
+        self.b = b
+        self.corpus_stats = corpus_stats
+        self.n_docs = len(documents)
+        
+        all_tokens = list(chain.from_iterable(documents))
+        self.vocab: Dict[str, int] = {t: i for i, t in enumerate(dict.fromkeys(all_tokens))}
+        term_ids = np.fromiter(map(self.vocab.__getitem__, all_tokens), dtype=np.int64, count=len(all_tokens))
+        lengths = np.fromiter(map(len, documents), dtype=np.int64, count=self.n_docs)
+        
+        n = max(self.n_docs, 1)
+        doc_ids = np.repeat(np.arange(self.n_docs, dtype=np.int64), lengths)
+        keys, tf = np.unique(term_ids * n + doc_ids, return_counts=True)
+        
+        self.post_docs = keys % n
+        post_terms = keys // n
+        self.indptr = np.searchsorted(post_terms, np.arange(len(self.vocab) + 1))
+        self.doc_freq = np.diff(self.indptr)
+        
+        avgdl = lengths.mean() if self.n_docs and lengths.mean() > 0 else 1.0
+        norm = k1 * (1.0 - b + b * lengths / avgdl)
+        self.post_weight = tf * (k1 + 1.0) / (tf + norm[self.post_docs])
+    
+    @classmethod
+    def from_papers(cls, papers: List[Paper], **kwargs) -> 'BM25Index':
+        return cls([paper_tokens(p) for p in papers], **kwargs)
+    
+    def _idf(self, terms: List[str]) -> 'np.ndarray':
+        if self.corpus_stats is not None and self.corpus_stats.doc_count:
+            return self.corpus_stats.idf(terms)
+        df = np.array([self.doc_freq[self.vocab[t]] for t in terms], dtype=np.float64)
+        return np.log((self.n_docs - df + 0.5) / (df + 0.5) + 1.0)
+    
+    def score_many(self, keyword_sets: List[List[str]]) -> 'np.ndarray':
+        """
+        Score every document against several keyword sets in one pass over the postings.
+        
+        Returns:
+            Array of shape (len(keyword_sets), n_docs)
+        """
+        scores = np.zeros((len(keyword_sets), self.n_docs), dtype=np.float64)
+        
+        query_terms: Dict[str, Dict[int, int]] = {}
+        for q, keywords in enumerate(keyword_sets):
+            for term in tokenize(' '.join(keywords)):
+                if term in self.vocab:
+                    counts = query_terms.setdefault(term, {})
+                    counts[q] = counts.get(q, 0) + 1
+        
+        if not query_terms:
+            return scores
+        
+        terms = list(query_terms)
+        idf = self._idf(terms)
+        for term, term_idf in zip(terms, idf):
+            t = self.vocab[term]
+            start, end = self.indptr[t], self.indptr[t + 1]
+            contribution = term_idf * self.post_weight[start:end]
+            docs = self.post_docs[start:end]
+            for q, count in query_terms[term].items():
+                scores[q, docs] += count * contribution
+        
+        return scores
+    
+    def score(self, keywords: List[str]) -> 'np.ndarray':
+        return self.score_many([keywords])[0]
+
+
+class BM25Scorer:
+    def __init__(self, k1: float = 1.5, b: float = 0.75, corpus_stats: Optional[CorpusStats] = None):
+        self.k1 = k1
+        self.b = b
+        self.corpus_stats = corpus_stats
+    
+    def compute_scores(self, papers: List[Paper], keywords: List[str]) -> List[Paper]:
+        if not keywords or not papers:
+            for paper in papers:
+                paper.bm25_score = 0.0
+            return papers
+        
+        if not NUMPY_AVAILABLE:
+            for paper in papers:
+                title = paper.title.lower()
+                abstract = paper.abstract.lower()
+                score = 0
+                for kw in keywords:
+                    kw_lower = kw.lower()
+                    if kw_lower in title:
+                        score += 3
+                    score += min(abstract.count(kw_lower), 3)
+                paper.bm25_score = float(score)
+            return papers
+        
+        np.ndarray  # import numpy before the stage, so the bm25 timings only cover scoring
+        with pipeline_stage('bm25', papers=len(papers)):
+            if self.corpus_stats is not None:
+                self.corpus_stats.add(papers)
+            
+            index = BM25Index.from_papers(papers, k1=self.k1, b=self.b, corpus_stats=self.corpus_stats)
+            scores = index.score(keywords)
+            
+            for paper, score in zip(papers, scores):
+                paper.bm25_score = float(score)
+        
+        return papers
+    
+    def compute_scores_many(self, papers: List[Paper], keyword_sets: List[List[str]]) -> 'np.ndarray':
+        """Score one candidate set against many keyword sets, building the index only once."""
+        np.ndarray
+        with pipeline_stage('bm25', papers=len(papers), keyword_sets=len(keyword_sets)):
+            if self.corpus_stats is not None:
+                self.corpus_stats.add(papers)
+            index = BM25Index.from_papers(papers, k1=self.k1, b=self.b, corpus_stats=self.corpus_stats)
+            return index.score_many(keyword_sets)
+
+
+_DIGITS_RE = re.compile(r'\d+')
+
+
+class PaperDeduplicator:
+    """
+    Cross-directive deduplication in three tiers.
+    
+    1. Exact DOI / paperId match
+    2. Normalized-title hash (case folding, punctuation and whitespace removed)
+    3. MinHash-LSH over title character 3-grams, verified by exact Jaccard,
+       to catch preprint vs. published versions with slightly edited titles
+    
+    Matches are merged with union-find; the merged record keeps the most
+    complete metadata and the union of all `query_group` provenance. Every
+    tier is hash-based, so the pass is near-linear in the number of papers.
+    
+    `deduplicate()` handles a list in one call. A crawl instead `add()`s each
+    directive's papers as they arrive, which keeps only their keys, then
+    takes the group `roots()` and merges the groups read back from disk.
+    
+    Args:
+        threshold: Minimum title 3-gram Jaccard similarity for a near-duplicate
+        num_perm: MinHash signature length
+        bands: LSH bands (num_perm must be divisible by bands)
+        max_year_gap: Near-duplicates must be at most this many years apart
+    """
+    
+    MIN_TITLE_LENGTH = 20
+    MAX_BUCKET_SIZE = 100
+    
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, max_year_gap: int = 2):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.max_year_gap = max_year_gap
+        self.stats = {'doi_or_id': 0, 'title': 0, 'near_duplicate': 0}
+        self._reset()
+    
+    @staticmethod
+    def normalize_title(title: str) -> str:
+        return re.sub(r'[\W_]+', '', title.casefold())
+    
+    @staticmethod
+    def _shingles(normalized: str) -> set:
+        return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+    
+    def _minhash(self, titles: List[str]) -> 'np.ndarray':
+        rng = np.random.RandomState(7)
+        a = (rng.randint(1, 2 ** 62, size=(self.num_perm, 1), dtype=np.int64).astype(np.uint64) | np.uint64(1))
+        b = rng.randint(0, 2 ** 62, size=(self.num_perm, 1), dtype=np.int64).astype(np.uint64)
+        signatures = np.empty((len(titles), self.num_perm), dtype=np.uint64)
+        
+        block = 2048
+        for start in range(0, len(titles), block):
+            chunk = titles[start:start + block]
+            # Hash every character 3-gram of the whole block at once from UTF-32 code points
+            codes = np.frombuffer(''.join(chunk).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+            lengths = np.fromiter(map(len, chunk), dtype=np.int64, count=len(chunk))
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            with np.errstate(over='ignore'):
+                grams = codes[:-2] * np.uint64(1000003 * 1000003) + codes[1:-1] * np.uint64(1000003) + codes[2:]
+                keep = np.ones(len(grams), dtype=bool)
+                for offset in (1, 2):
+                    # Drop 3-grams that straddle two titles
+                    ends = starts[1:] - offset
+                    keep[ends[ends >= 0]] = False
+                grams = grams[keep]
+                # Multiply-shift hashing; uint64 arithmetic wraps, which is intended
+                permuted = (grams[None, :] * a + b) >> np.uint64(32)
+            gram_starts = np.concatenate(([0], np.cumsum(lengths - 2)[:-1]))
+            signatures[start:start + len(chunk)] = np.minimum.reduceat(permuted, gram_starts, axis=1).T
+        return signatures
+    
+    def _lsh_buckets(self, signatures: 'np.ndarray') -> Iterator['np.ndarray']:
+        rows = self.num_perm // self.bands
+        rng = np.random.RandomState(11)
+        mix = rng.randint(1, 2 ** 62, size=rows, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        for band in range(self.bands):
+            with np.errstate(over='ignore'):
+                keys = (signatures[:, band * rows:(band + 1) * rows] * mix).sum(axis=1)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(sorted_keys)) + 1, [len(keys)]))
+            sizes = np.diff(bounds)
+            # Only buckets holding at least two titles can produce candidate pairs
+            for b_start, size in zip(bounds[:-1][sizes >= 2], sizes[sizes >= 2]):
+                if size <= self.MAX_BUCKET_SIZE:
+                    yield order[b_start:b_start + size]
+    
+    def _merge(self, group: List[Paper]) -> Paper:
+        # Prefer the published version: has DOI and venue, then the most cited
+        group_sorted = sorted(group, key=lambda p: (not p.is_seed_source, not p.doi, not p.venue, -p.citations))
+        merged = group_sorted[0]
+        
+        for other in group_sorted[1:]:
+            for name in ('paper_id', 'doi', 'abstract', 'url', 'venue', 'volume', 'issue', 'pages'):
+                if not getattr(merged, name) and getattr(other, name):
+                    setattr(merged, name, getattr(other, name))
+            if not merged.authors and other.authors:
+                merged.authors = other.authors
+            if not merged.year and other.year:
+                merged.year = other.year
+            merged.citations = max(merged.citations, other.citations)
+            merged.bm25_score = max(merged.bm25_score, other.bm25_score)
+            merged.relevance_score = max(merged.relevance_score, other.relevance_score)
+        
+        groups = []
+        for paper in group:
+            for g in paper.query_group.split('; ') if paper.query_group else []:
+                if g not in groups:
+                    groups.append(g)
+        merged.query_group = '; '.join(groups)
+        return merged
+    
+    def _reset(self):
+        # Union-find over papers in the order they were added; a root is its group's first-seen member
+        self._parent = array('q')
+        self._first_by_id: Dict[str, int] = {}
+        self._first_by_title: Dict[str, int] = {}
+        self._years: Dict[int, int] = {}
+    
+    def _find(self, i: int) -> int:
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    def _union(self, i: int, j: int, tier: str):
+        ri, rj = self._find(i), self._find(j)
+        if ri != rj:
+            self._parent[max(ri, rj)] = min(ri, rj)
+            self.stats[tier] += 1
+    
+    def add(self, papers: Iterable[Paper]):
+        """
+        Index papers as they are collected. The exact tiers are applied right
+        away; only the keys are kept, not the papers.
+        """
+        for paper in papers:
+            i = len(self._parent)
+            self._parent.append(i)
+            for key in (f"doi:{paper.doi.lower()}" if paper.doi else '', f"s2:{paper.paper_id}" if paper.paper_id else ''):
+                if key:
+                    if key in self._first_by_id:
+                        self._union(self._first_by_id[key], i, 'doi_or_id')
+                    else:
+                        self._first_by_id[key] = i
+            
+            normalized = self.normalize_title(paper.title)
+            if normalized:
+                if normalized in self._first_by_title:
+                    self._union(self._first_by_title[normalized], i, 'title')
+                else:
+                    self._first_by_title[normalized] = i
+                    self._years[i] = paper.year
+    
+    def roots(self) -> 'array':
+        """Apply the near-duplicate tier to everything added; returns the group root of each paper."""
+        if NUMPY_AVAILABLE:
+            candidates = [(normalized, i) for normalized, i in self._first_by_title.items()
+                          if len(normalized) >= self.MIN_TITLE_LENGTH]
+            if len(candidates) > 1:
+                signatures = self._minhash([normalized for normalized, _ in candidates])
+                shingle_cache: Dict[int, set] = {}
+                for members in self._lsh_buckets(signatures):
+                    members = [candidates[c] for c in members]
+                    for x in range(len(members)):
+                        for y in range(x + 1, len(members)):
+                            (ti, i), (tj, j) = members[x], members[y]
+                            if self._find(i) == self._find(j):
+                                continue
+                            yi, yj = self._years[i], self._years[j]
+                            if yi and yj and abs(yi - yj) > self.max_year_gap:
+                                continue
+                            # "Part 1" vs "Part 2", "3D" vs "2D": differing numbers mean different papers
+                            if _DIGITS_RE.findall(ti) != _DIGITS_RE.findall(tj):
+                                continue
+                            if i not in shingle_cache:
+                                shingle_cache[i] = self._shingles(ti)
+                            if j not in shingle_cache:
+                                shingle_cache[j] = self._shingles(tj)
+                            sx, sy = shingle_cache[i], shingle_cache[j]
+                            if len(sx & sy) / len(sx | sy) >= self.threshold:
+                                self._union(i, j, 'near_duplicate')
+        
+        return array('q', (self._find(i) for i in range(len(self._parent))))
+    
+    def merge_groups(self, groups: Iterable[List[Paper]]) -> Iterator[Paper]:
+        """Merge each group of duplicates (e.g. from `PaperSpool.groups`) into one record."""
+        for group in groups:
+            yield self._merge(group)
+    
+    def deduplicate(self, papers: List[Paper]) -> List[Paper]:
+        self._reset()
+        self.add(papers)
+        groups: Dict[int, List[Paper]] = {}
+        for paper, root in zip(papers, self.roots()):
+            groups.setdefault(root, []).append(paper)
+        
+        # Keep first-seen order so the CSV still follows the plan
+        return [self._merge(groups[root]) for root in sorted(groups)]
+
+
+class _Metric:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+
+class MetricCounter(_Metric):
+    """Monotonic counter, optionally split by labels."""
+    
+    TYPE = 'counter'
+    
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return sorted(self._values.items())
+
+
+class MetricGauge(MetricCounter):
+    """Value that can go up and down; the last `set` wins."""
+    
+    TYPE = 'gauge'
+    
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class MetricHistogram(_Metric):
+    """Cumulative-bucket histogram; `time()` observes the duration of a with-block."""
+    
+    TYPE = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+    
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts, then sum and count
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+    
+    def time(self, **labels) -> '_HistogramTimer':
+        return _HistogramTimer(self, labels)
+    
+    def samples(self) -> List[Tuple[Tuple[str, ...], List[float]]]:
+        with self._lock:
+            return sorted((key, list(state)) for key, state in self._values.items())
+
+
+class _HistogramTimer:
+    def __init__(self, histogram: MetricHistogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+    
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of counters and histograms, exported as a JSON summary
+    or in the Prometheus text exposition format (for node_exporter's
+    textfile collector). Writes go through a temp file and `os.replace`, so
+    a scraper never reads a partial file.
+    """
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+    
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> MetricCounter:
+        return self._register(MetricCounter(name, help_text, label_names))
+    
+    def gauge(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> MetricGauge:
+        return self._register(MetricGauge(name, help_text, label_names))
+    
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = MetricHistogram.DEFAULT_BUCKETS) -> MetricHistogram:
+        return self._register(MetricHistogram(name, help_text, label_names, buckets))
+    
+    def to_dict(self) -> Dict:
+        summary = {'generated': datetime.now().isoformat(timespec='seconds'), 'metrics': {}}
+        for name, metric in sorted(self._metrics.items()):
+            series = []
+            for key, value in metric.samples():
+                entry = {'labels': dict(zip(metric.label_names, key))}
+                if metric.TYPE != 'histogram':
+                    entry['value'] = round(value, 6)
+                else:
+                    cumulative = 0.0
+                    buckets = {}
+                    for bound, n in zip(metric.buckets, value):
+                        cumulative += n
+                        buckets[str(bound)] = int(cumulative)
+                    entry.update(count=int(value[-1]), sum=round(value[-2], 6), buckets=buckets)
+                series.append(entry)
+            summary['metrics'][name] = {'type': metric.TYPE, 'help': metric.help, 'series': series}
+        return summary
+    
+    @staticmethod
+    def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{n}="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+                 for n, v in zip(names, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+    
+    def to_prometheus(self) -> str:
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.TYPE}")
+            for key, value in metric.samples():
+                if metric.TYPE != 'histogram':
+                    lines.append(f"{name}{self._format_labels(metric.label_names, key)} {value:g}")
+                    continue
+                cumulative = 0.0
+                for bound, n in zip(metric.buckets, value):
+                    cumulative += n
+                    labels = self._format_labels(metric.label_names, key, f'le="{bound:g}"')
+                    lines.append(f"{name}_bucket{labels} {cumulative:g}")
+                labels = self._format_labels(metric.label_names, key, 'le="+Inf"')
+                lines.append(f"{name}_bucket{labels} {value[-1]:g}")
+                lines.append(f"{name}_sum{self._format_labels(metric.label_names, key)} {value[-2]:g}")
+                lines.append(f"{name}_count{self._format_labels(metric.label_names, key)} {value[-1]:g}")
+        return '\n'.join(lines) + '\n'
+    
+    def total(self, name: str, **labels) -> float:
+        """Sum of a counter, or of a histogram's observations, over series matching `labels`."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            return 0.0
+        result = 0.0
+        for key, value in metric.samples():
+            series_labels = dict(zip(metric.label_names, key))
+            if all(series_labels.get(k) == str(v) for k, v in labels.items()):
+                result += value if metric.TYPE != 'histogram' else value[-2]
+        return result
+    
+    def write(self, json_path: Optional[Path] = None, prom_path: Optional[Path] = None):
+        for path, text in ((json_path, lambda: json.dumps(self.to_dict(), ensure_ascii=False, indent=2)),
+                           (prom_path, self.to_prometheus)):
+            if not path:
+                continue
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + '.tmp')
+            tmp_path.write_text(text(), encoding='utf-8')
+            os.replace(tmp_path, path)
+
+
+METRICS = MetricsRegistry()
+HTTP_ATTEMPT_SECONDS = METRICS.histogram(
+    'scholar_http_request_seconds', 'Latency of a single HTTP attempt, excluding rate-limiter waits and backoff',
+    ('endpoint',))
+HTTP_RESPONSES = METRICS.counter(
+    'scholar_http_responses_total', 'HTTP attempts by endpoint and status code (or exception name)',
+    ('endpoint', 'status'))
+HTTP_RETRIES = METRICS.counter(
+    'scholar_http_retries_total', 'Retried HTTP attempts by endpoint and reason', ('endpoint', 'reason'))
+BACKOFF_SECONDS = METRICS.counter(
+    'scholar_backoff_seconds_total', 'Seconds slept in retry backoff / Retry-After', ('endpoint',))
+RATE_LIMIT_WAIT_SECONDS = METRICS.histogram(
+    'scholar_rate_limiter_wait_seconds', 'Time spent blocked on the token-bucket rate limiter per acquire')
+RATE_LIMIT_RPS = METRICS.gauge(
+    'scholar_rate_limit_requests_per_second', 'Current request rate of the shared rate limiter')
+RATE_LIMIT_ADJUSTMENTS = METRICS.counter(
+    'scholar_rate_limit_adjustments_total', 'Adaptive rate limiter changes by direction', ('direction',))
+SLEEP_SECONDS = METRICS.counter(
+    'scholar_sleep_seconds_total', 'Seconds spent in fixed pacing sleeps', ('reason',))
+REQUESTS_COALESCED = METRICS.counter(
+    'scholar_requests_coalesced_total', 'Requests answered by an identical request already in flight', ('endpoint',))
+SHARED_WORK = METRICS.counter(
+    'scholar_shared_work_total', 'Directives served from work fetched for another directive in the plan', ('kind',))
+SEED_RESOLUTIONS = METRICS.counter(
+    'scholar_seed_resolutions_total', 'SEED resolutions served from the seed table (hit) or the network (miss)',
+    ('result',))
+GS_SPECULATIVE = METRICS.counter(
+    'scholar_google_scholar_speculative_total', 'Speculative Google Scholar queries by outcome (used, cancelled)',
+    ('outcome',))
+CACHE_REQUESTS = METRICS.counter(
+    'scholar_cache_requests_total', 'Response cache lookups by endpoint and result', ('endpoint', 'result'))
+PAPERS_FETCHED = METRICS.counter(
+    'scholar_papers_fetched_total', 'Papers passed to filter_and_rank_papers', ('directive_type',))
+PAPERS_KEPT = METRICS.counter(
+    'scholar_papers_kept_total', 'Papers kept by filter_and_rank_papers', ('directive_type',))
+STAGE_SECONDS = METRICS.histogram(
+    'scholar_stage_seconds', 'Wall time per pipeline stage (parse, fetch, bm25, score, dedup, export)', ('stage',))
+DIRECTIVE_SECONDS = METRICS.histogram(
+    'scholar_directive_seconds', 'Wall time per directive, including fetch and scoring', ('directive_type',))
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, tracer: 'Tracer', name: str, cat: str, args: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+    
+    def set(self, **args):
+        self.args.update(args)
+    
+    def __enter__(self):
+        local = self.tracer._local
+        stack = local.__dict__.setdefault('stack', [])
+        self.span_id = next(self.tracer._ids)
+        self.parent_id = stack[-1] if stack else getattr(local, 'inherited', None)
+        stack.append(self.span_id)
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self.tracer._local.stack.pop()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer._add_complete(self, self._start, end)
+        return False
+
+
+class Tracer:
+    """
+    Records nested spans as Chrome trace events (load the file in
+    chrome://tracing or https://ui.perfetto.dev). Spans nest per thread;
+    `propagate` carries the current span into a worker thread so spans
+    opened there name it as their parent. While disabled, `span` returns a
+    shared no-op object.
+    """
+    
+    def __init__(self):
+        self.enabled = False
+        self._events: List[Dict] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = count(1)
+        self._threads: Dict[int, str] = {}
+        self._origin = time.perf_counter()
+    
+    def enable(self):
+        self._origin = time.perf_counter()
+        self.enabled = True
+    
+    def span(self, name: str, cat: str = 'stage', **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+    
+    def current(self) -> Optional[int]:
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else getattr(self._local, 'inherited', None)
+    
+    def propagate(self, fn: Callable) -> Callable:
+        """Wrap `fn` so spans it opens on another thread are children of the current span."""
+        if not self.enabled:
+            return fn
+        parent = self.current()
+        
+        def run(*args, **kwargs):
+            previous = getattr(self._local, 'inherited', None)
+            self._local.inherited = parent
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._local.inherited = previous
+        return run
+    
+    def _add_complete(self, span: _Span, start: float, end: float):
+        thread = threading.current_thread()
+        args = dict(span.args, span_id=span.span_id)
+        if span.parent_id is not None:
+            args['parent_id'] = span.parent_id
+        event = {
+            'name': span.name, 'cat': span.cat, 'ph': 'X', 'pid': os.getpid(), 'tid': thread.ident,
+            'ts': round((start - self._origin) * 1e6, 1), 'dur': round((end - start) * 1e6, 1),
+            'args': args,
+        }
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append(event)
+    
+    def write(self, path: Path):
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        pid = os.getpid()
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': 'scholar_crawler'}}]
+        metadata += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                     for tid, name in threads.items()]
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + sorted(events, key=lambda e: e['ts']),
+                       'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class StageProfiler:
+    """
+    cProfile restricted to the CPU-bound stages, so time blocked on the
+    network or the rate limiter does not swamp the profile. One profiler is
+    shared and profiled stages are serialized across threads: cProfile
+    cannot run several instances at once on Python 3.12+.
+    """
+    
+    CPU_STAGES = frozenset({'parse', 'bm25', 'score', 'dedup', 'export'})
+    
+    def __init__(self):
+        self.enabled = False
+        self._profile = None
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._owner = None
+    
+    def enable(self):
+        import cProfile
+        self._profile = cProfile.Profile()
+        self.enabled = True
+    
+    @contextmanager
+    def _profiled(self):
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                self._owner = threading.get_ident()
+                self._profile.enable()
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._profile.disable()
+                    self._owner = None
+    
+    @contextmanager
+    def paused(self):
+        """Leave a block out of the profile if this thread is inside a profiled stage."""
+        if not self.enabled or self._owner != threading.get_ident():
+            yield
+            return
+        self._profile.disable()
+        try:
+            yield
+        finally:
+            self._profile.enable()
+    
+    def profile(self, stage: str):
+        if not self.enabled or stage not in self.CPU_STAGES:
+            return _NULL_SPAN
+        return self._profiled()
+    
+    def dump(self, path: Path, top: int = 25):
+        import pstats
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._profile.dump_stats(str(path))
+        stream = io.StringIO()
+        pstats.Stats(self._profile, stream=stream).sort_stats('cumulative').print_stats(top)
+        print(f"INFO: CPU profile of stages {', '.join(sorted(self.CPU_STAGES))} saved to {path} "
+              f"(view with: python -m pstats {path})", file=sys.stderr)
+        print(stream.getvalue(), file=sys.stderr)
+
+
+TRACER = Tracer()
+PROFILER = StageProfiler()
+
+
+@contextmanager
+def pipeline_stage(stage: str, **args):
+    """Time one pipeline stage into the metrics, the trace timeline and, for CPU-bound stages, the profiler."""
+    with STAGE_SECONDS.time(stage=stage), TRACER.span(stage, 'stage', **args), PROFILER.profile(stage):
+        yield
+
+
+class MetricsReporter:
+    """Rewrites the metrics files every `interval` seconds from a daemon thread."""
+    
+    def __init__(self, registry: MetricsRegistry, json_path: Optional[Path], prom_path: Optional[Path],
+                 interval: float):
+        self.registry = registry
+        self.json_path = json_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-reporter', daemon=True)
+    
+    def start(self) -> 'MetricsReporter':
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.registry.write(self.json_path, self.prom_path)
+            except OSError as e:
+                print(f"WARNING: Failed to write metrics: {e}", file=sys.stderr)
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+class CrawlCancelled(BaseException):
+    """
+    Raised on worker threads once the run has been interrupted. Derives from
+    BaseException, like KeyboardInterrupt, so the per-source `except
+    Exception` fallbacks let it through instead of moving on to the next source.
+    """
+
+
+# Set on Ctrl-C; worker threads stop at their next rate-limiter wait, backoff or request attempt
+CANCEL = threading.Event()
+
+
+def _cancellable_sleep(seconds: float):
+    """`time.sleep` that ends early with `CrawlCancelled` once `CANCEL` is set."""
+    if CANCEL.wait(seconds):
+        raise CrawlCancelled()
+
+
+def shutdown_executor(executor, wait: bool = True):
+    """Shut down a thread pool; without `wait`, queued work is dropped and running work is left to `CANCEL`."""
+    if wait or sys.version_info < (3, 9):
+        executor.shutdown(wait=wait)
+    else:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Semantic Scholar's documented limits: 1 request/s per API key, and
+# 100 requests per 5 minutes for unauthenticated clients
+S2_KEYED_RPS = 1.0
+S2_WINDOW_REQUESTS = 100
+S2_WINDOW_SECONDS = 300.0
+
+# Fields requested wherever API results become `Paper`s (see `Paper.from_s2`)
+PAPER_FIELDS = 'title,authors,year,abstract,citationCount,url,venue,publicationDate,externalIds,journal'
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket shared by every Semantic Scholar request.
+    
+    Tokens refill at `rate` per second up to `capacity`; `acquire()` blocks
+    until a token is available, so concurrent directives never exceed the
+    API budget no matter how many requests are in flight.
+    
+    An optional `window` adds a second bucket holding `requests` tokens that
+    refills over `seconds`, for quotas counted per time window: every request
+    must take a token from both buckets.
+    
+    Args:
+        rate: Sustained requests per second
+        capacity: Maximum burst size (1 = strictly paced)
+        window: (requests, seconds) quota enforced on top of `rate`
+    """
+    
+    def __init__(self, rate: float = 1.0, capacity: float = 1.0, window: Optional[Tuple[int, float]] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.window = window
+        self._tokens = capacity
+        self._window_tokens = float(window[0]) if window else 0.0
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        RATE_LIMIT_RPS.set(rate)
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        if self.window:
+            requests, seconds = self.window
+            self._window_tokens = min(requests, self._window_tokens + elapsed * requests / seconds)
+        self._last = now
+    
+    def acquire(self) -> float:
+        """Block until a token is available. Returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                paused = self._paused_until - time.monotonic()
+                window_wait = 0.0
+                if self.window:
+                    requests, seconds = self.window
+                    window_wait = (1.0 - self._window_tokens) * seconds / requests
+                if paused <= 0 and self._tokens >= 1.0 and window_wait <= 0:
+                    self._tokens -= 1.0
+                    if self.window:
+                        self._window_tokens -= 1.0
+                    RATE_LIMIT_WAIT_SECONDS.observe(waited)
+                    return waited
+                wait = max(paused, (1.0 - self._tokens) / self.rate, window_wait)
+            _cancellable_sleep(wait)
+            waited += wait
+    
+    def feedback(self, status: int, retry_after: Optional[float] = None):
+        """Report a response. A fixed-rate bucket only honors `Retry-After` by pausing every caller."""
+        if retry_after:
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+
+class AdaptiveRateLimiter(TokenBucketRateLimiter):
+    """
+    Token bucket whose rate follows AIMD (additive increase, multiplicative
+    decrease), as TCP does for its congestion window.
+    
+    Until the first throttling signal every successful response adds the
+    larger `slow_start` step (a linear take on TCP slow start); afterwards
+    every success adds `increase` requests/s. Growth stops at `max_rate`. A 429 (or any response carrying
+    `Retry-After`) multiplies the rate by `decrease`, down to `min_rate`.
+    429s that arrive within one request interval of the previous cut were
+    already in flight before it and do not cut again, so a burst of
+    concurrent 429s counts as one congestion signal.
+    
+    Args:
+        rate: Starting requests per second
+        min_rate: Floor for multiplicative decrease
+        max_rate: Ceiling for additive increase
+        increase: Requests/s added per successful response
+        decrease: Factor applied on throttling
+        slow_start: Requests/s added per success before the first throttling
+            signal (0 disables slow start, e.g. for a rate learned earlier)
+        window: (requests, seconds) quota enforced on top of the adaptive rate
+    """
+    
+    def __init__(self, rate: float, min_rate: float, max_rate: float,
+                 increase: float = 0.05, decrease: float = 0.5, slow_start: float = 0.0,
+                 window: Optional[Tuple[int, float]] = None):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_start = slow_start
+        self._last_cut = 0.0
+        super().__init__(rate=min(max(rate, min_rate), max_rate), capacity=1.0, window=window)
+    
+    def feedback(self, status: int, retry_after: Optional[float] = None):
+        with self._lock:
+            now = time.monotonic()
+            if status == 429 or retry_after:
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+                if now - self._last_cut < 1.0 / self.rate:
+                    return
+                self._refill()
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_cut = now
+                self.slow_start = 0.0
+                RATE_LIMIT_ADJUSTMENTS.inc(direction='decrease')
+                print(f"INFO: Throttled (status {status}), lowering request rate to {self.rate:.2f}/s", file=sys.stderr)
+            elif 200 <= status < 300 and self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + max(self.increase, self.slow_start))
+                RATE_LIMIT_ADJUSTMENTS.inc(direction='increase')
+            else:
+                return
+            RATE_LIMIT_RPS.set(self.rate)
+
+
+class RateLimitState:
+    """
+    Learned request rates persisted between runs, one entry per API host and
+    key tier, so a run starts from the rate the previous one converged to
+    instead of re-probing from the conservative default.
+    
+    The API key itself is never stored; tiers are named by a hash prefix.
+    """
+    
+    MAX_AGE = 7 * 24 * 3600
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        try:
+            self._entries = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self._entries = {}
+    
+    @staticmethod
+    def tier_key(api_base: str, api_key: str) -> str:
+        tier = 'key-' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8] if api_key else 'anonymous'
+        return f"{api_base}|{tier}"
+    
+    def load(self, key: str) -> Optional[float]:
+        entry = self._entries.get(key)
+        if not isinstance(entry, dict) or time.time() - entry.get('updated', 0) > self.MAX_AGE:
+            return None
+        return entry.get('rate')
+    
+    def save(self, key: str, rate: float):
+        self._entries[key] = {'rate': round(rate, 4), 'updated': int(time.time())}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            tmp_path.write_text(json.dumps(self._entries, indent=2), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"WARNING: Failed to save learned rate limit: {e}", file=sys.stderr)
+
+
+class HttpTransport:
+    """
+    Pooled HTTP transport with retry, backoff and timeout budgets.
+    
+    A single keep-alive `requests.Session` is shared by every call site, so
+    consecutive requests to api.semanticscholar.org reuse the TLS connection.
+    429 and 5xx responses, timeouts and connection errors are retried with
+    exponential backoff plus full jitter; a `Retry-After` header, when sent,
+    overrides the computed backoff.
+    
+    Args:
+        max_retries: Retries after the first attempt
+        backoff_base: Base delay in seconds for exponential backoff
+        backoff_max: Upper bound for a single backoff sleep
+        connect_timeout: Socket connect timeout per attempt
+        read_timeout: Socket read timeout per attempt
+        total_timeout: Budget in seconds for all attempts of one request
+        pool_size: Maximum pooled connections per host
+        before_request: Hook invoked before every attempt (e.g. rate limiter)
+        on_response: Hook called with (status, Retry-After seconds or None) after every response
+    """
+    
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    
+    def __init__(self, max_retries: int = 3, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 connect_timeout: float = 10.0, read_timeout: float = 30.0, total_timeout: float = 120.0,
+                 pool_size: int = 10, before_request: Optional[Callable[[], None]] = None,
+                 on_response: Optional[Callable[[int, Optional[float]], None]] = None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.before_request = before_request
+        self.on_response = on_response
+        
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(pool_size, 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        # HTTP-date form is rare; email.utils is only imported when it shows up
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def request(self, method: str, url: str, endpoint: str = 'other', **kwargs):
+        """
+        Send a request, retrying transient failures within the timeout budget.
+        
+        `endpoint` only labels the request in the metrics registry.
+        
+        Returns:
+            The final `requests.Response` (possibly a non-200 one once retries are exhausted)
+        
+        Raises:
+            requests.RequestException: If every attempt failed without a response
+            CrawlCancelled: If the run was interrupted before or between attempts
+        """
+        deadline = time.monotonic() + self.total_timeout
+        last_error = None
+        
+        for attempt in range(self.max_retries + 1):
+            if CANCEL.is_set():
+                raise CrawlCancelled()
+            if self.before_request:
+                with TRACER.span('rate limiter', 'wait'):
+                    self.before_request()
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+            
+            response = None
+            started = time.perf_counter()
+            with TRACER.span(f'{method} {endpoint}', 'http', url=url.split('?')[0], attempt=attempt + 1) as span:
+                try:
+                    response = self.session.request(method, url, timeout=timeout, **kwargs)
+                    HTTP_ATTEMPT_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+                    HTTP_RESPONSES.inc(endpoint=endpoint, status=response.status_code)
+                    span.set(status=response.status_code)
+                    if self.on_response:
+                        self.on_response(response.status_code, self._retry_after(response))
+                    if response.status_code not in self.RETRY_STATUSES:
+                        return response
+                    last_error = None
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    HTTP_ATTEMPT_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+                    HTTP_RESPONSES.inc(endpoint=endpoint, status=type(e).__name__)
+                    span.set(status=type(e).__name__)
+                    last_error = e
+            
+            if attempt == self.max_retries:
+                break
+            
+            wait = self._retry_after(response)
+            if wait is None:
+                wait = self._backoff(attempt)
+            if time.monotonic() + wait >= deadline:
+                break
+            
+            reason = f"status {response.status_code}" if response is not None else type(last_error).__name__
+            print(f"INFO: Retrying {url.split('?')[0]} in {wait:.1f}s ({reason}, attempt {attempt + 1}/{self.max_retries})", file=sys.stderr)
+            HTTP_RETRIES.inc(endpoint=endpoint, reason=reason)
+            BACKOFF_SECONDS.inc(wait, endpoint=endpoint)
+            with TRACER.span('backoff', 'wait', reason=reason):
+                _cancellable_sleep(wait)
+        
+        if response is not None:
+            return response
+        raise last_error or requests.Timeout(f"Request budget of {self.total_timeout}s exhausted for {url}")
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of Semantic Scholar JSON responses.
+    
+    Entries are keyed on the endpoint URL plus normalized request params
+    (sorted keys, sorted `fields` list), expire after a per-endpoint TTL and
+    are evicted least-recently-used once the store exceeds `max_bytes`.
+    
+    Args:
+        cache_dir: Directory holding `responses.sqlite3`
+        max_bytes: Upper bound on the stored (compressed) payload size
+        ttls: Per-endpoint TTL overrides in seconds
+        refresh: Ignore existing entries but still write fresh responses
+    """
+    
+    DEFAULT_TTLS = {
+        'search': 7 * 86400,
+        'paper': 30 * 86400,
+        'citations': 86400,
+        'references': 30 * 86400,
+        'batch': 30 * 86400,
+        'bulk': 7 * 86400,
+        'seed': 30 * 86400,
+    }
+    
+    def __init__(self, cache_dir: Path, max_bytes: int = 512 * 1024 * 1024,
+                 ttls: Optional[Dict[str, int]] = None, refresh: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_dir / 'responses.sqlite3'), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, endpoint TEXT, body BLOB, size INTEGER, '
+            'created REAL, last_access REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)')
+        # Resolved SEED strings; a few hundred bytes each, so exempt from LRU eviction
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS seed_resolutions ('
+            'seed_key TEXT PRIMARY KEY, paper_id TEXT, score INTEGER, metadata TEXT, created REAL)'
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+    
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict]) -> str:
+        normalized = {}
+        for k, v in (params or {}).items():
+            if k == 'fields':
+                v = ','.join(sorted(f.strip() for f in str(v).split(',') if f.strip()))
+            normalized[k] = str(v)
+        raw = json.dumps({'url': url, 'params': normalized}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, endpoint: str, url: str, params: Optional[Dict]) -> Optional[Dict]:
+        if self.refresh:
+            self.misses += 1
+            return None
+        
+        key = self.make_key(url, params)
+        now = time.time()
+        ttl = self.ttls.get(endpoint, self.DEFAULT_TTLS['search'])
+        
+        with self._lock:
+            row = self._conn.execute('SELECT body, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[1] > ttl:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+        
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+    
+    def set(self, endpoint: str, url: str, params: Optional[Dict], data: Dict):
+        key = self.make_key(url, params)
+        body = zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        now = time.time()
+        
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, body, size, created, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, body, len(body), now, now)
+            )
+            self._total_bytes += len(body)
+            self._evict()
+            self._conn.commit()
+    
+    @staticmethod
+    def seed_key(seed_info: str, api_base: str = '') -> str:
+        """Normalize a SEED string: case, punctuation and quoting do not matter, word order does."""
+        return api_base + '|' + ' '.join(_TOKEN_RE.findall(seed_info.lower()))
+    
+    def get_seed(self, seed_info: str, api_base: str = '') -> Optional[Tuple[str, int, Dict]]:
+        """Returns (paperId, match score, paper metadata) for a seed previously resolved against `api_base`."""
+        if self.refresh:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT paper_id, score, metadata, created FROM seed_resolutions WHERE seed_key = ?',
+                (self.seed_key(seed_info, api_base),)
+            ).fetchone()
+        if row is None or time.time() - row[3] > self.ttls['seed']:
+            return None
+        return row[0], row[1], json.loads(row[2])
+    
+    def set_seed(self, seed_info: str, paper_id: str, score: int, metadata: Dict, api_base: str = ''):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO seed_resolutions (seed_key, paper_id, score, metadata, created) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (self.seed_key(seed_info, api_base), paper_id, score, json.dumps(metadata, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+    
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                'SELECT key, size FROM responses ORDER BY last_access LIMIT 64'
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for key, size in rows:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+CSV_COLUMNS = [
+    'Query_Group', 'Directive_Type', 'Seed_Paper', 'Filter_Applied', 'Sort_Method',
+    'Title', 'Authors', 'Year', 'Citations', 'BM25_Score', 'Abstract_Summary', 'Link',
+    'Venue', 'DOI', 'Volume', 'Issue', 'Pages', 'Citation_GB', 'Source', 'Relevance_Score'
+]
+
+
+def directive_type_of(paper: Paper) -> str:
+    """Type of the directive a result came from, for the Directive_Type column and the report."""
+    if paper.seed_paper:
+        return 'SEED'
+    return 'IDS' if paper.query_group.startswith('IDS') else 'QUERY'
+
+
+def paper_to_row(paper: Paper) -> List:
+    abstract = paper.abstract
+    abstract_summary = abstract[:200] + '...' if len(abstract) > 200 else abstract
+    
+    return [
+        paper.query_group,
+        directive_type_of(paper),
+        paper.seed_paper,
+        paper.filter_applied,
+        paper.sort_method,
+        paper.title,
+        '; '.join(paper.authors),
+        paper.year,
+        paper.citations,
+        round(paper.bm25_score, 2),
+        abstract_summary,
+        paper.url,
+        paper.venue,
+        paper.doi,
+        paper.volume,
+        paper.issue,
+        paper.pages,
+        format_citation_gbt7714(paper),
+        paper.source,
+        round(paper.relevance_score, 2)
+    ]
+
+
+class StreamingCsvWriter:
+    """
+    Append-only `literature_review_*.csv` writer.
+    
+    Rows are rendered per batch and handed to the OS in a single unbuffered
+    write, so the file on disk always ends on a row boundary and is a valid
+    CSV even while the crawl is still running. The file is created lazily on
+    the first batch and flushed to disk every `flush_every` rows or
+    `flush_interval` seconds, whichever comes first.
+    
+    Args:
+        path: Output CSV path (UTF-8 with BOM, for Excel)
+        flush_every: Rows between fsyncs
+        flush_interval: Maximum seconds between fsyncs
+    """
+    
+    # Papers per `write_papers` call when rewriting a whole table
+    BATCH_SIZE = 500
+    
+    def __init__(self, path: Path, flush_every: int = 200, flush_interval: float = 10.0):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._file = None
+        self._lock = threading.Lock()
+    
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'wb', buffering=0)
+        self._file.write(self._header())
+    
+    @staticmethod
+    def _render(rows: List[List]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    
+    def _header(self) -> bytes:
+        return self._render([CSV_COLUMNS]).encode('utf-8-sig')
+    
+    def _encode(self, papers: List[Paper]) -> bytes:
+        return self._render([paper_to_row(p) for p in papers]).encode('utf-8')
+    
+    def write_papers(self, papers: List[Paper]):
+        if not papers:
+            return
+        block = self._encode(papers)
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(block)
+            self.rows_written += len(papers)
+            self._pending += len(papers)
+            if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+    
+    def _flush_locked(self):
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+    
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+    
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+                self._file.close()
+                self._file = None
+
+
+DICTIONARY_COLUMNS = ('Venue', 'Source', 'Query_Group')
+
+
+def papers_to_arrow(papers: List[Paper]) -> 'pa.Table':
+    """
+    Build a typed Arrow table with the same columns as the CSV output.
+    
+    `Authors` is a list column and `Year` is null when unknown; `Venue`,
+    `Source` and `Query_Group` are dictionary-encoded.
+    """
+    columns = {name: [] for name in CSV_COLUMNS}
+    for paper in papers:
+        row = paper_to_row(paper)
+        for name, value in zip(CSV_COLUMNS, row):
+            columns[name].append(value)
+    columns['Authors'] = [list(p.authors) for p in papers]
+    columns['Year'] = [p.year or None for p in papers]
+    columns['BM25_Score'] = [p.bm25_score for p in papers]
+    columns['Relevance_Score'] = [p.relevance_score for p in papers]
+    
+    types = {
+        'Authors': pa.list_(pa.string()),
+        'Year': pa.int16(),
+        'Citations': pa.int64(),
+        'BM25_Score': pa.float64(),
+        'Relevance_Score': pa.float64(),
+    }
+    arrays = []
+    for name in CSV_COLUMNS:
+        array = pa.array(columns[name], type=types.get(name, pa.string()))
+        if name in DICTIONARY_COLUMNS:
+            array = array.dictionary_encode()
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=CSV_COLUMNS)
+
+
+def write_columnar_table(table: 'pa.Table', path: Path, fmt: str, append: bool = False) -> int:
+    """
+    Write `table` as Parquet or Arrow IPC (uncompressed, so it can be
+    memory-mapped without copies). With `append`, rows already in `path` are
+    kept in front of the new ones. Neither format can be extended in place,
+    so the combined table goes to a temp file that replaces `path`; the old
+    rows are read through a memory map and only their dictionary indices are
+    rewritten. Returns the total row count.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    
+    source = None
+    try:
+        if append and path.exists():
+            if fmt == 'arrow':
+                source = pa.memory_map(str(path), 'r')
+                existing = pa.ipc.open_file(source).read_all()
+            else:
+                existing = pq.read_table(path, memory_map=True)
+            if not existing.schema.equals(table.schema):
+                raise ValueError(f"{path} has a different schema; write to a new file instead")
+            table = pa.concat_tables([existing, table])
+            del existing
+        
+        if fmt == 'arrow':
+            # The IPC file format allows a single dictionary per field across all batches
+            table = table.unify_dictionaries()
+            with pa.OSFile(str(tmp_path), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table, max_chunksize=65536)
+        else:
+            pq.write_table(table, tmp_path, compression='zstd', use_dictionary=list(DICTIONARY_COLUMNS))
+        rows = table.num_rows
+        del table
+    finally:
+        if source is not None:
+            source.close()
+    
+    os.replace(tmp_path, path)
+    return rows
+
+
+class CrawlJournal:
+    """
+    Append-only, crash-safe record of a crawl run.
+    
+    A run directory holds `plan.jsonl` (a header line, then one line per
+    directive as it is parsed) and `journal.jsonl` (one line per completed
+    directive with its filtered papers). Each line is flushed and fsynced
+    before the directive runs or the next one starts, so an interrupted run
+    can be resumed with `--resume <run-dir>` without re-spending requests.
+    
+    Args:
+        run_dir: Directory for this run's plan and journal
+    """
+    
+    PLAN_FILE = 'plan.jsonl'
+    LEGACY_PLAN_FILE = 'plan.json'
+    JOURNAL_FILE = 'journal.jsonl'
+    
+    def __init__(self, run_dir: Path):
+        self.run_dir = Path(run_dir)
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        self.journal_path = self.run_dir / self.JOURNAL_FILE
+        self._lock = threading.Lock()
+        self._terminate_torn_line()
+    
+    def _terminate_torn_line(self):
+        # A crash mid-write leaves a partial line; close it so the next record starts cleanly
+        if self.journal_path.exists() and self.journal_path.stat().st_size > 0:
+            with open(self.journal_path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+    
+    @staticmethod
+    def directive_key(index: int, directive: SearchDirective) -> str:
+        return f"{index}:{directive.directive_type}:{directive.raw_query}"
+    
+    @classmethod
+    def has_plan(cls, run_dir: Path) -> bool:
+        return (Path(run_dir) / cls.PLAN_FILE).exists() or (Path(run_dir) / cls.LEGACY_PLAN_FILE).exists()
+    
+    def _append(self, path: Path, entry: Dict):
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def record_plan(self, directives: Iterator[SearchDirective], query_source: str) -> Iterator[SearchDirective]:
+        """Pass directives through, appending each to the plan before it is handed out for execution."""
+        plan_path = self.run_dir / self.PLAN_FILE
+        plan_path.write_text(json.dumps({
+            'query_source': query_source,
+            'created': datetime.now().isoformat(timespec='seconds')
+        }, ensure_ascii=False) + '\n', encoding='utf-8')
+        for directive in directives:
+            self._append(plan_path, {'directive': directive.to_dict()})
+            yield directive
+        self._append(plan_path, {'complete': True})
+    
+    def load_plan(self) -> Tuple[List[SearchDirective], str]:
+        legacy_path = self.run_dir / self.LEGACY_PLAN_FILE
+        if legacy_path.exists() and not (self.run_dir / self.PLAN_FILE).exists():
+            plan = json.loads(legacy_path.read_text(encoding='utf-8'))
+            directives = [SearchDirective(**d) for d in plan.get('directives', [])]
+            return directives, plan.get('query_source', self.run_dir.name)
+        
+        directives = []
+        query_source = self.run_dir.name
+        complete = False
+        with open(self.run_dir / self.PLAN_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if 'directive' in entry:
+                    directives.append(SearchDirective(**entry['directive']))
+                elif entry.get('complete'):
+                    complete = True
+                else:
+                    query_source = entry.get('query_source', query_source)
+        if not complete:
+            print(f"WARNING: The run was interrupted while its input was still being parsed; "
+                  f"only the {len(directives)} directives read so far will be resumed", file=sys.stderr)
+        return directives, query_source
+    
+    def completed(self) -> Dict[str, List[Paper]]:
+        """Load finished directives, ignoring a torn final line from a crash."""
+        done = {}
+        if not self.journal_path.exists():
+            return done
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done[entry['key']] = [Paper.from_dict(p) for p in entry.get('papers', [])]
+        return done
+    
+    def record(self, index: int, directive: SearchDirective, papers: List[Paper]):
+        entry = {
+            'key': self.directive_key(index, directive),
+            'completed': datetime.now().isoformat(timespec='seconds'),
+            'papers': [p.to_dict() for p in papers]
+        }
+        self._append(self.journal_path, entry)
+
+
+class PaperSpool:
+    """
+    The papers collected by a run, spilled to a scratch SQLite file so that
+    memory does not grow with the size of the crawl. Papers are read back in
+    the order they were appended, or grouped by their deduplication root.
+    
+    Args:
+        path: Scratch file; replaced if it exists and deleted on close
+    """
+    
+    BATCH_SIZE = 500
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+        self._conn = sqlite3.connect(str(self.path))
+        # Scratch data: nothing to recover after a crash
+        self._conn.execute('PRAGMA journal_mode=OFF')
+        self._conn.execute('PRAGMA synchronous=OFF')
+        self._conn.execute('CREATE TABLE papers (idx INTEGER PRIMARY KEY, root INTEGER, data TEXT NOT NULL)')
+        self._count = 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def append(self, papers: List[Paper]):
+        self._conn.executemany(
+            'INSERT INTO papers (idx, data) VALUES (?, ?)',
+            ((self._count + n, json.dumps(p.to_dict(), ensure_ascii=False)) for n, p in enumerate(papers))
+        )
+        self._conn.commit()
+        self._count += len(papers)
+    
+    def set_roots(self, roots: Iterable[int]):
+        """Record each paper's group root (see `PaperDeduplicator.roots`)."""
+        self._conn.executemany('UPDATE papers SET root = ? WHERE idx = ?', ((r, i) for i, r in enumerate(roots)))
+        self._conn.execute('CREATE INDEX IF NOT EXISTS papers_root ON papers (root, idx)')
+        self._conn.commit()
+    
+    def _rows(self, sql: str) -> Iterator[Tuple]:
+        cursor = self._conn.execute(sql)
+        while True:
+            rows = cursor.fetchmany(self.BATCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+    
+    def __iter__(self) -> Iterator[Paper]:
+        for (data,) in self._rows('SELECT data FROM papers ORDER BY idx'):
+            yield Paper.from_dict(json.loads(data))
+    
+    def groups(self) -> Iterator[List[Paper]]:
+        """Yield the papers sharing a root together, in first-seen order of the groups."""
+        group, current = [], None
+        for root, data in self._rows('SELECT root, data FROM papers ORDER BY root, idx'):
+            if root != current and group:
+                yield group
+                group = []
+            current = root
+            group.append(Paper.from_dict(json.loads(data)))
+        if group:
+            yield group
+    
+    def close(self):
+        self._conn.close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+class CorpusStore:
+    """
+    Persistent local corpus of every paper the crawler has fetched.
+    
+    Papers are upserted into SQLite keyed by DOI, else paperId, else
+    normalized title, with an FTS5 index over title and abstract. The indexed
+    text is pre-tokenized with `tokenize()`, so Chinese queries match through
+    the same bigrams as BM25. SEED runs also record which citing papers were
+    returned for a seed, so offline runs can re-filter them locally.
+    
+    Args:
+        db_path: SQLite database file
+    """
+    
+    DIRECTIVE_FIELDS = ('seed_paper', 'filter_applied', 'sort_method', 'is_seed_source',
+                        'query_group', 'bm25_score', 'relevance_score')
+    SORT_COLUMNS = {
+        'citationCount:desc': 'p.citations DESC',
+        'citationCount:asc': 'p.citations ASC',
+        'year:desc': 'p.year DESC',
+        'year:asc': 'p.year ASC',
+    }
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS papers ('
+            '  id INTEGER PRIMARY KEY, key TEXT UNIQUE, paper_id TEXT, doi TEXT,'
+            '  year INTEGER, citations INTEGER, data TEXT, updated REAL);'
+            'CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(title, abstract);'
+            'CREATE TABLE IF NOT EXISTS seed_edges ('
+            '  seed_info TEXT, paper_key TEXT, is_seed INTEGER,'
+            '  PRIMARY KEY (seed_info, paper_key));'
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def paper_key(paper: Paper) -> str:
+        if paper.doi:
+            return f"doi:{paper.doi.lower()}"
+        if paper.paper_id:
+            return f"s2:{paper.paper_id}"
+        return f"title:{' '.join(tokenize(paper.title))}"
+    
+    @staticmethod
+    def seed_key(seed_info: str) -> str:
+        return ' '.join(tokenize(seed_info))
+    
+    def upsert(self, papers: List[Paper]) -> int:
+        now = time.time()
+        with self._lock:
+            for paper in papers:
+                if not paper.title:
+                    continue
+                data = paper.to_dict()
+                for name in self.DIRECTIVE_FIELDS:
+                    data.pop(name, None)
+                key = self.paper_key(paper)
+                self._conn.execute(
+                    'INSERT INTO papers (key, paper_id, doi, year, citations, data, updated) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(key) DO UPDATE SET paper_id = COALESCE(NULLIF(excluded.paper_id, \'\'), paper_id), '
+                    'year = excluded.year, citations = excluded.citations, data = excluded.data, updated = excluded.updated',
+                    (key, paper.paper_id, paper.doi, paper.year, paper.citations,
+                     json.dumps(data, ensure_ascii=False), now)
+                )
+                rowid = self._conn.execute('SELECT id FROM papers WHERE key = ?', (key,)).fetchone()[0]
+                self._conn.execute('DELETE FROM papers_fts WHERE rowid = ?', (rowid,))
+                self._conn.execute(
+                    'INSERT INTO papers_fts (rowid, title, abstract) VALUES (?, ?, ?)',
+                    (rowid, ' '.join(tokenize(paper.title)), ' '.join(tokenize(paper.abstract)))
+                )
+            self._conn.commit()
+        return len(papers)
+    
+    def record_seed(self, seed_info: str, papers: List[Paper]):
+        seed = self.seed_key(seed_info)
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO seed_edges (seed_info, paper_key, is_seed) VALUES (?, ?, ?)',
+                [(seed, self.paper_key(p), 1 if p.is_seed_source else 0) for p in papers if p.title]
+            )
+            self._conn.commit()
+    
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """Translate a plan QUERY (quoted phrases, AND/OR/NOT) into an FTS5 expression."""
+        parts = []
+        for phrase, op, word in re.findall(r'"([^"]*)"|\b(AND|OR|NOT)\b|([^\s"()]+)', query):
+            if op:
+                if parts and parts[-1] not in ('AND', 'OR', 'NOT'):
+                    parts.append(op)
+                continue
+            tokens = tokenize(phrase or word)
+            if tokens:
+                parts.append('"' + ' '.join(tokens) + '"')
+        while parts and parts[-1] in ('AND', 'OR', 'NOT'):
+            parts.pop()
+        return ' '.join(parts)
+    
+    def _load(self, rows) -> List[Paper]:
+        return [Paper.from_dict(json.loads(row[0])) for row in rows]
+    
+    def search(self, query: str, limit: int, sort_by: Optional[str] = None) -> List[Paper]:
+        fts_query = self._fts_query(query)
+        if not fts_query:
+            return []
+        order = self.SORT_COLUMNS.get(sort_by or '', 'bm25(papers_fts)')
+        sql = ('SELECT p.data FROM papers_fts JOIN papers p ON p.id = papers_fts.rowid '
+               f'WHERE papers_fts MATCH ? ORDER BY {order} LIMIT ?')
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, (fts_query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                # Operator soup the translation could not fix: fall back to plain AND of all terms
+                fallback = ' '.join(f'"{t}"' for t in tokenize(query))
+                rows = self._conn.execute(sql, (fallback, limit)).fetchall() if fallback else []
+        return self._load(rows)
+    
+    def search_title(self, title: str, limit: int, sort_by: Optional[str] = None) -> List[Paper]:
+        """Papers whose title equals `title` up to case, punctuation and spacing."""
+        tokens = tokenize(title.replace('"', ' '))
+        if not tokens:
+            return []
+        order = self.SORT_COLUMNS.get(sort_by or '', 'bm25(papers_fts)')
+        sql = ('SELECT p.data FROM papers_fts JOIN papers p ON p.id = papers_fts.rowid '
+               f'WHERE papers_fts MATCH ? ORDER BY {order}')
+        with self._lock:
+            # The phrase match narrows candidates to titles containing it; equality is checked below
+            rows = self._conn.execute(sql, ('title : "' + ' '.join(tokens) + '"',)).fetchall()
+        return [p for p in self._load(rows) if tokenize(p.title) == tokens][:limit]
+    
+    def seed_results(self, seed_info: str) -> List[Paper]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT p.data, e.is_seed FROM seed_edges e JOIN papers p ON p.key = e.paper_key '
+                'WHERE e.seed_info = ? ORDER BY e.is_seed DESC',
+                (self.seed_key(seed_info),)
+            ).fetchall()
+        papers = self._load(rows)
+        for paper, row in zip(papers, rows):
+            paper.is_seed_source = bool(row[1])
+        return papers
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM papers').fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _hash64(text: str) -> int:
+    """Stable 64-bit hash for on-disk lookup keys (unlike hash(), independent of PYTHONHASHSEED)."""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+_term_hash = lru_cache(maxsize=1 << 20)(_hash64)
+
+
+class LocalDataset:
+    """
+    Read-only index over locally downloaded Semantic Scholar dataset shards.
+    
+    `build()` ingests the gzipped JSONL `papers`, `abstracts` and `citations`
+    datasets into a directory of flat files: paper and abstract records as
+    JSONL, and NumPy arrays for corpusId -> record ordinal, hashed DOI /
+    paperId -> ordinal, record byte offsets, per-paper year, citation count
+    and token length, the citation graph as CSR adjacency in both
+    directions, and a title/abstract inverted index (term hash -> postings
+    with term frequencies). Everything is opened memory-mapped, so a lookup
+    only touches the pages it needs and the index can be far larger than RAM.
+    
+    Records are returned in the shape of Graph API paper objects, so they go
+    through `Paper.from_s2` like API responses.
+    
+    Args:
+        index_dir: Directory written by `build()`
+        k1: BM25 term frequency saturation
+        b: BM25 length normalization strength
+    """
+    
+    VERSION = 1
+    ARRAYS = ('ids', 'id_ords', 'keys', 'key_ords', 'offsets', 'abstract_offsets', 'years', 'citations',
+              'doc_len', 'terms', 'term_indptr', 'postings', 'postings_tf',
+              'cited_by_indptr', 'cited_by', 'references_indptr', 'references')
+    SORT_FIELDS = {
+        'citationCount:desc': ('citations', True),
+        'citationCount:asc': ('citations', False),
+        'year:desc': ('years', True),
+        'year:asc': ('years', False),
+    }
+    _QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|\b(AND|OR|NOT)\b|([^\s"()]+)')
+    
+    def __init__(self, index_dir: Path, k1: float = 1.5, b: float = 0.75):
+        self.index_dir = Path(index_dir)
+        meta_path = self.index_dir / 'meta.json'
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No dataset index in {self.index_dir}; build one with --ingest")
+        self.meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        if self.meta.get('version') != self.VERSION:
+            raise ValueError(f"Dataset index in {self.index_dir} has version {self.meta.get('version')}, "
+                             f"expected {self.VERSION}; rebuild it with --ingest")
+        self.k1 = k1
+        self.b = b
+        self.n_docs = self.meta['papers']
+        for name in self.ARRAYS:
+            setattr(self, name, self._load_array(self.index_dir / f'{name}.npy'))
+        self._papers = self._map(self.index_dir / 'papers.jsonl')
+        self._abstracts = self._map(self.index_dir / 'abstracts.jsonl')
+    
+    @staticmethod
+    def _load_array(path: Path) -> 'np.ndarray':
+        try:
+            return np.load(path, mmap_mode='r')
+        except ValueError:
+            # Zero-length arrays cannot be memory-mapped
+            return np.load(path)
+    
+    @staticmethod
+    def _map(path: Path) -> Optional[mmap.mmap]:
+        if not path.exists() or path.stat().st_size == 0:
+            return None
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    @staticmethod
+    def _read_line(mapped: mmap.mmap, offset: int):
+        end = mapped.find(b'\n', offset)
+        return json.loads(mapped[offset:end if end >= 0 else len(mapped)])
+    
+    @staticmethod
+    def _find(sorted_keys: 'np.ndarray', values: 'np.ndarray', key) -> Optional[int]:
+        i = int(np.searchsorted(sorted_keys, key))
+        if i < len(sorted_keys) and sorted_keys[i] == key:
+            return int(values[i])
+        return None
+    
+    @staticmethod
+    def _lookup(sorted_keys: 'np.ndarray', values: 'np.ndarray', queries: 'np.ndarray') -> 'np.ndarray':
+        """Vectorized `_find`: the value for each query, -1 where the key is missing."""
+        if not len(sorted_keys):
+            return np.full(len(queries), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_keys, queries), len(sorted_keys) - 1)
+        return np.where(sorted_keys[pos] == queries, values[pos], -1)
+    
+    def close(self):
+        for mapped in (self._papers, self._abstracts):
+            if mapped is not None:
+                mapped.close()
+    
+    def ordinal(self, paper_id: str) -> Optional[int]:
+        """Record ordinal for a paperId, `CorpusId:` ID or DOI (bare, URL or `DOI:` prefixed)."""
+        normalized = ScholarCrawler._normalize_paper_id(paper_id)
+        prefix, _, value = normalized.partition(':')
+        if prefix.lower() == 'corpusid' and value.isdigit():
+            return self._find(self.ids, self.id_ords, np.int64(int(value)))
+        if prefix.upper() == 'DOI' and value:
+            return self._find(self.keys, self.key_ords, np.uint64(_hash64('doi:' + value.lower())))
+        return self._find(self.keys, self.key_ords, np.uint64(_hash64('s2:' + normalized)))
+    
+    def record(self, ordinal: int) -> Dict:
+        """The paper at `ordinal` as a Graph API paper object, abstract included."""
+        item = self._read_line(self._papers, int(self.offsets[ordinal]))
+        offset = int(self.abstract_offsets[ordinal])
+        if offset >= 0 and self._abstracts is not None:
+            item['abstract'] = self._read_line(self._abstracts, offset)
+        return item
+    
+    def _postings(self, term: str) -> Tuple['np.ndarray', 'np.ndarray']:
+        key = np.uint64(_term_hash(term))
+        i = int(np.searchsorted(self.terms, key))
+        if i < len(self.terms) and self.terms[i] == key:
+            start, end = int(self.term_indptr[i]), int(self.term_indptr[i + 1])
+            return self.postings[start:end], self.postings_tf[start:end]
+        return self.postings[:0], self.postings_tf[:0]
+    
+    def _all_of(self, terms: Iterable[str]) -> 'np.ndarray':
+        # Rarest list first, so every intersection is at most that long
+        lists = sorted((self._postings(t)[0] for t in dict.fromkeys(terms)), key=len)
+        docs = np.asarray(lists[0])
+        for other in lists[1:]:
+            if not len(docs):
+                break
+            docs = np.intersect1d(docs, other, assume_unique=True)
+        return docs
+    
+    def _any_of(self, terms: Iterable[str]) -> 'np.ndarray':
+        lists = [docs for docs in (self._postings(t)[0] for t in dict.fromkeys(terms)) if len(docs)]
+        return np.unique(np.concatenate(lists)) if lists else np.asarray(self.postings[:0])
+    
+    def match(self, query: str) -> Tuple['np.ndarray', List[str]]:
+        """
+        Evaluate a plan QUERY against the inverted index.
+        
+        Adjacent terms are ANDed, AND binds tighter than OR, and NOT excludes
+        the term or phrase that follows. Positions are not indexed, so a
+        quoted phrase matches records containing all of its words.
+        
+        Returns:
+            Tuple of (matching ordinals in ascending order, the query's positive terms)
+        """
+        clauses = [[]]
+        negate = False
+        for phrase, op, word in self._QUERY_TOKEN_RE.findall(query):
+            if op == 'OR':
+                clauses.append([])
+            if op:
+                negate = op == 'NOT'
+                continue
+            terms = tokenize(phrase or word)
+            if terms:
+                clauses[-1].append((negate, terms))
+            negate = False
+        
+        matched = []
+        positive = []
+        for clause in clauses:
+            include = [t for negated, terms in clause if not negated for t in terms]
+            if not include:
+                continue
+            docs = self._all_of(include)
+            for negated, terms in clause:
+                if negated and len(docs):
+                    docs = np.setdiff1d(docs, self._all_of(terms), assume_unique=True)
+            matched.append(docs)
+            positive.extend(include)
+        
+        if not matched:
+            return np.asarray(self.postings[:0]), []
+        docs = matched[0] if len(matched) == 1 else np.unique(np.concatenate(matched))
+        return docs, list(dict.fromkeys(positive))
+    
+    def bm25(self, ordinals: 'np.ndarray', terms: List[str]) -> 'np.ndarray':
+        """BM25 of each record's title + abstract, with IDF and average length taken over the whole dataset."""
+        scores = np.zeros(len(ordinals), dtype=np.float64)
+        if not len(ordinals):
+            return scores
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[ordinals] / (self.meta.get('avgdl') or 1.0))
+        for term in dict.fromkeys(terms):
+            docs, tf = self._postings(term)
+            if not len(docs):
+                continue
+            idf = np.log((self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5) + 1.0)
+            pos = np.minimum(np.searchsorted(docs, ordinals), len(docs) - 1)
+            freq = np.where(docs[pos] == ordinals, tf[pos], 0).astype(np.float64)
+            scores += idf * freq * (self.k1 + 1.0) / (freq + norm)
+        return scores
+    
+    @staticmethod
+    def _top(ordinals: 'np.ndarray', limit: int, *keys: 'np.ndarray') -> 'np.ndarray':
+        """The `limit` ordinals that sort first by `keys` (ascending, most significant first)."""
+        if limit <= 0:
+            return ordinals[:0]
+        if len(ordinals) > limit:
+            keep = np.argpartition(keys[0], limit - 1)[:limit]
+            ordinals = ordinals[keep]
+            keys = tuple(k[keep] for k in keys)
+        return ordinals[np.lexsort(keys[::-1])]
+    
+    def search(self, query: str, limit: int, sort_by: Optional[str] = None, any_term: bool = False) -> List[Dict]:
+        """
+        Top `limit` records for a query, BM25-ranked unless `sort_by` maps to a stored field.
+        
+        By default the query's AND/OR/NOT structure is evaluated by `match()`;
+        with `any_term` every record containing any of its words is a
+        candidate, like relevance search over a free-text SEED string.
+        """
+        if any_term:
+            terms = list(dict.fromkeys(tokenize(query)))
+            ordinals = self._any_of(terms)
+        else:
+            ordinals, terms = self.match(query)
+        if not len(ordinals):
+            return []
+        
+        citations = -self.citations[ordinals].astype(np.float64)
+        if sort_by in self.SORT_FIELDS:
+            name, descending = self.SORT_FIELDS[sort_by]
+            values = getattr(self, name)[ordinals].astype(np.float64)
+            keys = (-values if descending else values, citations)
+        else:
+            keys = (-self.bm25(ordinals, terms), citations)
+        return [self.record(int(o)) for o in self._top(ordinals, limit, *keys)]
+    
+    def iter_linked(self, paper_id: str, direction: str, limit: int) -> Iterator[Dict]:
+        """
+        Stream up to `limit` papers citing (`forward`) or cited by (`backward`)
+        a paper, most cited first. Records are read only as they are consumed.
+        """
+        ordinal = self.ordinal(paper_id)
+        if ordinal is None:
+            return
+        indptr, neighbours = ((self.cited_by_indptr, self.cited_by) if direction == 'forward'
+                              else (self.references_indptr, self.references))
+        linked = np.asarray(neighbours[int(indptr[ordinal]):int(indptr[ordinal + 1])])
+        for o in self._top(linked, limit, -self.citations[linked].astype(np.float64)):
+            yield self.record(int(o))
+    
+    @staticmethod
+    def _shards(dump_dir: Path, name: str) -> List[Path]:
+        folder = dump_dir / name
+        candidates = folder.iterdir() if folder.is_dir() else dump_dir.glob(f'{name}*')
+        return sorted(p for p in candidates if p.is_file() and not p.name.startswith('.'))
+    
+    @staticmethod
+    def _iter_jsonl(paths: List[Path]) -> Iterator[Dict]:
+        for path in paths:
+            opener = gzip.open if path.suffix == '.gz' else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+    
+    @staticmethod
+    def _api_record(raw: Dict) -> Dict:
+        """Convert a `papers` dataset row to the Graph API field names the crawler reads."""
+        url = raw.get('url') or ''
+        # Dataset rows carry the corpusId; the API's paperId is the last segment of the paper URL
+        paper_id = url.rsplit('/', 1)[-1] if '/paper/' in url else f"CorpusId:{raw['corpusid']}"
+        return {
+            'paperId': paper_id,
+            'corpusId': raw['corpusid'],
+            'title': raw.get('title') or '',
+            'authors': [{'name': a.get('name') or ''} for a in raw.get('authors') or []],
+            'year': raw.get('year'),
+            'citationCount': raw.get('citationcount') or 0,
+            'url': url,
+            'venue': raw.get('venue') or '',
+            'publicationDate': raw.get('publicationdate'),
+            'externalIds': {k: v for k, v in (raw.get('externalids') or {}).items() if v},
+            'journal': raw.get('journal'),
+        }
+    
+    @classmethod
+    def build(cls, dump_dir: Path, index_dir: Path, run_size: int = 20_000_000) -> 'LocalDataset':
+        """
+        Ingest dataset shards from `dump_dir` into an index in `index_dir`.
+        
+        Each dataset is read from `<dump_dir>/<name>/` or from files named
+        `<name>*` directly in `dump_dir`, gzipped or plain JSONL. `papers` is
+        required; without `abstracts` only titles are indexed, and without
+        `citations` SEED directives find no citing papers. Every pass streams
+        its input, and postings and citation edges are external-sorted: they
+        are cut into sorted runs of `run_size` entries on disk, which a
+        memory-mapped k-way merge writes into the final arrays. Memory grows
+        with the number of papers (a few bytes each), not with the number of
+        postings or edges.
+        """
+        dump_dir, index_dir = Path(dump_dir), Path(index_dir)
+        shards = {name: cls._shards(dump_dir, name) for name in ('papers', 'abstracts', 'citations')}
+        if not shards['papers']:
+            raise FileNotFoundError(f"No papers shards found in {dump_dir}")
+        print(f"INFO: Ingesting {', '.join(f'{len(v)} {k}' for k, v in shards.items())} shard(s) "
+              f"from {dump_dir}", file=sys.stderr)
+        
+        index_dir.mkdir(parents=True, exist_ok=True)
+        meta_path = index_dir / 'meta.json'
+        if meta_path.exists():
+            # An interrupted rebuild must not leave a half-written index that looks complete
+            meta_path.unlink()
+        tmp_dir = index_dir / 'tmp'
+        tmp_dir.mkdir(exist_ok=True)
+        started = time.perf_counter()
+        
+        n_docs = cls._ingest_papers(shards['papers'], index_dir)
+        n_abstracts = cls._ingest_abstracts(shards['abstracts'], index_dir, n_docs)
+        n_terms, avgdl = cls._build_text_index(index_dir, tmp_dir, n_docs, run_size)
+        n_edges = cls._build_adjacency(shards['citations'], index_dir, tmp_dir, n_docs, run_size)
+        tmp_dir.rmdir()
+        
+        meta = {
+            'version': cls.VERSION,
+            'papers': n_docs,
+            'abstracts': n_abstracts,
+            'citations': n_edges,
+            'terms': n_terms,
+            'avgdl': avgdl,
+            'source': str(dump_dir),
+            'built': datetime.now().isoformat(timespec='seconds'),
+        }
+        meta_path.write_text(json.dumps(meta, indent=2), encoding='utf-8')
+        print(f"INFO: Built dataset index in {index_dir}: {n_docs} papers, {n_abstracts} abstracts, "
+              f"{n_edges} citation edges, {n_terms} terms ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+        return cls(index_dir)
+    
+    @classmethod
+    def _ingest_papers(cls, paths: List[Path], index_dir: Path) -> int:
+        ids, offsets = array('q'), array('q')
+        years, citations = array('h'), array('i')
+        key_hashes, key_ords = array('Q'), array('i')
+        position = 0
+        
+        with open(index_dir / 'papers.jsonl', 'wb') as out:
+            for raw in cls._iter_jsonl(paths):
+                if raw.get('corpusid') is None:
+                    continue
+                item = cls._api_record(raw)
+                ordinal = len(ids)
+                line = json.dumps(item, ensure_ascii=False).encode('utf-8') + b'\n'
+                out.write(line)
+                ids.append(int(raw['corpusid']))
+                offsets.append(position)
+                position += len(line)
+                years.append(min(max(int(item['year'] or 0), 0), 32767))
+                citations.append(min(int(item['citationCount']), 2 ** 31 - 1))
+                
+                doi = item['externalIds'].get('DOI')
+                if doi:
+                    key_hashes.append(_hash64('doi:' + doi.lower()))
+                    key_ords.append(ordinal)
+                if not item['paperId'].startswith('CorpusId:'):
+                    key_hashes.append(_hash64('s2:' + item['paperId']))
+                    key_ords.append(ordinal)
+                
+                if len(ids) % 1_000_000 == 0:
+                    print(f"INFO: Ingested {len(ids)} papers", file=sys.stderr)
+        
+        for name, keys, values in (('ids', np.array(ids, dtype=np.int64), np.arange(len(ids), dtype=np.int32)),
+                                   ('keys', np.array(key_hashes, dtype=np.uint64), np.array(key_ords, dtype=np.int32))):
+            order = np.argsort(keys, kind='stable')
+            np.save(index_dir / f'{name}.npy', keys[order])
+            np.save(index_dir / f"{name[:-1]}_ords.npy", values[order])
+        np.save(index_dir / 'offsets.npy', np.array(offsets, dtype=np.int64))
+        np.save(index_dir / 'years.npy', np.array(years, dtype=np.int16))
+        np.save(index_dir / 'citations.npy', np.array(citations, dtype=np.int32))
+        return len(ids)
+    
+    @classmethod
+    def _ingest_abstracts(cls, paths: List[Path], index_dir: Path, n_docs: int) -> int:
+        ids, id_ords = np.load(index_dir / 'ids.npy'), np.load(index_dir / 'id_ords.npy')
+        abstract_offsets = np.full(n_docs, -1, dtype=np.int64)
+        corpus_ids, offsets = array('q'), array('q')
+        position = 0
+        stored = 0
+        
+        def assign():
+            ordinals = cls._lookup(ids, id_ords, np.array(corpus_ids, dtype=np.int64))
+            found = ordinals >= 0
+            abstract_offsets[ordinals[found]] = np.array(offsets, dtype=np.int64)[found]
+            del corpus_ids[:], offsets[:]
+            return int(found.sum())
+        
+        with open(index_dir / 'abstracts.jsonl', 'wb') as out:
+            for raw in cls._iter_jsonl(paths):
+                abstract = raw.get('abstract')
+                if raw.get('corpusid') is None or not abstract:
+                    continue
+                line = json.dumps(abstract, ensure_ascii=False).encode('utf-8') + b'\n'
+                out.write(line)
+                corpus_ids.append(int(raw['corpusid']))
+                offsets.append(position)
+                position += len(line)
+                if len(corpus_ids) >= 1_000_000:
+                    stored += assign()
+                    print(f"INFO: Ingested {stored} abstracts", file=sys.stderr)
+            stored += assign()
+        
+        np.save(index_dir / 'abstract_offsets.npy', abstract_offsets)
+        return stored
+    
+    @classmethod
+    def _build_text_index(cls, index_dir: Path, tmp_dir: Path, n_docs: int, run_size: int) -> Tuple[int, float]:
+        abstract_offsets = np.load(index_dir / 'abstract_offsets.npy', mmap_mode='r') if n_docs else []
+        abstracts = cls._map(index_dir / 'abstracts.jsonl')
+        # Every document is tokenized once, so the memoized wrapper would only churn its cache
+        tokenize_text = tokenize.__wrapped__
+        doc_len = np.zeros(n_docs, dtype=np.int32)
+        run_terms, run_docs, run_tf = array('Q'), array('i'), array('H')
+        runs = []
+        
+        def flush():
+            terms = np.array(run_terms, dtype=np.uint64)
+            # Documents arrive in ordinal order, so a stable sort keeps each term's postings ascending
+            order = np.argsort(terms, kind='stable')
+            run = tmp_dir / f'run{len(runs)}'
+            np.save(f'{run}_terms.npy', terms[order])
+            np.save(f'{run}_docs.npy', np.array(run_docs, dtype=np.int32)[order])
+            np.save(f'{run}_tf.npy', np.array(run_tf, dtype=np.uint16)[order])
+            runs.append(run)
+            del run_terms[:], run_docs[:], run_tf[:]
+        
+        with open(index_dir / 'papers.jsonl', 'rb') as papers:
+            for ordinal, line in enumerate(papers):
+                text = json.loads(line).get('title') or ''
+                offset = int(abstract_offsets[ordinal])
+                if offset >= 0 and abstracts is not None:
+                    text += ' ' + cls._read_line(abstracts, offset)
+                tokens = tokenize_text(text)
+                doc_len[ordinal] = len(tokens)
+                for term, tf in Counter(tokens).items():
+                    run_terms.append(_term_hash(term))
+                    run_docs.append(ordinal)
+                    run_tf.append(min(tf, 65535))
+                if len(run_terms) >= run_size:
+                    flush()
+                if (ordinal + 1) % 1_000_000 == 0:
+                    print(f"INFO: Indexed text of {ordinal + 1}/{n_docs} papers", file=sys.stderr)
+        if run_terms or not runs:
+            flush()
+        if abstracts is not None:
+            abstracts.close()
+        
+        np.save(index_dir / 'doc_len.npy', doc_len)
+        n_terms = cls._merge_runs(index_dir, tmp_dir, runs, run_size)
+        return n_terms, float(doc_len.mean()) if n_docs else 0.0
+    
+    @staticmethod
+    def _merge_sorted_runs(runs: List[Tuple['np.ndarray', ...]], buffer: int) -> Iterator[Tuple['np.ndarray', ...]]:
+        """
+        k-way merge of memory-mapped runs, each a tuple of columns sorted by
+        its first column (the key).
+        
+        Yields consecutive chunks of the merged order. Each step reads ahead
+        `buffer // k` entries per run and takes every entry up to the
+        smallest last key among those windows, so a step holds about
+        `buffer` entries (plus at most one key's entries from a single run)
+        and a key never straddles two chunks. Equal keys keep run order.
+        """
+        window = max(1, buffer // max(1, len(runs)))
+        positions = [0] * len(runs)
+        while True:
+            live = [i for i, run in enumerate(runs) if positions[i] < len(run[0])]
+            if not live:
+                return
+            bound = min(runs[i][0][min(positions[i] + window, len(runs[i][0])) - 1] for i in live)
+            pieces = []
+            for i in live:
+                keys = runs[i][0]
+                start = positions[i]
+                end = start + int(np.searchsorted(keys[start:], bound, side='right'))
+                if end > start:
+                    pieces.append(tuple(np.asarray(column[start:end]) for column in runs[i]))
+                positions[i] = end
+            if len(pieces) == 1:
+                yield pieces[0]
+                continue
+            merged = [np.concatenate(columns) for columns in zip(*pieces)]
+            order = np.argsort(merged[0], kind='stable')
+            yield tuple(column[order] for column in merged)
+    
+    @staticmethod
+    def _output_array(path: Path, dtype, length: int) -> 'np.ndarray':
+        """A writable memory-mapped .npy file of `length` entries."""
+        if length:
+            return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(length,))
+        np.save(path, np.zeros(0, dtype=dtype))
+        return np.zeros(0, dtype=dtype)
+    
+    @staticmethod
+    def _save_raw(raw_path: Path, path: Path, dtype, length: int):
+        """Copy a raw binary file of `length` entries into a .npy file without loading it."""
+        data = np.memmap(raw_path, dtype=dtype, mode='r', shape=(length,)) if length else np.zeros(0, dtype=dtype)
+        np.save(path, data)
+        del data
+        raw_path.unlink()
+    
+    @staticmethod
+    def _remove_runs(runs: List[Path], parts: Tuple[str, ...]):
+        for run in runs:
+            for part in parts:
+                Path(f'{run}_{part}.npy').unlink()
+    
+    @classmethod
+    def _merge_runs(cls, index_dir: Path, tmp_dir: Path, runs: List[Path], run_size: int) -> int:
+        """
+        Merge sorted postings runs into one term-sorted CSR index.
+        
+        Runs are memory-mapped and merged in bounded steps; postings are
+        written straight into the memory-mapped output, and the vocabulary
+        and offsets are appended to temporary files. Runs hold consecutive
+        ordinal ranges, so taking a term's postings in run order keeps them
+        ascending.
+        """
+        loaded = [tuple(np.load(f'{run}_{part}.npy', mmap_mode='r') for part in ('terms', 'docs', 'tf')) for run in runs]
+        total = sum(len(run[0]) for run in loaded)
+        postings = cls._output_array(index_dir / 'postings.npy', np.int32, total)
+        postings_tf = cls._output_array(index_dir / 'postings_tf.npy', np.uint16, total)
+        
+        vocab_path, indptr_path = tmp_dir / 'terms.bin', tmp_dir / 'term_indptr.bin'
+        written = n_terms = 0
+        with open(vocab_path, 'wb') as vocab_out, open(indptr_path, 'wb') as indptr_out:
+            np.zeros(1, dtype=np.int64).tofile(indptr_out)
+            for terms, docs, tf in cls._merge_sorted_runs(loaded, run_size):
+                n = len(terms)
+                postings[written:written + n] = docs
+                postings_tf[written:written + n] = tf
+                starts = np.flatnonzero(np.concatenate(([True], terms[1:] != terms[:-1])))
+                terms[starts].astype(np.uint64).tofile(vocab_out)
+                (written + np.append(starts[1:], n)).astype(np.int64).tofile(indptr_out)
+                written += n
+                n_terms += len(starts)
+        
+        if total:
+            postings.flush()
+            postings_tf.flush()
+        del postings, postings_tf, loaded
+        cls._save_raw(vocab_path, index_dir / 'terms.npy', np.uint64, n_terms)
+        cls._save_raw(indptr_path, index_dir / 'term_indptr.npy', np.int64, n_terms + 1)
+        cls._remove_runs(runs, ('terms', 'docs', 'tf'))
+        return n_terms
+    
+    @classmethod
+    def _build_adjacency(cls, paths: List[Path], index_dir: Path, tmp_dir: Path, n_docs: int, run_size: int) -> int:
+        """
+        Stream citation edges to a flat file of (citing, cited) ordinals, then
+        build CSR adjacency in both directions: the memory-mapped edge file
+        is cut into sorted runs of `run_size` edges, which are merged.
+        """
+        ids, id_ords = np.load(index_dir / 'ids.npy'), np.load(index_dir / 'id_ords.npy')
+        citing_ids, cited_ids = array('q'), array('q')
+        edges_path = tmp_dir / 'edges.bin'
+        edges = 0
+        
+        with open(edges_path, 'wb') as out:
+            def flush():
+                citing = cls._lookup(ids, id_ords, np.array(citing_ids, dtype=np.int64))
+                cited = cls._lookup(ids, id_ords, np.array(cited_ids, dtype=np.int64))
+                # Edges to papers outside the dump cannot be followed and are dropped
+                keep = (citing >= 0) & (cited >= 0)
+                np.stack([citing[keep], cited[keep]], axis=1).astype(np.int32).tofile(out)
+                del citing_ids[:], cited_ids[:]
+                return int(keep.sum())
+            
+            for raw in cls._iter_jsonl(paths):
+                citing, cited = raw.get('citingcorpusid'), raw.get('citedcorpusid')
+                if citing is None or cited is None:
+                    continue
+                citing_ids.append(int(citing))
+                cited_ids.append(int(cited))
+                if len(citing_ids) >= 1_000_000:
+                    edges += flush()
+                    print(f"INFO: Ingested {edges} citation edges", file=sys.stderr)
+            edges += flush()
+        del ids, id_ords
+        
+        pairs = np.memmap(edges_path, dtype=np.int32, mode='r', shape=(edges, 2)) if edges else np.zeros((0, 2), np.int32)
+        for name, source, target in (('cited_by', 1, 0), ('references', 0, 1)):
+            runs = []
+            for start in range(0, edges, run_size):
+                chunk = np.asarray(pairs[start:start + run_size])
+                order = np.argsort(chunk[:, source], kind='stable')
+                run = tmp_dir / f'{name}{len(runs)}'
+                np.save(f'{run}_keys.npy', chunk[order, source])
+                np.save(f'{run}_values.npy', chunk[order, target])
+                runs.append(run)
+            
+            loaded = [tuple(np.load(f'{run}_{part}.npy', mmap_mode='r') for part in ('keys', 'values')) for run in runs]
+            neighbours = cls._output_array(index_dir / f'{name}.npy', np.int32, edges)
+            degree = np.zeros(n_docs, dtype=np.int64)
+            written = 0
+            for keys, values in cls._merge_sorted_runs(loaded, run_size):
+                neighbours[written:written + len(values)] = values
+                written += len(values)
+                unique, counts = np.unique(keys, return_counts=True)
+                degree[unique] += counts
+            if edges:
+                neighbours.flush()
+            del neighbours, loaded
+            np.save(index_dir / f'{name}_indptr.npy', np.concatenate(([0], np.cumsum(degree))).astype(np.int64))
+            cls._remove_runs(runs, ('keys', 'values'))
+        del pairs
+        edges_path.unlink()
+        return edges
+
+
+def map_sort_value(sort_value: Optional[str]) -> Optional[str]:
+    """
+    Map SORT tag values to Semantic Scholar API sort parameters.
+    
+    Args:
+        sort_value: SORT tag value from directive (citation, relevance, influence, recency)
+    
+    Returns:
+        Semantic Scholar API sort parameter string
+    """
+    if not sort_value:
+        return None
+    
+    sort_mapping = {
+        'citation': 'citationCount:desc',
+        'relevance': None,
+        'influence': 'citationCount:desc',
+        'recency': 'year:desc'
+    }
+    
+    return sort_mapping.get(sort_value.lower(), None)
+
+
+_THESIS_KEYWORDS = ('thesis', 'dissertation', '博士', '硕士', '学位论文')
+_CONFERENCE_KEYWORDS = ('conference', 'proceedings', 'workshop', 'symposium', '会议', '研讨会')
+_BOOK_KEYWORDS = ('press', 'publisher', '出版社')
+_HAN_RE = re.compile('[\u4e00-\u9fff]')
+# Lowercase particles that stay with the family name ("Johannes van der Waals")
+_NAME_PARTICLES = frozenset(('van', 'von', 'der', 'den', 'de', 'del', 'della', 'da', 'di', 'dos', 'du', 'la', 'le', 'ter'))
+
+
+@lru_cache(maxsize=65536)
+def venue_type(venue: str) -> str:
+    """
+    Document type implied by a venue name: D (thesis), C (conference),
+    M (book) or J (journal, the default).
+    
+    Memoized: a large library repeats a few thousand venues across all of
+    its papers.
+    """
+    venue = venue.lower()
+    if any(kw in venue for kw in _THESIS_KEYWORDS):
+        return 'D'
+    if any(kw in venue for kw in _CONFERENCE_KEYWORDS):
+        return 'C'
+    if any(kw in venue for kw in _BOOK_KEYWORDS):
+        return 'M'
+    return 'J'
+
+
+def publication_type(paper: Paper) -> str:
+    """GB/T 7714 document type of a paper; a thesis keyword in the title overrides the venue."""
+    title = paper.title.lower()
+    if any(kw in title for kw in _THESIS_KEYWORDS):
+        return 'D'
+    return venue_type(paper.venue)
+
+
+@lru_cache(maxsize=262144)
+def split_author_name(name: str) -> Tuple[str, str]:
+    """
+    Split a display name into (family, given).
+    
+    Semantic Scholar names are in "Given Family" order; "Family, Given" is
+    honored as written. Chinese names and single words are all family name,
+    and lowercase particles stay with the family name.
+    """
+    name = ' '.join(name.split())
+    if _HAN_RE.search(name):
+        return name, ''
+    if ',' in name:
+        family, _, given = name.partition(',')
+        return family.strip(), given.strip()
+    parts = name.split(' ')
+    start = len(parts) - 1
+    while start > 1 and parts[start - 1] in _NAME_PARTICLES:
+        start -= 1
+    return ' '.join(parts[start:]), ' '.join(parts[:start])
+
+
+@lru_cache(maxsize=65536)
+def name_initials(given: str) -> str:
+    """Initials of given names: "George Em" -> "G. E.", "Jean-Pierre" -> "J.-P."."""
+    words = (word.split('-') for word in given.replace('.', ' ').split())
+    return ' '.join('-'.join(part[0].upper() + '.' for part in word if part) for word in words)
+
+
+def _page_range(pages: str) -> Tuple[str, str]:
+    first, _, last = pages.replace('–', '-').partition('-')
+    return first.strip(), last.strip('- ')
+
+
+def _one_line(text: str) -> str:
+    return ' '.join(text.split()) if '\n' in text or '\r' in text else text
+
+
+class CitationFormatter:
+    """
+    Base class for citation styles; register subclasses in `CITATION_STYLES`.
+    
+    Subclasses implement `format()` for one paper. Author names and venue
+    types go through the memoized helpers above, so formatting a library
+    costs string assembly, not re-parsing the same names and venues for
+    every entry. Formatters may keep per-file state (BibTeX keys), so use
+    one instance per output file.
+    """
+    
+    name = ''
+    # Appended to `references_<timestamp>` for export files
+    suffix = '.txt'
+    
+    def format(self, paper: Paper) -> str:
+        raise NotImplementedError
+    
+    def format_many(self, papers: Iterable[Paper]) -> List[str]:
+        format_one = self.format
+        return [format_one(p) for p in papers]
+    
+    def render(self, papers: Iterable[Paper]) -> str:
+        """Entries for a batch of papers as file content, one entry per line or block."""
+        return ''.join(entry + '\n' for entry in self.format_many(papers))
+
+
+class GBT7714Formatter(CitationFormatter):
+    """
+    GB/T 7714-2015 references: journal articles [J], conference papers [C],
+    books [M] and theses [D]. Lists the first three authors (family name
+    first, then initials) followed by "et al" or "等".
+    """
+    
+    name = 'gbt7714'
+    suffix = '_gbt7714.txt'
+    
+    @staticmethod
+    @lru_cache(maxsize=262144)
+    def format_author(name: str) -> str:
+        family, given = split_author_name(name)
+        if not given:
+            return family
+        return f"{family} {name_initials(given).replace(' ', '')}"
+    
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def format_authors(authors: Tuple[str, ...]) -> str:
+        result = ', '.join(filter(None, map(GBT7714Formatter.format_author, authors[:3])))
+        if len(authors) > 3:
+            result += ', 等' if _HAN_RE.search(authors[0]) else ', et al'
+        return result
+    
+    def format(self, paper: Paper) -> str:
+        pub_type = publication_type(paper)
+        parts = []
+        
+        if paper.authors:
+            authors = self.format_authors(paper.authors)
+            if authors:
+                parts.append(authors)
+        
+        if paper.title:
+            parts.append(f"{paper.title}[{pub_type}]")
+        
+        if paper.venue:
+            if pub_type in ('M', 'D'):
+                parts.append(paper.venue)
+            else:
+                venue_parts = [paper.venue]
+                if paper.year:
+                    venue_parts.append(str(paper.year))
+                if paper.volume:
+                    venue_parts.append(f"{paper.volume}({paper.issue})" if paper.issue else paper.volume)
+                if paper.pages:
+                    venue_parts.append(paper.pages)
+                parts.append(', '.join(venue_parts))
+        elif paper.year:
+            parts.append(str(paper.year))
+        
+        if paper.doi:
+            parts.append(f"https://doi.org/{paper.doi}")
+        
+        return '. '.join(parts)
+
+
+class APAFormatter(CitationFormatter):
+    """APA 7th edition references as plain text (no italics)."""
+    
+    name = 'apa'
+    suffix = '_apa.txt'
+    
+    @staticmethod
+    @lru_cache(maxsize=262144)
+    def format_author(name: str) -> str:
+        family, given = split_author_name(name)
+        initials = name_initials(given) if given else ''
+        return f"{family}, {initials}" if initials else family
+    
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def format_authors(authors: Tuple[str, ...]) -> str:
+        names = [n for n in map(APAFormatter.format_author, authors) if n]
+        if len(names) <= 1:
+            return ''.join(names)
+        if len(names) > 20:
+            # 21 or more: the first nineteen, an ellipsis, then the last
+            return ', '.join(names[:19]) + ', . . . ' + names[-1]
+        return ', '.join(names[:-1]) + ', & ' + names[-1]
+    
+    def format(self, paper: Paper) -> str:
+        pub_type = publication_type(paper)
+        venue = paper.venue
+        title = paper.title.rstrip('.') if pub_type == 'D' else paper.title
+        if pub_type == 'D':
+            degree = "Master's thesis" if any(kw in (paper.title + venue).lower() for kw in ('master', '硕士')) \
+                else 'Doctoral dissertation'
+            title += f" [{degree}, {venue}]" if venue else f" [{degree}]"
+        if title and title[-1] not in '.?!':
+            title += '.'
+        year = f"({paper.year})." if paper.year else "(n.d.)."
+        
+        authors = self.format_authors(paper.authors)
+        if authors:
+            parts = [authors if authors.endswith('.') else authors + '.', year, title]
+        else:
+            parts = [title, year]
+        
+        pages = paper.pages.replace('-', '–')
+        if pub_type == 'J' and venue:
+            source = venue
+            if paper.volume:
+                source += f", {paper.volume}({paper.issue})" if paper.issue else f", {paper.volume}"
+            if pages:
+                source += f", {pages}"
+            parts.append(source + '.')
+        elif pub_type == 'C' and venue:
+            parts.append(f"In {venue} (pp. {pages})." if pages else f"In {venue}.")
+        elif pub_type == 'M' and venue:
+            parts.append(venue + '.')
+        
+        if paper.doi:
+            parts.append(f"https://doi.org/{paper.doi}")
+        elif paper.url:
+            parts.append(paper.url)
+        return ' '.join(p for p in parts if p)
+
+
+_BIBTEX_ESCAPES = {
+    '\\': r'\textbackslash{}', '{': r'\{', '}': r'\}', '&': r'\&', '%': r'\%', '$': r'\$',
+    '#': r'\#', '_': r'\_', '~': r'\textasciitilde{}', '^': r'\textasciicircum{}',
+}
+_BIBTEX_SPECIAL_RE = re.compile(r'[\\{}&%$#_~^]')
+
+
+def bibtex_escape(text: str) -> str:
+    return _BIBTEX_SPECIAL_RE.sub(lambda m: _BIBTEX_ESCAPES[m.group()], text) if _BIBTEX_SPECIAL_RE.search(text) else text
+
+
+class BibTeXFormatter(CitationFormatter):
+    """
+    BibTeX entries with citation keys of the form `familyYYYYword`, made
+    unique within the file by appending a, b, c, ...
+    
+    Text fields are escaped for LaTeX; `doi` and `url` are left verbatim.
+    """
+    
+    name = 'bibtex'
+    suffix = '.bib'
+    ENTRY_TYPES = {'J': 'article', 'C': 'inproceedings', 'M': 'book', 'D': 'phdthesis'}
+    VENUE_FIELDS = {'J': 'journal', 'C': 'booktitle', 'M': 'publisher', 'D': 'school'}
+    _KEY_STRIP_RE = re.compile(r'[^a-z0-9]+')
+    
+    def __init__(self):
+        self._keys = set()
+        self._next_suffix: Dict[str, int] = {}
+    
+    @staticmethod
+    @lru_cache(maxsize=262144)
+    def format_author(name: str) -> str:
+        family, given = split_author_name(name)
+        return bibtex_escape(f"{family}, {given}" if given else family)
+    
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def format_authors(authors: Tuple[str, ...]) -> str:
+        return ' and '.join(filter(None, map(BibTeXFormatter.format_author, authors)))
+    
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def _key_part(text: str) -> str:
+        ascii_text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+        return BibTeXFormatter._KEY_STRIP_RE.sub('', ascii_text.lower())
+    
+    def citation_key(self, paper: Paper) -> str:
+        family = next((self._key_part(split_author_name(a)[0]) for a in paper.authors if a.strip()), '')
+        word = next((w for w in map(self._key_part, paper.title.split()[:4]) if len(w) > 3), '')
+        stem = f"{family or 'anon'}{paper.year or ''}{word}"
+        
+        n = self._next_suffix.get(stem, 0)
+        key = stem
+        while key in self._keys:
+            n += 1
+            key, m = stem, n
+            suffix = ''
+            while m:
+                m, r = divmod(m - 1, 26)
+                suffix = chr(ord('a') + r) + suffix
+            key += suffix
+        self._next_suffix[stem] = n
+        self._keys.add(key)
+        return key
+    
+    def format(self, paper: Paper) -> str:
+        pub_type = publication_type(paper)
+        fields = []
+        authors = self.format_authors(paper.authors)
+        if authors:
+            fields.append(('author', authors))
+        if paper.title:
+            fields.append(('title', bibtex_escape(_one_line(paper.title))))
+        if paper.venue:
+            fields.append((self.VENUE_FIELDS[pub_type], bibtex_escape(paper.venue)))
+        if paper.year:
+            fields.append(('year', str(paper.year)))
+        if paper.volume:
+            fields.append(('volume', bibtex_escape(paper.volume)))
+        if paper.issue:
+            fields.append(('number', bibtex_escape(paper.issue)))
+        if paper.pages:
+            first, last = _page_range(paper.pages)
+            fields.append(('pages', bibtex_escape(f"{first}--{last}" if last else first)))
+        if paper.doi:
+            fields.append(('doi', paper.doi))
+        if paper.url:
+            fields.append(('url', paper.url))
+        if paper.abstract:
+            fields.append(('abstract', bibtex_escape(_one_line(paper.abstract))))
+        
+        body = ''.join(f"  {name} = {{{value}}},\n" for name, value in fields)
+        return f"@{self.ENTRY_TYPES[pub_type]}{{{self.citation_key(paper)},\n{body}}}\n"
+
+
+class RISFormatter(CitationFormatter):
+    """RIS records (`TY` ... `ER`), as imported by Zotero, EndNote and Mendeley."""
+    
+    name = 'ris'
+    suffix = '.ris'
+    TYPES = {'J': 'JOUR', 'C': 'CPAPER', 'M': 'BOOK', 'D': 'THES'}
+    VENUE_TAGS = {'J': 'T2', 'C': 'T2', 'M': 'PB', 'D': 'PB'}
+    
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def format_authors(authors: Tuple[str, ...]) -> str:
+        lines = []
+        for name in authors:
+            family, given = split_author_name(name)
+            if not family:
+                continue
+            lines.append(f"AU  - {family}, {given}\n" if given else f"AU  - {family}\n")
+        return ''.join(lines)
+    
+    def format(self, paper: Paper) -> str:
+        pub_type = publication_type(paper)
+        lines = [f"TY  - {self.TYPES[pub_type]}\n"]
+        lines.append(self.format_authors(paper.authors))
+        if paper.title:
+            lines.append(f"TI  - {_one_line(paper.title)}\n")
+        if paper.venue:
+            lines.append(f"{self.VENUE_TAGS[pub_type]}  - {paper.venue}\n")
+        if paper.year:
+            lines.append(f"PY  - {paper.year}\n")
+        if paper.volume:
+            lines.append(f"VL  - {paper.volume}\n")
+        if paper.issue:
+            lines.append(f"IS  - {paper.issue}\n")
+        if paper.pages:
+            first, last = _page_range(paper.pages)
+            lines.append(f"SP  - {first}\n")
+            if last:
+                lines.append(f"EP  - {last}\n")
+        if paper.doi:
+            lines.append(f"DO  - {paper.doi}\n")
+        if paper.url:
+            lines.append(f"UR  - {paper.url}\n")
+        if paper.abstract:
+            lines.append(f"AB  - {_one_line(paper.abstract)}\n")
+        lines.append("ER  - \n")
+        return ''.join(lines)
+
+
+CITATION_STYLES = {
+    cls.name: cls for cls in (GBT7714Formatter, APAFormatter, BibTeXFormatter, RISFormatter)
+}
+_GBT7714 = GBT7714Formatter()
+
+
+class StreamingCitationWriter(StreamingCsvWriter):
+    """
+    Append-only `references_*` writer for one citation style (`.bib`, `.ris`,
+    or plain-text GB/T 7714 / APA lists), streamed alongside the CSV.
+    
+    Same lazy creation, entry-boundary writes and fsync policy as
+    `StreamingCsvWriter`; entries are rendered per batch with the style's
+    `format_many()`. Files are UTF-8 without a BOM.
+    
+    Args:
+        path: Output path
+        style: Key in `CITATION_STYLES`
+    """
+    
+    def __init__(self, path: Path, style: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self.style = style
+        self.formatter = CITATION_STYLES[style]()
+        # BibTeX keys are allocated in render order
+        self._render_lock = threading.Lock()
+    
+    def _header(self) -> bytes:
+        return b''
+    
+    def _encode(self, papers: List[Paper]) -> bytes:
+        with self._render_lock:
+            return self.formatter.render(papers).encode('utf-8')
+
+
+def format_citation_gbt7714(paper: Paper) -> str:
+    """
+    Format a paper citation in GB/T 7714-2015 standard format.
+    
+    Thin wrapper over `GBT7714Formatter`, which backs the `Citation_GB`
+    CSV column; see `CITATION_STYLES` for the other styles.
+    """
+    return _GBT7714.format(paper)
+
+
+class ScholarCrawler:
+    SEMANTIC_SCHOLAR_BASE = "https://api.semanticscholar.org/graph/v1"
+    SEMANTIC_SCHOLAR_API = SEMANTIC_SCHOLAR_BASE + "/paper/search"
+    SEMANTIC_SCHOLAR_BULK_API = SEMANTIC_SCHOLAR_BASE + "/paper/search/bulk"
+    SEMANTIC_SCHOLAR_CITATIONS_API = SEMANTIC_SCHOLAR_BASE + "/paper/{paper_id}/citations"
+    SEMANTIC_SCHOLAR_REFERENCES_API = SEMANTIC_SCHOLAR_BASE + "/paper/{paper_id}/references"
+    SEMANTIC_SCHOLAR_PAPER_API = SEMANTIC_SCHOLAR_BASE + "/paper/{paper_id}"
+    SEMANTIC_SCHOLAR_BATCH_API = SEMANTIC_SCHOLAR_BASE + "/paper/batch"
+    BATCH_SIZE = IDS_BATCH_SIZE
+    # scholarly's search iterator fetches Google Scholar results ten to a page
+    GS_PAGE_SIZE = 10
+    # Local equivalents of the API sort parameters, for searches shared by directives with different SORTs
+    LOCAL_SORT_KEYS = {
+        'citationCount:desc': lambda p: -p.citations,
+        'citationCount:asc': lambda p: p.citations,
+        'year:desc': lambda p: -p.year,
+        'year:asc': lambda p: p.year,
+    }
+    # The bulk endpoint sorts by publicationDate rather than year
+    BULK_SORTS = {
+        'citationCount:desc': 'citationCount:desc',
+        'citationCount:asc': 'citationCount:asc',
+        'year:desc': 'publicationDate:desc',
+        'year:asc': 'publicationDate:asc',
+    }
+    CITATIONS_PAGE_LIMIT = 1000
+    
+    # (start, min, max) requests/s for the adaptive limiter. The ceiling is the documented
+    # budget of each tier; probing starts at half of it and backs off to a tenth
+    RATE_TIERS = {
+        'anonymous': (S2_WINDOW_REQUESTS / S2_WINDOW_SECONDS / 2, S2_WINDOW_REQUESTS / S2_WINDOW_SECONDS / 10,
+                      S2_WINDOW_REQUESTS / S2_WINDOW_SECONDS),
+        'api_key': (S2_KEYED_RPS / 2, S2_KEYED_RPS / 10, S2_KEYED_RPS),
+    }
+    
+    def __init__(self, delay_range: Optional[Tuple[float, float]] = None, max_retries: int = 3, 
+                 api_key: Optional[str] = None,
+                 rate_limiter: Optional[TokenBucketRateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 max_citation_pages: int = 10,
+                 request_timeout: float = 30.0,
+                 request_budget: float = 120.0,
+                 pool_size: int = 10,
+                 corpus_stats: Optional[CorpusStats] = None,
+                 corpus_store: Optional[CorpusStore] = None,
+                 offline: bool = False,
+                 snowball: Optional[SnowballConfig] = None,
+                 api_base: Optional[str] = None,
+                 rate_state: Optional[RateLimitState] = None,
+                 max_rate: Optional[float] = None,
+                 speculative_fallback: bool = False,
+                 bulk: bool = False,
+                 bulk_cap: int = 10000,
+                 dataset: Optional[LocalDataset] = None):
+        self.delay_range = delay_range
+        self.speculative_fallback = speculative_fallback
+        self.bulk = bulk
+        self.bulk_cap = bulk_cap
+        # Local dataset backend: QUERYs, seed resolution, citation links and ID lookups never touch the network
+        self.dataset = dataset
+        self.api_base = (api_base or self.SEMANTIC_SCHOLAR_BASE).rstrip('/')
+        if api_base:
+            # Instance attributes shadow the class URLs, e.g. to point a run at a local mock server
+            base = api_base.rstrip('/')
+            for name in ('SEMANTIC_SCHOLAR_API', 'SEMANTIC_SCHOLAR_BULK_API', 'SEMANTIC_SCHOLAR_CITATIONS_API',
+                         'SEMANTIC_SCHOLAR_REFERENCES_API', 'SEMANTIC_SCHOLAR_PAPER_API',
+                         'SEMANTIC_SCHOLAR_BATCH_API'):
+                setattr(self, name, getattr(self, name).replace(self.SEMANTIC_SCHOLAR_BASE, base, 1))
+        self.snowball = snowball
+        self.pool_size = pool_size
+        self.corpus_stats = corpus_stats
+        self.corpus_store = corpus_store
+        self.offline = offline
+        self.max_retries = max_retries
+        self.cache = cache
+        self.max_citation_pages = max_citation_pages
+        
+        self.api_key = api_key or os.environ.get('SEMANTIC_SCHOLAR_API_KEY', '')
+        
+        if not self.api_key:
+            config_path = Path(__file__).parent.parent / 'config.json'
+            if config_path.exists():
+                try:
+                    with open(config_path, 'r', encoding='utf-8') as f:
+                        config = json.load(f)
+                        self.api_key = config.get('semantic_scholar_api_key', '')
+                except Exception:
+                    pass
+        
+        # One bucket for all in-flight requests. An explicit delay range pins the rate
+        # (the slowest configured delay defines the budget); otherwise it adapts to 429s
+        self.rate_state = rate_state
+        self._rate_key = RateLimitState.tier_key(self.api_base, self.api_key)
+        # The real API also counts requests per 5-minute window; mock servers and mirrors set their own limits
+        window = (S2_WINDOW_REQUESTS, S2_WINDOW_SECONDS) if api_base is None and dataset is None else None
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
+        elif delay_range is not None or dataset is not None:
+            # A local dataset never hits the network, so there is no rate to learn
+            self.rate_limiter = TokenBucketRateLimiter(rate=1.0 / max((delay_range or (0, 1.1))[1], 0.001),
+                                                       capacity=1.0, window=window)
+        else:
+            tier = 'api_key' if self.api_key else 'anonymous'
+            start, min_rate, tier_max = self.RATE_TIERS[tier]
+            ceiling = max_rate or tier_max
+            learned = rate_state.load(self._rate_key) if rate_state else None
+            # Steps scale with the ceiling, so every tier reaches it in 20 successes (5 in slow start)
+            self.rate_limiter = AdaptiveRateLimiter(rate=learned or start, min_rate=min_rate, max_rate=ceiling,
+                                                    increase=ceiling / 20,
+                                                    slow_start=0.0 if learned else ceiling / 5,
+                                                    window=window)
+            origin = "learned in a previous run" if learned else f"{tier} tier default"
+            print(f"INFO: Adaptive rate limit starting at {self.rate_limiter.rate:.2f} requests/s ({origin}), "
+                  f"floor {min_rate:.2f}/s, ceiling {self.rate_limiter.max_rate:.2f}/s"
+                  f"{' (--max-rate)' if max_rate else ''}", file=sys.stderr)
+        
+        self.transport = None
+        if REQUESTS_AVAILABLE:
+            # Every attempt, including retries, draws from the shared rate limiter
+            self.transport = HttpTransport(
+                max_retries=max_retries,
+                read_timeout=request_timeout,
+                total_timeout=request_budget,
+                pool_size=pool_size,
+                before_request=self._apply_delay,
+                on_response=getattr(self.rate_limiter, 'feedback', None)
+            )
+        
+        self.user_agents = [
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        ]
+        
+        if self.api_key:
+            limiter = self.rate_limiter
+            print(f"INFO: Semantic Scholar API key configured (keyed rate tier: starting at {limiter.rate:.2f} "
+                  f"requests/s, at most {getattr(limiter, 'max_rate', limiter.rate):.2f}/s)", file=sys.stderr)
+        
+        # Configured on the first Google Scholar search, so importing scholarly is deferred until then
+        self._scholarly_ready = None
+        # Single worker: speculative Google Scholar queries stay serialized like sequential ones
+        self._gs_executor = None
+        self._gs_lock = threading.Lock()
+        self._gs_cancels = set()
+        
+        # Request coalescing: identical requests in flight, and work shared by planned directives
+        self._inflight: Dict[str, 'Future'] = {}
+        self._inflight_lock = threading.Lock()
+        # id(directive) -> (directive, key, work); holding the directive keeps its id from being reused
+        self._planned: Dict[int, Tuple[SearchDirective, Tuple[str, str], PlannedWork]] = {}
+        # The planned (key, work) of the directive running on this thread
+        self._local = threading.local()
+    
+    def _setup_scholarly(self) -> bool:
+        if self._scholarly_ready is None:
+            try:
+                scholarly.set_timeout(30)
+                scholarly.set_retries(2)
+                self._scholarly_ready = True
+            except ImportError as e:
+                print(f"WARNING: scholarly could not be imported, Google Scholar disabled: {e}", file=sys.stderr)
+                self._scholarly_ready = False
+            except Exception as e:
+                print(f"WARNING: Failed to setup scholarly: {e}", file=sys.stderr)
+                self._scholarly_ready = True
+        return self._scholarly_ready
+    
+    def _apply_delay(self):
+        self.rate_limiter.acquire()
+    
+    def close(self):
+        """Stop the speculative Google Scholar worker: pending queries are dropped, a running one stops at its next pause."""
+        with self._gs_lock:
+            executor, self._gs_executor = self._gs_executor, None
+            for cancel in self._gs_cancels:
+                cancel.set()
+        if executor is not None:
+            shutdown_executor(executor, wait=False)
+    
+    def save_rate_state(self):
+        """Persist the rate the adaptive limiter converged to, for the next run to start from."""
+        if self.rate_state and isinstance(self.rate_limiter, AdaptiveRateLimiter):
+            self.rate_state.save(self._rate_key, self.rate_limiter.rate)
+            print(f"INFO: Learned request rate {self.rate_limiter.rate:.2f}/s saved to {self.rate_state.path}", file=sys.stderr)
+    
+    def _get_headers(self) -> Dict[str, str]:
+        headers = {'User-Agent': random.choice(self.user_agents)}
+        if self.api_key:
+            headers['x-api-key'] = self.api_key
+        return headers
+    
+    def _request_json(self, endpoint: str, url: str, params: Dict,
+                      json_body: Optional[Dict] = None) -> Tuple[int, Optional[Dict]]:
+        """
+        Call a Semantic Scholar endpoint, serving from the response cache when possible.
+        
+        Cache hits skip the rate limiter entirely. Only 200 responses are cached.
+        
+        Args:
+            endpoint: Endpoint class used for TTL lookup (search, bulk, paper, citations, batch)
+            url: Fully formatted request URL
+            params: Query parameters
+            json_body: JSON payload; when given the request is sent as POST
+        
+        Returns:
+            Tuple of (status_code, parsed JSON body or None)
+        """
+        cache_params = params
+        if json_body is not None:
+            cache_params = dict(params, _body=json.dumps(json_body, sort_keys=True))
+        
+        if self.cache:
+            cached = self.cache.get(endpoint, url, cache_params)
+            CACHE_REQUESTS.inc(endpoint=endpoint, result='hit' if cached is not None else 'miss')
+            if cached is not None:
+                return 200, cached
+        
+        # An identical request already in flight on another thread answers this one too
+        key = ResponseCache.make_key(url, cache_params)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                from concurrent.futures import Future
+                future = self._inflight[key] = Future()
+        if not owner:
+            REQUESTS_COALESCED.inc(endpoint=endpoint)
+            return future.result()
+        
+        try:
+            result = self._send_request(endpoint, url, params, json_body, cache_params)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+    
+    def _send_request(self, endpoint: str, url: str, params: Dict, json_body: Optional[Dict],
+                      cache_params: Dict) -> Tuple[int, Optional[Dict]]:
+        if json_body is not None:
+            response = self.transport.request('POST', url, endpoint=endpoint, params=params, json=json_body,
+                                              headers=self._get_headers())
+        else:
+            response = self.transport.request('GET', url, endpoint=endpoint, params=params, headers=self._get_headers())
+        if response.status_code != 200:
+            return response.status_code, None
+        
+        data = response.json()
+        if self.cache:
+            self.cache.set(endpoint, url, cache_params, data)
+        return 200, data
+    
+    _normalize_paper_id = staticmethod(normalize_paper_id)
+    
+    def iter_citations(self, paper_id: str, page_size: int = 100, max_pages: int = 10,
+                       fields: str = None) -> Iterator[Dict]:
+        """
+        Stream papers citing `paper_id`, following `offset`/`next` pagination.
+        
+        Pages are requested lazily, so a consumer that stops iterating early
+        never pays for the remaining pages of a highly cited seed.
+        
+        Args:
+            paper_id: Semantic Scholar paperId of the cited paper
+            page_size: Citations per request (API maximum is 1000)
+            max_pages: Hard cap on the number of page requests
+            fields: Comma-separated field list (default: PAPER_FIELDS)
+        
+        Yields:
+            Raw `citingPaper` objects from the citations endpoint
+        """
+        return self._iter_linked_papers('citations', self.SEMANTIC_SCHOLAR_CITATIONS_API, 'citingPaper',
+                                        paper_id, page_size, max_pages, fields)
+    
+    def iter_references(self, paper_id: str, page_size: int = 100, max_pages: int = 10,
+                        fields: str = None) -> Iterator[Dict]:
+        """Stream papers cited by `paper_id`; the backward counterpart of `iter_citations`."""
+        return self._iter_linked_papers('references', self.SEMANTIC_SCHOLAR_REFERENCES_API, 'citedPaper',
+                                        paper_id, page_size, max_pages, fields)
+    
+    def _iter_linked_papers(self, endpoint: str, url_template: str, item_key: str, paper_id: str,
+                            page_size: int, max_pages: int, fields: Optional[str]) -> Iterator[Dict]:
+        if self.dataset is not None:
+            yield from self.dataset.iter_linked(paper_id, 'forward' if endpoint == 'citations' else 'backward',
+                                                page_size * max_pages)
+            return
+        
+        url = url_template.format(paper_id=paper_id)
+        offset = 0
+        
+        for _ in range(max_pages):
+            params = {
+                'offset': offset,
+                'limit': page_size,
+                'fields': fields or PAPER_FIELDS
+            }
+            status, data = self._request_json(endpoint, url, params)
+            
+            if status != 200:
+                print(f"WARNING: Failed to get {endpoint} at offset {offset} (status {status})", file=sys.stderr)
+                return
+            
+            for item in data.get('data') or []:
+                linked_paper = item.get(item_key) or {}
+                if linked_paper:
+                    yield linked_paper
+            
+            if 'next' not in data or not data.get('data'):
+                return
+            offset = data['next']
+    
+    def fetch_papers_batch(self, paper_ids: List[str], fields: str = None) -> List[Optional[Paper]]:
+        """
+        Hydrate many papers through the Semantic Scholar batch endpoint.
+        
+        IDs are sent in chunks of up to 500 per POST, so resolving a reference
+        list costs one rate-limited request per chunk instead of one per paper.
+        
+        Args:
+            paper_ids: Semantic Scholar paperIds, DOIs (bare, URL or `DOI:` prefixed)
+                       or any other prefixed ID the API accepts (ARXIV:, CorpusId:, ...)
+            fields: Comma-separated field list (default: PAPER_FIELDS)
+        
+        Returns:
+            Papers aligned with `paper_ids`; None where the ID could not be resolved
+        """
+        if self.dataset is not None:
+            ordinals = [self.dataset.ordinal(pid) for pid in paper_ids]
+            results = [Paper.from_s2(self.dataset.record(o), 'Semantic Scholar (local dataset)') if o is not None else None
+                       for o in ordinals]
+            print(f"INFO: Local dataset resolved {sum(1 for r in results if r)}/{len(paper_ids)} IDs", file=sys.stderr)
+            return results
+        
+        if not REQUESTS_AVAILABLE:
+            print("WARNING: requests library not available for batch lookup", file=sys.stderr)
+            return [None] * len(paper_ids)
+        
+        fields = fields or PAPER_FIELDS
+        normalized = [self._normalize_paper_id(pid) for pid in paper_ids]
+        results: List[Optional[Paper]] = []
+        
+        for start in range(0, len(normalized), self.BATCH_SIZE):
+            chunk = normalized[start:start + self.BATCH_SIZE]
+            try:
+                status, data = self._request_json(
+                    'batch', self.SEMANTIC_SCHOLAR_BATCH_API, {'fields': fields}, json_body={'ids': chunk}
+                )
+            except Exception as e:
+                print(f"WARNING: Batch lookup failed: {e}", file=sys.stderr)
+                status, data = None, None
+            
+            if status != 200 or not isinstance(data, list):
+                print(f"WARNING: Batch lookup of {len(chunk)} IDs failed (status {status})", file=sys.stderr)
+                results.extend([None] * len(chunk))
+                continue
+            
+            for item in data:
+                results.append(Paper.from_s2(item, 'Semantic Scholar (BATCH)') if item else None)
+        
+        resolved = sum(1 for r in results if r)
+        print(f"INFO: Batch lookup resolved {resolved}/{len(paper_ids)} IDs", file=sys.stderr)
+        return results
+    
+    def parse_filter(self, filter_str: str) -> FilterConditions:
+        conditions = FilterConditions()
+        
+        if not filter_str:
+            return conditions
+        
+        year_patterns = [
+            (r'Year\s*>\s*(\d{4})', 'year_min'),
+            (r'Year\s*<\s*(\d{4})', 'year_max'),
+            (r'Year\s*>=\s*(\d{4})', 'year_min'),
+            (r'Year\s*<=\s*(\d{4})', 'year_max'),
+        ]
+        
+        for pattern, attr in year_patterns:
+            match = re.search(pattern, filter_str, re.IGNORECASE)
+            if match:
+                setattr(conditions, attr, int(match.group(1)))
+        
+        keyword_pattern = r'"([^"]+)"'
+        keywords = re.findall(keyword_pattern, filter_str)
+        for kw in keywords:
+            if not kw.lower().startswith('year'):
+                conditions.keywords.append(kw)
+        
+        bare_keywords = re.findall(r'\b([a-zA-Z]{3,})\b', filter_str)
+        for kw in bare_keywords:
+            if kw.lower() not in ['year', 'and', 'or', 'not'] and kw not in conditions.keywords:
+                conditions.keywords.append(kw)
+        
+        return conditions
+    
+    iter_directives = staticmethod(iter_directives)
+    extract_directives_from_md = staticmethod(extract_directives_from_md)
+    
+    def _parse_seed_info(self, seed_info: str) -> Dict[str, str]:
+        parts = seed_info.split()
+        author = parts[0] if parts else ''
+        year = ''
+        for p in reversed(parts):
+            if p.isdigit() and len(p) == 4:
+                year = p
+                break
+        title_keywords = [p for p in parts if not p.isdigit() and p != author][:-1] if len(parts) > 2 else []
+        return {'author': author, 'year': year, 'title_keywords': title_keywords}
+    
+    def _match_seed_paper(self, paper: Dict, seed_parts: Dict[str, str]) -> int:
+        score = 0
+        title = paper.get('title', '').lower()
+        authors = paper.get('authors', [])
+        year = paper.get('year', 0)
+        
+        if seed_parts['year'] and str(year) == seed_parts['year']:
+            score += 50
+        
+        if seed_parts['author'] and authors:
+            first_author = authors[0].get('name', '').lower() if authors else ''
+            if seed_parts['author'].lower() in first_author:
+                score += 30
+        
+        if seed_parts['title_keywords']:
+            for kw in seed_parts['title_keywords']:
+                if kw.lower() in title:
+                    score += 5
+        
+        return score
+    
+    def _resolve_seed(self, seed_info: str, filter_info: str,
+                      sort_info: Optional[str]) -> Tuple[Optional[str], Optional[Paper]]:
+        """
+        Find the paper a SEED refers to.
+        
+        Resolutions are kept in the response cache under a normalized seed
+        string, so a seed seen in any earlier plan costs no search or detail
+        request.
+        
+        Returns:
+            Tuple of (paperId or None, the seed paper's own record or None)
+        """
+        if self.dataset is not None:
+            return self._resolve_seed_local(seed_info, filter_info, sort_info)
+        
+        resolved = self.cache.get_seed(seed_info, self.api_base) if self.cache else None
+        if resolved:
+            paper_id, best_score, seed_paper_detail = resolved
+            SEED_RESOLUTIONS.inc(result='hit')
+            if best_score < 50:
+                print(f"WARNING: Low confidence match (score={best_score}) for SEED '{seed_info}'", file=sys.stderr)
+            print(f"INFO: Seed resolved from cache: {seed_paper_detail.get('title', '')[:50]}... "
+                  f"(ID: {paper_id}, score={best_score})", file=sys.stderr)
+            return paper_id, self._seed_source_paper(seed_paper_detail, paper_id, '', seed_info, filter_info, sort_info)
+        SEED_RESOLUTIONS.inc(result='miss')
+        
+        search_params = {
+            'query': seed_info,
+            'limit': 10,
+            'fields': 'paperId,title,authors,year,citationCount'
+        }
+        
+        status, data = self._request_json('search', self.SEMANTIC_SCHOLAR_API, search_params)
+        
+        if status != 200:
+            print(f"WARNING: Failed to find seed paper '{seed_info}' (status {status})", file=sys.stderr)
+            return None, None
+        
+        if not data.get('data'):
+            print(f"WARNING: No seed paper found for '{seed_info}'", file=sys.stderr)
+            return None, None
+        
+        seed_parts = self._parse_seed_info(seed_info)
+        candidates = data['data']
+        
+        best_paper = None
+        best_score = -1
+        
+        for candidate in candidates:
+            score = self._match_seed_paper(candidate, seed_parts)
+            if score > best_score:
+                best_score = score
+                best_paper = candidate
+        
+        if not best_paper:
+            best_paper = candidates[0]
+        
+        paper_id = best_paper.get('paperId')
+        seed_title = best_paper.get('title', '')
+        
+        if best_score < 50:
+            print(f"WARNING: Low confidence match (score={best_score}) for SEED '{seed_info}'", file=sys.stderr)
+        
+        print(f"INFO: Found seed paper: {seed_title[:50]}... (ID: {paper_id}, score={best_score})", file=sys.stderr)
+        
+        paper_detail_url = self.SEMANTIC_SCHOLAR_PAPER_API.format(paper_id=paper_id)
+        paper_detail_params = {
+            'fields': PAPER_FIELDS
+        }
+        
+        seed_paper_detail = None
+        try:
+            detail_status, detail_data = self._request_json('paper', paper_detail_url, paper_detail_params)
+            if detail_status == 200:
+                seed_paper_detail = detail_data
+        except Exception as e:
+            print(f"WARNING: Failed to get seed paper details: {e}", file=sys.stderr)
+        
+        if seed_paper_detail and paper_id and self.cache:
+            # Only complete resolutions are remembered; a failed detail fetch is retried next time
+            self.cache.set_seed(seed_info, paper_id, best_score, seed_paper_detail, self.api_base)
+        
+        return paper_id, self._seed_source_paper(seed_paper_detail, paper_id, seed_title, seed_info, filter_info, sort_info)
+    
+    def _resolve_seed_local(self, seed_info: str, filter_info: str,
+                            sort_info: Optional[str]) -> Tuple[Optional[str], Optional[Paper]]:
+        """`_resolve_seed` against the local dataset: the same candidate scoring over its top 10 BM25 matches."""
+        candidates = self.dataset.search(seed_info, 10, any_term=True)
+        if not candidates:
+            print(f"WARNING: No seed paper found in the local dataset for '{seed_info}'", file=sys.stderr)
+            return None, None
+        
+        seed_parts = self._parse_seed_info(seed_info)
+        scores = [self._match_seed_paper(candidate, seed_parts) for candidate in candidates]
+        best_score = max(scores)
+        best_paper = candidates[scores.index(best_score)]
+        paper_id = best_paper['paperId']
+        
+        if best_score < 50:
+            print(f"WARNING: Low confidence match (score={best_score}) for SEED '{seed_info}'", file=sys.stderr)
+        print(f"INFO: Found seed paper in local dataset: {best_paper['title'][:50]}... "
+              f"(ID: {paper_id}, score={best_score})", file=sys.stderr)
+        return paper_id, self._seed_source_paper(best_paper, paper_id, best_paper['title'], seed_info,
+                                                 filter_info, sort_info)
+    
+    @staticmethod
+    def _seed_source_paper(seed_paper_detail: Optional[Dict], paper_id: str, seed_title: str, seed_info: str,
+                           filter_info: str, sort_info: Optional[str]) -> Optional[Paper]:
+        if not seed_paper_detail:
+            return None
+        seed_paper_info = Paper.from_s2(seed_paper_detail, 'Semantic Scholar (SEED_SOURCE)')
+        seed_paper_info.paper_id = seed_paper_info.paper_id or paper_id
+        seed_paper_info.title = seed_paper_info.title or seed_title
+        seed_paper_info.seed_paper = seed_info
+        seed_paper_info.filter_applied = filter_info
+        seed_paper_info.sort_method = sort_info or 'default'
+        seed_paper_info.is_seed_source = True
+        print(f"INFO: Added seed paper itself to results: {seed_paper_info.title[:40]}...", file=sys.stderr)
+        return seed_paper_info
+    
+    def search_by_seed(self, seed_info: str, filter_info: str, max_results: int = 10, sort_info: str = None) -> List[Paper]:
+        papers = []
+        
+        if not REQUESTS_AVAILABLE and self.dataset is None:
+            print("WARNING: requests library not available for SEED search", file=sys.stderr)
+            return papers
+        
+        try:
+            filter_conditions = self.parse_filter(filter_info)
+            
+            # With FILTER keywords keep a 2x pool so BM25 still has candidates to rerank
+            target = max_results * 2 if filter_conditions.keywords else max_results
+            page_size = min(max(target, 20), self.CITATIONS_PAGE_LIMIT)
+            
+            key = ('seed', ResponseCache.seed_key(seed_info))
+            work = self._planned_work(key)
+            if work:
+                # Several directives share this seed: resolve it once and page through its citations once
+                paper_id, seed_paper_info, citations = self._shared_work(
+                    key, work, lambda: self._fetch_seed_work(seed_info, filter_info, sort_info, work.limit))
+                if seed_paper_info:
+                    seed_paper_info = copy.copy(seed_paper_info)
+                    seed_paper_info.seed_paper = seed_info
+                    seed_paper_info.filter_applied = filter_info
+                    seed_paper_info.sort_method = sort_info or 'default'
+            else:
+                with TRACER.span('resolve seed', 'seed', seed=seed_info[:80]):
+                    paper_id, seed_paper_info = self._resolve_seed(seed_info, filter_info, sort_info)
+                citations = self.iter_citations(paper_id, page_size=page_size,
+                                                max_pages=self.max_citation_pages) if paper_id else None
+            if not paper_id:
+                return papers
+            if seed_paper_info:
+                papers.append(seed_paper_info)
+            
+            raw_citations_count = 0
+            passed = 0
+            for citing_paper in citations:
+                raw_citations_count += 1
+                paper_info = Paper.from_s2(citing_paper, 'Semantic Scholar (SEED)')
+                paper_info.seed_paper = seed_info
+                paper_info.filter_applied = filter_info
+                paper_info.sort_method = sort_info or 'default'
+                
+                if filter_conditions.matches(paper_info):
+                    papers.append(paper_info)
+                    passed += 1
+                    if passed >= target:
+                        break
+            
+            print(f"INFO: Scanned {raw_citations_count} citations for paper {paper_id}, {passed} passed filter", file=sys.stderr)
+            
+            papers = self._rank_seed_results(papers, filter_conditions, sort_info, max_results)
+            
+            seed_count = len([p for p in papers if p.is_seed_source])
+            citing_count = len(papers) - seed_count
+            print(f"INFO: SEED search found {seed_count} seed paper(s) + {citing_count} citing papers for '{seed_info[:30]}...' (BM25 scored)", file=sys.stderr)
+            
+        except Exception as e:
+            print(f"WARNING: SEED search failed: {e}", file=sys.stderr)
+        
+        return papers
+    
+    def snowball_from_seed(self, seed_info: str, filter_info: str, max_results: int = 10,
+                           sort_info: str = None) -> List[Paper]:
+        """
+        Breadth-first snowballing from a SEED over `self.snowball.depth` levels.
+        
+        Each level expands its frontier concurrently: one citations and/or
+        references page per frontier paper, all sharing the crawler's rate
+        limiter. Papers are visited once (keyed by paperId). The next frontier
+        is the `level_cap` best new papers that pass FILTER, ranked by BM25
+        against the FILTER keywords, or by citation count without keywords.
+        Expansion stops at the configured depth, when the frontier runs dry,
+        or once `max_requests` expansions have been spent.
+        """
+        config = self.snowball
+        papers = []
+        
+        if not REQUESTS_AVAILABLE and self.dataset is None:
+            print("WARNING: requests library not available for SEED search", file=sys.stderr)
+            return papers
+        
+        try:
+            with TRACER.span('resolve seed', 'seed', seed=seed_info[:80]):
+                paper_id, seed_paper_info = self._resolve_seed(seed_info, filter_info, sort_info)
+            if not paper_id:
+                return papers
+            if seed_paper_info:
+                papers.append(seed_paper_info)
+            
+            filter_conditions = self.parse_filter(filter_info)
+            page_size = min(max(config.fanout, 1), self.CITATIONS_PAGE_LIMIT)
+            visited = {paper_id}
+            frontier = [paper_id]
+            requests_left = config.max_requests
+            
+            def expand(task: Tuple[str, str]) -> List[Dict]:
+                node_id, direction = task
+                fetch = self.iter_citations if direction == 'forward' else self.iter_references
+                return list(fetch(node_id, page_size=page_size, max_pages=1))
+            
+            from concurrent.futures import ThreadPoolExecutor
+            executor = ThreadPoolExecutor(max_workers=max(1, self.pool_size))
+            try:
+                for level in range(1, config.depth + 1):
+                    tasks = [(node_id, direction) for node_id in frontier for direction in config.directions]
+                    if len(tasks) > requests_left:
+                        print(f"INFO: Snowball request budget reached at level {level}, "
+                              f"expanding {requests_left}/{len(tasks)} papers", file=sys.stderr)
+                        tasks = tasks[:requests_left]
+                    if not tasks:
+                        break
+                    requests_left -= len(tasks)
+                    
+                    level_papers = []
+                    for (node_id, direction), linked in zip(tasks, executor.map(TRACER.propagate(expand), tasks)):
+                        for raw in linked:
+                            linked_id = raw.get('paperId')
+                            if not linked_id or linked_id in visited:
+                                continue
+                            visited.add(linked_id)
+                            paper_info = Paper.from_s2(raw, f'Semantic Scholar (SNOWBALL L{level} {direction})')
+                            paper_info.seed_paper = seed_info
+                            paper_info.filter_applied = filter_info
+                            paper_info.sort_method = sort_info or 'default'
+                            if filter_conditions.matches(paper_info):
+                                level_papers.append(paper_info)
+                    
+                    papers.extend(level_papers)
+                    print(f"INFO: Snowball level {level}: expanded {len(tasks)} pages, "
+                          f"{len(level_papers)} new papers passed filter", file=sys.stderr)
+                    
+                    if level == config.depth or not level_papers:
+                        break
+                    frontier = [p.paper_id for p in self._prioritize_frontier(level_papers, filter_conditions)
+                                [:config.level_cap]]
+            except KeyboardInterrupt:
+                # Ctrl-C lands on this thread; the expansion workers stop at their next wait or attempt
+                CANCEL.set()
+                raise
+            finally:
+                shutdown_executor(executor, wait=not CANCEL.is_set())
+            
+            citing_count = len(papers) - (1 if seed_paper_info else 0)
+            papers = self._rank_seed_results(papers, filter_conditions, sort_info, max_results)
+            print(f"INFO: Snowball visited {len(visited)} papers, {citing_count} passed filter, "
+                  f"kept {len(papers)} for '{seed_info[:30]}...'", file=sys.stderr)
+            
+        except Exception as e:
+            print(f"WARNING: Snowball search failed: {e}", file=sys.stderr)
+        
+        return papers
+    
+    def _prioritize_frontier(self, papers: List[Paper], filter_conditions: FilterConditions) -> List[Paper]:
+        if filter_conditions.keywords:
+            BM25Scorer(corpus_stats=self.corpus_stats).compute_scores(papers, filter_conditions.keywords)
+            return sorted(papers, key=lambda x: (-x.bm25_score, -x.citations))
+        return sorted(papers, key=lambda x: -x.citations)
+    
+    def _rank_seed_results(self, papers: List[Paper], filter_conditions: FilterConditions,
+                           sort_info: Optional[str], max_results: int) -> List[Paper]:
+        """BM25-score citing papers, order them by SORT and keep the seed paper first."""
+        seed_papers = [p for p in papers if p.is_seed_source]
+        other_papers = [p for p in papers if not p.is_seed_source]
+        
+        if papers and filter_conditions.keywords:
+            scorer = BM25Scorer(corpus_stats=self.corpus_stats)
+            scorer.compute_scores(papers, filter_conditions.keywords)
+            
+            if sort_info == 'recency':
+                other_papers.sort(key=lambda x: (-x.year, -x.bm25_score))
+            else:
+                other_papers.sort(key=lambda x: (-x.bm25_score, -x.citations))
+        
+        other_papers = other_papers[:max_results - len(seed_papers)]
+        return seed_papers + other_papers
+    
+    def search_semantic_scholar(self, query: str, max_results: int = 10, 
+                                    sort_by: str = None, exact_title: bool = False) -> List[Paper]:
+        papers = []
+        
+        if not REQUESTS_AVAILABLE:
+            print("WARNING: requests library not available for Semantic Scholar", file=sys.stderr)
+            return papers
+        
+        if self.bulk:
+            return self.search_bulk(query, max_results, sort_by, exact_title)
+        
+        try:
+            search_query = query
+            if exact_title:
+                search_query = f'title:"{query}"'
+            
+            key = ('query', self._query_key(search_query))
+            work = self._planned_work(key)
+            if work:
+                # Identical query text elsewhere in the plan: search once at the widest limit; with
+                # differing SORTs the shared search is unsorted and each directive sorts locally
+                server_sort = next(iter(work.sorts)) if len(work.sorts) == 1 else None
+                status, items = self._shared_work(
+                    key, work, lambda: self._search_items(search_query, work.limit, server_sort))
+            else:
+                status, items = self._search_items(search_query, min(max_results * 2, 50), sort_by)
+            
+            if status == 200:
+                for item in items:
+                    papers.append(Paper.from_s2(item))
+                if work and len(work.sorts) > 1 and sort_by in self.LOCAL_SORT_KEYS:
+                    papers.sort(key=self.LOCAL_SORT_KEYS[sort_by])
+                
+                print(f"INFO: Semantic Scholar found {len(papers)} papers for query: {query[:50]}...", file=sys.stderr)
+            else:
+                print(f"WARNING: Semantic Scholar API returned status {status}", file=sys.stderr)
+                
+        except Exception as e:
+            print(f"WARNING: Semantic Scholar search failed: {e}", file=sys.stderr)
+        
+        return papers
+    
+    def _search_items(self, search_query: str, limit: int, sort_by: Optional[str]) -> Tuple[int, List[Dict]]:
+        params = {
+            'query': search_query,
+            'limit': limit,
+            'fields': PAPER_FIELDS
+        }
+        if sort_by:
+            params['sort'] = sort_by
+        
+        status, data = self._request_json('search', self.SEMANTIC_SCHOLAR_API, params)
+        return status, (data or {}).get('data', []) if status == 200 else []
+    
+    @staticmethod
+    def _to_bulk_query(query: str, exact_title: bool = False) -> str:
+        """Rewrite QUERY boolean operators in bulk search syntax (+ AND, | OR, - NOT)."""
+        if exact_title:
+            # The bulk endpoint has no title: field filter; a quoted phrase is the closest match
+            return '"' + query.replace('"', '') + '"'
+        query = re.sub(r'\s+AND\s+NOT\s+', ' + -', query)
+        query = re.sub(r'(^|\s)NOT\s+', r'\1-', query)
+        query = re.sub(r'\s+AND\s+', ' + ', query)
+        return re.sub(r'\s+OR\s+', ' | ', query)
+    
+    def iter_bulk_search(self, query: str, sort_by: Optional[str] = None,
+                         cap: Optional[int] = None, fields: str = None) -> Iterator[Dict]:
+        """
+        Stream matches from /paper/search/bulk, following its continuation token.
+        
+        Each page holds up to 1000 papers and is requested only when the
+        consumer reaches it, so stopping early leaves later pages unfetched.
+        
+        Args:
+            query: Query in bulk syntax (see `_to_bulk_query`)
+            sort_by: Relevance-search sort value, mapped through BULK_SORTS;
+                unsortable values leave the endpoint's paperId order
+            cap: Hard cap on the number of papers yielded
+            fields: Comma-separated field list (default: PAPER_FIELDS)
+        
+        Yields:
+            Raw paper objects
+        """
+        params = {'query': query, 'fields': fields or PAPER_FIELDS}
+        if sort_by in self.BULK_SORTS:
+            params['sort'] = self.BULK_SORTS[sort_by]
+        
+        fetched = 0
+        token = None
+        while cap is None or fetched < cap:
+            status, data = self._request_json('bulk', self.SEMANTIC_SCHOLAR_BULK_API,
+                                              dict(params, token=token) if token else params)
+            if status != 200:
+                print(f"WARNING: Bulk search failed after {fetched} papers (status {status})", file=sys.stderr)
+                return
+            
+            items = data.get('data') or []
+            if token is None and data.get('total') is not None:
+                print(f"INFO: Bulk search matched {data['total']} papers"
+                      + (f", fetching up to {cap}" if cap is not None and cap < data['total'] else ''), file=sys.stderr)
+            for item in items:
+                if cap is not None and fetched >= cap:
+                    return
+                fetched += 1
+                yield item
+            
+            token = data.get('token')
+            if not token or not items:
+                return
+    
+    def search_bulk(self, query: str, max_results: int = 10, sort_by: Optional[str] = None,
+                    exact_title: bool = False) -> List[Paper]:
+        """
+        Search through the bulk endpoint instead of relevance search.
+        
+        Relevance search returns at most one page of 50 here; bulk search
+        pages through every match, up to max_results and the `bulk_cap`
+        hard cap. Papers are converted as pages arrive. Matches come back
+        unranked unless SORT maps to a bulk sort, and are ranked like any
+        other QUERY result afterwards.
+        """
+        cap = min(max_results, self.bulk_cap) if self.bulk_cap else max_results
+        papers = []
+        
+        try:
+            for item in self.iter_bulk_search(self._to_bulk_query(query, exact_title), sort_by, cap):
+                papers.append(Paper.from_s2(item))
+            print(f"INFO: Semantic Scholar bulk search found {len(papers)} papers for query: {query[:50]}...", file=sys.stderr)
+        except Exception as e:
+            print(f"WARNING: Semantic Scholar bulk search failed: {e}", file=sys.stderr)
+        
+        return papers
+    
+    @staticmethod
+    def _gs_pause(cancel: Optional[threading.Event]) -> bool:
+        """Pace Google Scholar page loads; returns False if cancelled while waiting."""
+        pause = random.uniform(5, 10)
+        started = time.perf_counter()
+        with TRACER.span('google scholar pacing', 'wait'):
+            if cancel is not None:
+                cancelled = cancel.wait(pause)
+            else:
+                _cancellable_sleep(pause)
+                cancelled = False
+        SLEEP_SECONDS.inc(time.perf_counter() - started, reason='google_scholar')
+        return not cancelled
+    
+    def _gs_next_loads_page(self, search_query, index: int) -> bool:
+        """Whether the next item of a scholarly search iterator needs another result page."""
+        rows = getattr(search_query, '_rows', None)
+        pos = getattr(search_query, '_pos', None)
+        if isinstance(rows, list) and isinstance(pos, int):
+            return pos >= len(rows)
+        return index > 0 and index % self.GS_PAGE_SIZE == 0
+    
+    def search_google_scholar(self, query: str, max_results: int = 10,
+                              cancel: Optional[threading.Event] = None) -> List[Paper]:
+        """
+        Query Google Scholar via scholarly, pausing before each result page
+        load rather than between items of an already-fetched page.
+        
+        Setting `cancel` stops the search at the next pause or item and
+        returns whatever was collected so far.
+        """
+        if not SCHOLARLY_AVAILABLE or not self._setup_scholarly():
+            print("WARNING: scholarly library not available for Google Scholar", file=sys.stderr)
+            return []
+        
+        papers = []
+        
+        try:
+            if not self._gs_pause(cancel):
+                return papers
+            
+            with HTTP_ATTEMPT_SECONDS.time(endpoint='google_scholar'), TRACER.span('GET google_scholar', 'http'):
+                search_query = scholarly.search_pubs(query)
+            
+            for i in range(max_results):
+                if cancel is not None and cancel.is_set():
+                    return papers
+                try:
+                    if self._gs_next_loads_page(search_query, i):
+                        if not self._gs_pause(cancel):
+                            return papers
+                        with HTTP_ATTEMPT_SECONDS.time(endpoint='google_scholar'), \
+                                TRACER.span('GET google_scholar', 'http', page=i // self.GS_PAGE_SIZE + 1):
+                            paper = next(search_query)
+                    else:
+                        paper = next(search_query)
+                    papers.append(Paper.from_gs(paper))
+                    
+                except StopIteration:
+                    break
+                except Exception as e:
+                    print(f"WARNING: Error fetching paper {i+1}: {e}", file=sys.stderr)
+            
+            print(f"INFO: Google Scholar found {len(papers)} papers for query: {query[:50]}...", file=sys.stderr)
+            
+        except Exception as e:
+            print(f"WARNING: Google Scholar search failed: {e}", file=sys.stderr)
+        
+        return papers
+    
+    def _start_speculative_gs(self, query: str, max_results: int):
+        with self._gs_lock:
+            if self._gs_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._gs_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='google-scholar')
+            cancel = threading.Event()
+            self._gs_cancels.add(cancel)
+            future = self._gs_executor.submit(TRACER.propagate(self.search_google_scholar), query, max_results, cancel)
+        
+        def forget(_):
+            with self._gs_lock:
+                self._gs_cancels.discard(cancel)
+        future.add_done_callback(forget)
+        return future, cancel
+    
+    def search_with_fallback(self, query: str, max_results: int = 10, no_fallback: bool = False,
+                             sort_by: str = None, exact_title: bool = False) -> List[Paper]:
+        # Bulk result counts are far beyond what paced Google Scholar pages can make up
+        fallback_results = min(max_results, 2 * self.GS_PAGE_SIZE) if self.bulk else max_results
+        speculative = None
+        if (self.speculative_fallback and not no_fallback and fallback_results // 2 > 0
+                and SCHOLARLY_AVAILABLE and self._setup_scholarly()):
+            # Google Scholar's up-front pause overlaps the Semantic Scholar search;
+            # in the common case the query is cancelled before anything is sent
+            speculative = self._start_speculative_gs(query, fallback_results)
+        
+        try:
+            papers = self.search_semantic_scholar(query, max_results, sort_by, exact_title)
+        except BaseException:
+            if speculative:
+                speculative[1].set()
+            raise
+        
+        gs_papers = []
+        if speculative:
+            future, cancel = speculative
+            if len(papers) >= fallback_results // 2:
+                cancel.set()
+                future.cancel()
+                GS_SPECULATIVE.inc(outcome='cancelled')
+            else:
+                print(f"INFO: Falling back to Google Scholar for query: {query[:50]}... (started speculatively)", file=sys.stderr)
+                GS_SPECULATIVE.inc(outcome='used')
+                gs_papers = future.result()[:fallback_results - len(papers)]
+        elif (not no_fallback and len(papers) < fallback_results // 2
+                and SCHOLARLY_AVAILABLE and self._setup_scholarly()):
+            print(f"INFO: Falling back to Google Scholar for query: {query[:50]}...", file=sys.stderr)
+            gs_papers = self.search_google_scholar(query, fallback_results - len(papers))
+        
+        if gs_papers:
+            seen_titles = {p.title.lower() for p in papers}
+            for p in gs_papers:
+                if p.title.lower() not in seen_titles:
+                    papers.append(p)
+                    seen_titles.add(p.title.lower())
+        
+        return papers
+    
+    @staticmethod
+    def _query_key(search_query: str) -> str:
+        return ' '.join(search_query.lower().split())
+    
+    def plan_requests(self, directives: List[SearchDirective], max_results: int = 10,
+                      sort_by: Optional[str] = None, exact_title: bool = False) -> Dict[Tuple[str, str], PlannedWork]:
+        """
+        Group directives by the network work they need before any of it runs.
+        
+        SEED directives with the same (normalized) seed share one resolution
+        and one citations stream fetched at the widest page size any of them
+        needs; each still applies its own FILTER, BM25 ranking and SORT.
+        QUERY directives with the same text share one search, unless their
+        SORTs differ and one of them cannot be reproduced locally. Snowballed
+        SEEDs, and QUERYs in bulk mode, are left out; their overlapping
+        requests still coalesce in flight. With the local dataset backend
+        QUERYs cost no requests and are not planned either.
+        
+        Each call plans one batch (`run` passes a look-ahead window of the
+        directives still to execute) and assigns the shared work to those
+        directives, which claim it as they run.
+        
+        Returns:
+            Work items needed by more than one directive, keyed like the lookups in
+            `search_by_seed` / `search_semantic_scholar`
+        """
+        plan: Dict[Tuple[str, str], PlannedWork] = {}
+        members: Dict[Tuple[str, str], List[SearchDirective]] = {}
+        for directive in directives:
+            if directive.directive_type == 'IDS':
+                continue
+            if directive.directive_type == 'SEED':
+                if self.snowball is not None:
+                    continue
+                key = ('seed', ResponseCache.seed_key(directive.seed_info))
+                target = max_results * 2 if self.parse_filter(directive.filter_info).keywords else max_results
+                limit = min(max(target, 20), self.CITATIONS_PAGE_LIMIT)
+                sort = None
+            else:
+                if self.bulk or self.dataset is not None:
+                    continue
+                query = f'title:"{directive.raw_query}"' if exact_title else directive.raw_query
+                key = ('query', self._query_key(query))
+                limit = min(max_results * 2, 50)
+                sort = map_sort_value(directive.sort_info) or sort_by
+            work = plan.setdefault(key, PlannedWork())
+            work.directives += 1
+            work.limit = max(work.limit, limit)
+            work.sorts.add(sort)
+            members.setdefault(key, []).append(directive)
+        
+        shared = {}
+        for key, work in plan.items():
+            if work.directives < 2:
+                continue
+            if len(work.sorts) > 1 and not all(sort is None or sort in self.LOCAL_SORT_KEYS for sort in work.sorts):
+                continue
+            work.unclaimed = work.directives
+            shared[key] = work
+        with self._inflight_lock:
+            for key, work in shared.items():
+                for directive in members[key]:
+                    self._planned[id(directive)] = (directive, key, work)
+        if shared:
+            seeds = sum(1 for kind, _ in shared if kind == 'seed')
+            directives_shared = sum(work.directives for work in shared.values())
+            print(f"INFO: Request plan: {directives_shared} directives share {seeds} seed(s) and "
+                  f"{len(shared) - seeds} query(ies); each is fetched once", file=sys.stderr)
+        return shared
+    
+    def _planned_work(self, key: Tuple[str, str]) -> Optional[PlannedWork]:
+        """Claim the work planned under `key` for the directive running on this thread, if any."""
+        planned = getattr(self._local, 'planned', None)
+        if planned is None or planned[0] != key:
+            return None
+        self._local.planned = None
+        return planned[1]
+    
+    def _shared_work(self, key: Tuple[str, str], work: PlannedWork, fetch: Callable):
+        """
+        Run `fetch` once for all directives sharing `work` and hand every one
+        of them its result. The plan lets go of the result once the last
+        directive has claimed it, so shared citation streams do not outlive
+        their users; directives that never claim it (e.g. answered from the
+        local store) only delay that until the work itself is unreferenced.
+        """
+        with self._inflight_lock:
+            future = work.future
+            owner = future is None
+            if owner:
+                from concurrent.futures import Future
+                future = work.future = Future()
+            work.unclaimed -= 1
+            if work.unclaimed <= 0:
+                work.future = None
+        if not owner:
+            SHARED_WORK.inc(kind=key[0])
+            return future.result()
+        try:
+            result = fetch()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+    
+    def _fetch_seed_work(self, seed_info: str, filter_info: str, sort_info: Optional[str],
+                         page_size: int) -> Tuple[Optional[str], Optional[Paper], Optional[SharedStream]]:
+        with TRACER.span('resolve seed', 'seed', seed=seed_info[:80]):
+            paper_id, seed_paper_info = self._resolve_seed(seed_info, filter_info, sort_info)
+        if not paper_id:
+            return None, None, None
+        citations = SharedStream(self.iter_citations(paper_id, page_size=page_size,
+                                                     max_pages=self.max_citation_pages))
+        return paper_id, seed_paper_info, citations
+    
+    def execute_directive(self, directive: SearchDirective, max_results: int = 10, 
+                          no_fallback: bool = False, google_only: bool = False,
+                          sort_by: str = None, exact_title: bool = False) -> List[Paper]:
+        # Work planned for this directive is claimed by the search it runs on this thread
+        with self._inflight_lock:
+            planned = self._planned.pop(id(directive), None)
+        self._local.planned = planned[1:] if planned else None
+        try:
+            return self._execute_directive(directive, max_results, no_fallback, google_only, sort_by, exact_title)
+        finally:
+            self._local.planned = None
+    
+    def _execute_directive(self, directive: SearchDirective, max_results: int, no_fallback: bool,
+                           google_only: bool, sort_by: Optional[str], exact_title: bool) -> List[Paper]:
+        if directive.directive_type == 'IDS':
+            return [p for p in self.fetch_papers_batch(directive.raw_query.split()) if p]
+        
+        effective_sort = map_sort_value(directive.sort_info) or sort_by
+        
+        snowball = directive.directive_type == 'SEED' and self.snowball is not None
+        
+        if self.offline and self.corpus_store and not snowball and self.dataset is None:
+            local_papers = self.search_local(directive, max_results, effective_sort, exact_title)
+            if len(local_papers) >= max(1, max_results // 2):
+                return local_papers
+            print(f"INFO: Local store has {len(local_papers)} results, querying network", file=sys.stderr)
+        
+        if snowball:
+            papers = self.snowball_from_seed(
+                directive.seed_info,
+                directive.filter_info,
+                max_results,
+                directive.sort_info
+            )
+        elif directive.directive_type == 'SEED':
+            papers = self.search_by_seed(
+                directive.seed_info, 
+                directive.filter_info, 
+                max_results,
+                directive.sort_info
+            )
+        else:
+            if self.dataset is not None:
+                papers = self.search_dataset(directive.raw_query, max_results, effective_sort, exact_title)
+            elif google_only:
+                papers = self.search_google_scholar(directive.raw_query, max_results)
+            else:
+                papers = self.search_with_fallback(directive.raw_query, max_results, no_fallback, 
+                                                   effective_sort, exact_title)
+        
+        if self.corpus_store and papers:
+            try:
+                self.corpus_store.upsert(papers)
+                # Multi-level results are not the seed's citing papers, so keep them out of the one-hop seed index
+                if directive.directive_type == 'SEED' and not snowball:
+                    self.corpus_store.record_seed(directive.seed_info, papers)
+            except sqlite3.Error as e:
+                print(f"WARNING: Failed to update local corpus store: {e}", file=sys.stderr)
+        
+        return papers
+    
+    def search_dataset(self, query: str, max_results: int = 10, sort_by: Optional[str] = None,
+                       exact_title: bool = False) -> List[Paper]:
+        """
+        Answer a QUERY from the local dataset index: AND/OR/NOT over title
+        and abstract terms, BM25-ranked with dataset-wide statistics unless
+        SORT maps to citation count or year. Like `search_local`, returns up
+        to 2x max_results for the directive's own ranking.
+        """
+        if exact_title:
+            query = '"' + query.replace('"', '') + '"'
+        with TRACER.span('dataset search', 'local', query=query[:80]):
+            items = self.dataset.search(query, max_results * 2, sort_by)
+        papers = [Paper.from_s2(item, 'Semantic Scholar (local dataset)') for item in items]
+        print(f"INFO: Local dataset found {len(papers)} papers for query: {query[:50]}...", file=sys.stderr)
+        return papers
+    
+    def search_local(self, directive: SearchDirective, max_results: int = 10,
+                     sort_by: str = None, exact_title: bool = False) -> List[Paper]:
+        """
+        Answer a directive from the local corpus store without network access.
+        
+        QUERY directives run as FTS5 searches, or as exact title lookups with
+        `exact_title` (the network path's `title:"..."` search); SEED
+        directives re-use the citing papers recorded by earlier runs and
+        re-apply FILTER and BM25.
+        """
+        if directive.directive_type == 'SEED':
+            papers = self.corpus_store.seed_results(directive.seed_info)
+            if not papers:
+                return []
+            filter_conditions = self.parse_filter(directive.filter_info)
+            papers = [p for p in papers if p.is_seed_source or filter_conditions.matches(p)]
+            for p in papers:
+                p.source = 'Semantic Scholar (SEED_SOURCE)' if p.is_seed_source else 'Semantic Scholar (SEED)'
+                p.seed_paper = directive.seed_info
+                p.filter_applied = directive.filter_info
+                p.sort_method = directive.sort_info or 'default'
+            papers = self._rank_seed_results(papers, filter_conditions, directive.sort_info, max_results)
+        elif exact_title:
+            papers = self.corpus_store.search_title(directive.raw_query, max_results * 2, sort_by)
+        else:
+            papers = self.corpus_store.search(directive.raw_query, max_results * 2, sort_by)
+        
+        print(f"INFO: Local store returned {len(papers)} papers for {directive.directive_type}", file=sys.stderr)
+        return papers
+    
+    def filter_and_rank_papers(self, papers: List[Paper], query_group: str,
+                               current_year: int = None,
+                               min_citations_old: int = 10) -> List[Paper]:
+        if current_year is None:
+            current_year = datetime.now().year
+        
+        recent_year_threshold = current_year - 1
+        filtered_papers = []
+        
+        for paper in papers:
+            year = paper.year
+            citations = paper.citations
+            is_seed_source = paper.is_seed_source
+            
+            keep_paper = False
+            
+            if is_seed_source:
+                keep_paper = True
+            elif year >= recent_year_threshold:
+                keep_paper = True
+            elif year > 0 and citations > min_citations_old:
+                keep_paper = True
+            elif year == 0 and citations > min_citations_old:
+                keep_paper = True
+            
+            if keep_paper:
+                paper.query_group = query_group
+                
+                bm25_score = paper.bm25_score
+                year_score = max(0, (year - 2000) / 20)
+                citation_score = min(citations / 1000, 5)
+                
+                if bm25_score > 0:
+                    paper.relevance_score = bm25_score + citation_score * 0.3 + year_score * 0.2
+                else:
+                    paper.relevance_score = citation_score + year_score * 0.5
+                
+                filtered_papers.append(paper)
+        
+        has_bm25 = any(p.bm25_score > 0 for p in filtered_papers)
+        if has_bm25:
+            filtered_papers.sort(key=lambda x: (-x.bm25_score, -x.relevance_score))
+        else:
+            filtered_papers.sort(key=lambda x: (-x.citations, -x.year))
+        
+        directive_type = 'SEED' if query_group.startswith('SEED') else 'QUERY'
+        PAPERS_FETCHED.inc(len(papers), directive_type=directive_type)
+        PAPERS_KEPT.inc(len(filtered_papers), directive_type=directive_type)
+        print(f"INFO: Filtered to {len(filtered_papers)} papers for '{query_group[:40]}...'", file=sys.stderr)
+        
+        return filtered_papers
+    
+    def generate_csv(self, papers: Iterable[Paper], output_path: Path):
+        # Write next to the target and swap in, so readers never see a half-written file
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        try:
+            writer = StreamingCsvWriter(tmp_path)
+            for batch in _batches(papers, StreamingCsvWriter.BATCH_SIZE):
+                writer.write_papers(batch)
+            writer.close()
+            if not writer.rows_written:
+                print("WARNING: No papers to export to CSV", file=sys.stderr)
+                return None
+            os.replace(tmp_path, output_path)
+            print(f"INFO: Saved {writer.rows_written} papers to {output_path}", file=sys.stderr)
+            return output_path
+        except Exception as e:
+            print(f"ERROR: Failed to save CSV: {e}", file=sys.stderr)
+            return None
+    
+    def generate_citations(self, papers: Iterable[Paper], output_path: Path, style: str):
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        try:
+            writer = StreamingCitationWriter(tmp_path, style)
+            for batch in _batches(papers, StreamingCsvWriter.BATCH_SIZE):
+                writer.write_papers(batch)
+            writer.close()
+            if not writer.rows_written:
+                print(f"WARNING: No papers to export as {style}", file=sys.stderr)
+                return None
+            os.replace(tmp_path, output_path)
+            print(f"INFO: Saved {writer.rows_written} {style} references to {output_path}", file=sys.stderr)
+            return output_path
+        except Exception as e:
+            print(f"ERROR: Failed to save {style} references: {e}", file=sys.stderr)
+            return None
+    
+    def generate_columnar(self, all_papers: List[Paper], output_path: Path, fmt: str, append: bool = False):
+        if not all_papers:
+            print(f"WARNING: No papers to export to {fmt}", file=sys.stderr)
+            return None
+        
+        try:
+            total = write_columnar_table(papers_to_arrow(all_papers), output_path, fmt, append=append)
+            if total > len(all_papers):
+                print(f"INFO: Appended {len(all_papers)} papers to {output_path} ({total} rows total)", file=sys.stderr)
+            else:
+                print(f"INFO: Saved {len(all_papers)} papers to {output_path}", file=sys.stderr)
+            return output_path
+        except Exception as e:
+            print(f"ERROR: Failed to save {fmt} table: {e}", file=sys.stderr)
+            return None
+    
+    def generate_report(self, papers: Iterable[Paper], output_path: Path):
+        # One pass over the papers: tally while keeping only the top 3
+        totals = Counter()
+        query_groups = {}
+        
+        def tally(papers: Iterable[Paper]) -> Iterator[Paper]:
+            for paper in papers:
+                totals['papers'] += 1
+                totals['seed'] += bool(paper.seed_paper)
+                group = paper.query_group or 'Unknown'
+                query_groups[group] = query_groups.get(group, 0) + 1
+                yield paper
+        
+        top_papers = heapq.nsmallest(3, tally(papers), key=lambda x: (-x.relevance_score, -x.citations))
+        if not totals['papers']:
+            print("WARNING: No papers to generate report", file=sys.stderr)
+            return None
+        
+        seed_count = totals['seed']
+        query_count = totals['papers'] - seed_count
+        
+        report_lines = [
+            "# Academic Literature Crawler Report",
+            f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"Total papers collected: {totals['papers']}",
+            f"- SEED search results: {seed_count}",
+            f"- QUERY search results: {query_count}",
+            "",
+            "## Top 3 Must-Read Papers",
+            ""
+        ]
+        
+        for i, paper in enumerate(top_papers, 1):
+            authors = paper.authors
+            authors_str = ', '.join(authors[:3]) + (' et al.' if len(authors) > 3 else '')
+            
+            directive_type = directive_type_of(paper)
+            
+            report_lines.extend([
+                f"### {i}. {paper.title or 'Untitled'}",
+                f"- **Type**: {directive_type}",
+                f"- **Authors**: {authors_str}",
+                f"- **Year**: {paper.year or 'Unknown'}",
+                f"- **Citations**: {paper.citations}",
+                f"- **BM25 Score**: {paper.bm25_score:.2f}",
+                f"- **Venue**: {paper.venue or 'Unknown'}",
+                f"- **Source**: {paper.source or 'Unknown'}",
+                f"- **Relevance Score**: {paper.relevance_score:.2f}",
+                f"- **Link**: {paper.url}",
+                "",
+                f"**Abstract Summary**:",
+                f"{(paper.abstract or 'No abstract available.')[:300]}...",
+                ""
+            ])
+        
+        report_lines.extend([
+            "## Query Group Statistics",
+            ""
+        ])
+        
+        for group, count in query_groups.items():
+            report_lines.append(f"- **{group}**: {count} papers")
+        
+        try:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(report_lines))
+            print(f"INFO: Saved report to {output_path}", file=sys.stderr)
+            return output_path
+        except Exception as e:
+            print(f"ERROR: Failed to save report: {e}", file=sys.stderr)
+            return None
+
+
+def _batches(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    return iter(lambda: list(islice(iterator, size)), [])
+
+
+def _staged_iter(iterable: Iterable, stage: str) -> Iterator:
+    """Yield from `iterable`, accounting the time spent producing each item to `stage`."""
+    iterator = iter(iterable)
+    end = object()
+    while True:
+        with pipeline_stage(stage):
+            item = next(iterator, end)
+        if item is end:
+            return
+        yield item
+
+
+def _print_time_breakdown():
+    network = METRICS.total('scholar_http_request_seconds')
+    parts = [
+        f"rate-limiter wait {METRICS.total('scholar_rate_limiter_wait_seconds'):.1f}s",
+        f"network {network:.1f}s",
+        f"retry backoff {METRICS.total('scholar_backoff_seconds_total'):.1f}s",
+        f"Google Scholar pacing {METRICS.total('scholar_sleep_seconds_total', reason='google_scholar'):.1f}s",
+    ]
+    for stage in ('parse', 'fetch', 'bm25', 'score', 'dedup', 'export'):
+        parts.append(f"{stage} {METRICS.total('scholar_stage_seconds', stage=stage):.1f}s")
+    print(f"INFO: Time breakdown: {', '.join(parts)}", file=sys.stderr)
+
+
+def _dataset_dir(args) -> Path:
+    return Path(args.dataset_dir) if args.dataset_dir else Path(args.cache_dir) / 's2-dataset'
+
+
+def ingest_dataset(args):
+    """Build the local dataset index (`--ingest`) from the parsed scholar_crawler.py arguments."""
+    if not NUMPY_AVAILABLE:
+        print("ERROR: numpy is required for the local dataset backend. Install with: pip install numpy", file=sys.stderr)
+        sys.exit(1)
+    try:
+        LocalDataset.build(Path(args.ingest), _dataset_dir(args)).close()
+    except (OSError, ValueError) as e:
+        print(f"ERROR: Failed to build the local dataset index: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def run(args, directives: Iterable[SearchDirective], query_source: str, journal: Optional[CrawlJournal] = None):
+    """
+    Crawl `directives` as configured by the parsed scholar_crawler.py arguments.
+    
+    `directives` is either a list or an iterator still being parsed from the
+    input plans; `journal` is given when resuming an earlier run.
+    """
+    if args.trace:
+        TRACER.enable()
+    if args.profile is not None:
+        PROFILER.enable()
+    
+    dataset_dir = _dataset_dir(args)
+    if args.backend == 'local' and not NUMPY_AVAILABLE:
+        print("ERROR: numpy is required for the local dataset backend. Install with: pip install numpy", file=sys.stderr)
+        sys.exit(1)
+    if not REQUESTS_AVAILABLE and args.backend != 'local':
+        print("ERROR: requests library is required. Install with: pip install requests", file=sys.stderr)
+        sys.exit(1)
+    if args.format != 'csv' and not PYARROW_AVAILABLE:
+        print(f"ERROR: pyarrow is required for --format {args.format}. Install with: pip install pyarrow", file=sys.stderr)
+        sys.exit(1)
+    
+    if not isinstance(directives, list):
+        directives = _staged_iter(directives, 'parse')
+    
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = ResponseCache(Path(args.cache_dir), max_bytes=args.cache_max_mb * 1024 * 1024,
+                                  refresh=args.refresh)
+            print(f"INFO: Response cache enabled at {args.cache_dir}", file=sys.stderr)
+        except Exception as e:
+            print(f"WARNING: Failed to open response cache, continuing without it: {e}", file=sys.stderr)
+    
+    corpus_store = None
+    corpus_db = args.corpus_db
+    if args.no_corpus:
+        if args.offline:
+            print("WARNING: --offline has no effect with --no-corpus", file=sys.stderr)
+    elif corpus_db:
+        try:
+            corpus_store = CorpusStore(Path(corpus_db))
+            print(f"INFO: Local corpus store: {corpus_db} ({corpus_store.count()} papers)", file=sys.stderr)
+        except sqlite3.Error as e:
+            print(f"WARNING: Failed to open local corpus store, continuing without it: {e}", file=sys.stderr)
+    
+    snowball = None
+    if args.depth is not None:
+        snowball = SnowballConfig(depth=max(1, args.depth), direction=args.snowball_direction,
+                                  fanout=args.fanout, level_cap=args.level_cap,
+                                  max_requests=args.snowball_budget)
+    
+    dataset = None
+    if args.backend == 'local':
+        try:
+            dataset = LocalDataset(dataset_dir)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"INFO: Local dataset backend: {dataset_dir} ({dataset.n_docs} papers, "
+              f"{dataset.meta['citations']} citation edges)", file=sys.stderr)
+    elif args.max_results > 50 and not args.bulk and not args.google_only:
+        print("INFO: Relevance search returns at most 50 papers per QUERY; use --bulk to page further",
+              file=sys.stderr)
+    
+    delay_range = None
+    if args.delay_min is not None or args.delay_max is not None:
+        delay_max = args.delay_max if args.delay_max is not None else args.delay_min
+        delay_range = (args.delay_min if args.delay_min is not None else delay_max, delay_max)
+    rate_state = RateLimitState(Path(args.rate_state) if args.rate_state else Path(args.cache_dir) / 'rate_state.json')
+    
+    crawler = ScholarCrawler(delay_range=delay_range, max_retries=args.max_retries,
+                             api_key=args.api_key, cache=cache,
+                             max_citation_pages=args.max_citation_pages,
+                             request_timeout=args.timeout, request_budget=args.request_budget,
+                             pool_size=max(1, args.concurrency, 4 if snowball else 1),
+                             corpus_stats=CorpusStats() if args.global_idf and NUMPY_AVAILABLE else None,
+                             corpus_store=corpus_store, offline=args.offline, snowball=snowball,
+                             api_base=args.api_base, rate_state=rate_state, max_rate=args.max_rate,
+                             speculative_fallback=args.speculative_fallback,
+                             bulk=args.bulk, bulk_cap=args.bulk_cap, dataset=dataset)
+    
+    output_dir = Path(args.output_dir)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if journal is None:
+        # Two runs started in the same second must not share (and silently resume) a journal
+        stem, n = timestamp, 1
+        while (output_dir / f"crawl_run_{timestamp}").exists():
+            n += 1
+            timestamp = f"{stem}_{n}"
+    
+    csv_path = output_dir / f"literature_review_{timestamp}.csv"
+    report_path = output_dir / f"crawler_report_{timestamp}.md"
+    csv_writer = StreamingCsvWriter(csv_path) if args.format == 'csv' else None
+    citation_writers = [
+        StreamingCitationWriter(output_dir / f"references_{timestamp}{CITATION_STYLES[style].suffix}", style)
+        for style in dict.fromkeys(args.citations)
+    ]
+    
+    metrics_json = Path(args.metrics_json) if args.metrics_json else output_dir / f"metrics_{timestamp}.json"
+    metrics_prom = Path(args.metrics_prom) if args.metrics_prom else None
+    reporter = None
+    if args.metrics_interval and args.metrics_interval > 0:
+        reporter = MetricsReporter(METRICS, metrics_json, metrics_prom, args.metrics_interval).start()
+    
+    profile_path = Path(args.profile) if args.profile else output_dir / f"profile_{timestamp}.prof"
+    run_span = TRACER.span('crawl', 'run', source=query_source).__enter__()
+    
+    def finish_run():
+        crawler.close()
+        crawler.save_rate_state()
+        if reporter:
+            reporter.stop()
+        try:
+            METRICS.write(metrics_json, metrics_prom)
+        except OSError as e:
+            print(f"WARNING: Failed to write metrics: {e}", file=sys.stderr)
+        run_span.__exit__(None, None, None)
+        if args.trace:
+            try:
+                TRACER.write(Path(args.trace))
+                print(f"INFO: Trace timeline saved to {args.trace}", file=sys.stderr)
+            except OSError as e:
+                print(f"WARNING: Failed to write trace: {e}", file=sys.stderr)
+        if PROFILER.enabled:
+            try:
+                PROFILER.dump(profile_path)
+            except OSError as e:
+                print(f"WARNING: Failed to write profile: {e}", file=sys.stderr)
+    
+    def collect(papers: List[Paper]):
+        spool.append(papers)
+        if deduplicator:
+            deduplicator.add(papers)
+        if not papers or not (csv_writer or citation_writers):
+            return
+        # Streamed rows are formatted here (Citation_GB and every --citations style), so this is export time
+        with pipeline_stage('export', papers=len(papers)):
+            if csv_writer:
+                csv_writer.write_papers(papers)
+            for writer in citation_writers:
+                writer.write_papers(papers)
+    
+    total = len(directives) if isinstance(directives, list) else None
+    if journal is None:
+        journal = CrawlJournal(output_dir / f"crawl_run_{timestamp}")
+        directives = journal.record_plan(directives, query_source)
+    completed = journal.completed()
+    if completed:
+        print(f"INFO: Resuming run {journal.run_dir}: {len(completed)}/{total} directives already done", file=sys.stderr)
+    else:
+        print(f"INFO: Run journal: {journal.run_dir} (resume with --resume)", file=sys.stderr)
+    
+    # Collected papers live on disk until export; deduplication keeps only their keys in memory
+    spool = PaperSpool(journal.run_dir / 'papers.sqlite3')
+    deduplicator = None if args.no_dedup else PaperDeduplicator(threshold=args.dedup_threshold)
+    
+    def plan_ahead(directives: Iterable[SearchDirective]) -> Iterator[SearchDirective]:
+        # Plan shared requests over a bounded look-ahead window rather than the whole input, so
+        # parsing still streams; directives already in the journal will not run and are not counted
+        directives = iter(directives)
+        start = 1
+        while True:
+            window = list(islice(directives, max(1, args.plan_window)))
+            if not window:
+                return
+            pending = [d for i, d in enumerate(window, start) if CrawlJournal.directive_key(i, d) not in completed]
+            crawler.plan_requests(pending, args.max_results, sort_by=args.sort_by, exact_title=args.exact_title)
+            start += len(window)
+            yield from window
+    
+    if not args.no_coalesce:
+        directives = plan_ahead(directives)
+    
+    directive_count = 0
+    
+    def run_directive(i: int, directive: SearchDirective) -> List[Paper]:
+        key = CrawlJournal.directive_key(i, directive)
+        progress = f"{i}/{total}" if total else str(i)
+        if key in completed:
+            print(f"\nDirective {progress}: {directive} (from journal)", file=sys.stderr)
+            return completed[key]
+        
+        print(f"\nDirective {progress}: {directive}", file=sys.stderr)
+        
+        if directive.directive_type == 'SEED':
+            query_group = f"SEED_{i}: {directive.seed_info[:30]}..."
+        elif directive.directive_type == 'IDS':
+            query_group = f"IDS: {query_source}"
+        else:
+            query_group = f"QUERY_{i}: {directive.raw_query[:30]}..."
+        
+        with DIRECTIVE_SECONDS.time(directive_type=directive.directive_type), \
+                TRACER.span(f'directive {i}', 'directive', directive=str(directive)) as span:
+            with pipeline_stage('fetch'):
+                papers = crawler.execute_directive(
+                    directive, 
+                    args.max_results,
+                    no_fallback=args.no_fallback,
+                    google_only=args.google_only,
+                    sort_by=args.sort_by,
+                    exact_title=args.exact_title
+                )
+            
+            for p in papers:
+                p.query_group = query_group
+                p.sort_method = directive.sort_info or 'default'
+            
+            if directive.directive_type == 'IDS':
+                # Explicitly requested papers are kept as resolved
+                filtered_papers = papers
+            else:
+                with pipeline_stage('score'):
+                    filtered_papers = crawler.filter_and_rank_papers(papers, query_group)
+            span.set(fetched=len(papers), kept=len(filtered_papers))
+        journal.record(i, directive, filtered_papers)
+        return filtered_papers
+    
+    concurrency = max(1, args.concurrency)
+    try:
+        if concurrency > 1:
+            print(f"INFO: Executing directives with concurrency={concurrency} (shared rate limiter)", file=sys.stderr)
+            from concurrent.futures import ThreadPoolExecutor
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+            futures = deque()
+            try:
+                # Submit while the input is still being parsed; collect in plan order
+                # so the CSV layout matches a sequential run
+                for i, directive in enumerate(directives, 1):
+                    directive_count = i
+                    futures.append(executor.submit(TRACER.propagate(run_directive), i, directive))
+                    while futures and futures[0].done():
+                        collect(futures.popleft().result())
+                while futures:
+                    collect(futures.popleft().result())
+            except KeyboardInterrupt:
+                # Queued directives are dropped; running ones stop at their next wait or request attempt
+                CANCEL.set()
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                shutdown_executor(executor, wait=not CANCEL.is_set())
+        else:
+            for i, directive in enumerate(directives, 1):
+                directive_count = i
+                collect(run_directive(i, directive))
+    except KeyboardInterrupt:
+        CANCEL.set()
+        if csv_writer:
+            csv_writer.close()
+        for writer in citation_writers:
+            writer.close()
+        spool.close()
+        finish_run()
+        print(f"\nWARNING: Interrupted. Completed directives are saved; resume with: --resume {journal.run_dir}" if journal
+              else "\nWARNING: Interrupted.", file=sys.stderr)
+        sys.exit(130)
+    
+    if csv_writer:
+        csv_writer.close()
+    for writer in citation_writers:
+        writer.close()
+    
+    collected = len(spool)
+    print(f"\nINFO: Total papers collected: {collected}", file=sys.stderr)
+    
+    kept = collected
+    if deduplicator and collected:
+        with pipeline_stage('dedup', papers=collected):
+            roots = deduplicator.roots()
+            spool.set_roots(roots)
+        kept = sum(1 for i, root in enumerate(roots) if root == i)
+        del roots
+        stats = deduplicator.stats
+        print(f"INFO: Deduplicated {collected} -> {kept} papers "
+              f"(DOI/ID: {stats['doi_or_id']}, title: {stats['title']}, near-duplicate: {stats['near_duplicate']})",
+              file=sys.stderr)
+    
+    def final_papers() -> Iterator[Paper]:
+        # Read back from the spool on every export pass instead of holding the merged list
+        if deduplicator and kept < collected:
+            return deduplicator.merge_groups(spool.groups())
+        return iter(spool)
+    
+    if cache:
+        print(f"INFO: Response cache: {cache.hits} hits, {cache.misses} misses", file=sys.stderr)
+        cache.close()
+    if corpus_store:
+        corpus_store.close()
+    
+    totals = Counter()
+    
+    def tally(papers: Iterator[Paper]) -> Iterator[Paper]:
+        for paper in papers:
+            totals['seed'] += bool(paper.seed_paper)
+            yield paper
+    
+    with pipeline_stage('export', papers=kept):
+        with TRACER.span(args.format, 'export'):
+            if args.format != 'csv':
+                table_path = Path(args.append_to) if args.append_to else output_dir / f"literature_review_{timestamp}.{args.format}"
+                # The Arrow table holds every row anyway
+                csv_file = crawler.generate_columnar(list(final_papers()), table_path, args.format, append=bool(args.append_to))
+            elif csv_writer.rows_written == kept and kept:
+                csv_file = csv_path
+                print(f"INFO: Saved {csv_writer.rows_written} papers to {csv_path}", file=sys.stderr)
+            else:
+                # Deduplication merged rows that were already streamed; rewrite the final table
+                csv_file = crawler.generate_csv(final_papers(), csv_path)
+        citation_files = []
+        for writer in citation_writers:
+            with TRACER.span(writer.style, 'export'):
+                if writer.rows_written == kept and kept:
+                    citation_files.append(writer.path)
+                    print(f"INFO: Saved {writer.rows_written} {writer.style} references to {writer.path}", file=sys.stderr)
+                else:
+                    # Same as the CSV: a fresh formatter also reallocates BibTeX keys
+                    path = crawler.generate_citations(final_papers(), writer.path, writer.style)
+                    if path:
+                        citation_files.append(path)
+        with TRACER.span('report', 'export'):
+            report_file = crawler.generate_report(tally(final_papers()), report_path)
+    spool.close()
+    
+    _print_time_breakdown()
+    finish_run()
+    
+    seed_count = totals['seed']
+    query_count = kept - seed_count
+    
+    print("\n" + "="*60, file=sys.stderr)
+    print("CRAWLER SUMMARY", file=sys.stderr)
+    print("="*60, file=sys.stderr)
+    print(f"Directives processed: {directive_count}", file=sys.stderr)
+    print(f"Total papers collected: {kept}", file=sys.stderr)
+    print(f"  - SEED search results: {seed_count}", file=sys.stderr)
+    print(f"  - QUERY search results: {query_count}", file=sys.stderr)
+    if csv_file:
+        print(f"{ {'csv': 'CSV', 'parquet': 'Parquet', 'arrow': 'Arrow'}[args.format]} output: {csv_file}", file=sys.stderr)
+    for path in citation_files:
+        print(f"References output: {path}", file=sys.stderr)
+    if report_file:
+        print(f"Report output: {report_file}", file=sys.stderr)
+    print(f"Metrics: {metrics_json}" + (f", {metrics_prom}" if metrics_prom else ""), file=sys.stderr)
+    print("="*60, file=sys.stderr)
+
@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Semantic Scholar Graph API, for offline benchmarks.
+
+Serves the endpoints scholar_crawler.py uses from a fixture:
+- GET  /graph/v1/paper/search
+- GET  /graph/v1/paper/search/bulk (continuation-token paging)
+- GET  /graph/v1/paper/{id}
+- GET  /graph/v1/paper/{id}/citations
+- GET  /graph/v1/paper/{id}/references
+- POST /graph/v1/paper/batch
+
+Latency, 429 (with Retry-After) and 5xx responses can be injected with a
+seeded RNG, so a run is reproducible. GET /__stats returns request counts
+per endpoint and status; POST /__reset clears them.
+
+Usage:
+    python mock_s2_server.py --port 8000 --papers 5000 --latency-ms 80 --error-429 0.05
+    python scholar_crawler.py --input search_plan.md --api-base http://127.0.0.1:8000/graph/v1
+    python mock_s2_server.py --papers 50000 --dump-dataset dumps/   # shards for --ingest
+"""
+
+import sys
+import os
+import re
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, unquote, urlparse
+
+API_PREFIX = '/graph/v1/paper'
+BULK_PAGE_SIZE = 1000
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_QUERY_NOISE = {'and', 'or', 'not', 'title'}
+
+_TOPICS = [
+    'physics', 'informed', 'neural', 'networks', 'porous', 'media', 'multiphase', 'flow', 'lattice',
+    'boltzmann', 'surfactant', 'phase', 'field', 'cahn', 'hilliard', 'fractional', 'operator',
+    'learning', 'deep', 'graph', 'transformer', 'attention', 'turbulence', 'reservoir', 'simulation',
+    'uncertainty', 'quantification', 'bayesian', 'inference', 'inverse', 'problems', 'wetting',
+    'capillary', 'pressure', 'darcy', 'upscaling', 'homogenization', 'mesh', 'free', 'solver',
+    'finite', 'element', 'spectral', 'method', 'surrogate', 'model', 'gaussian', 'process',
+]
+_FILLER = ['a', 'an', 'for', 'of', 'in', 'with', 'via', 'on', 'using', 'towards']
+_VENUES = ['Journal of Computational Physics', 'Physical Review E', 'Water Resources Research',
+           'Journal of Fluid Mechanics', 'NeurIPS', 'ICML', 'Computer Methods in Applied Mechanics and Engineering',
+           'Advances in Water Resources', 'SIAM Journal on Scientific Computing', '']
+_SURNAMES = ['Raissi', 'Karniadakis', 'Li', 'Wang', 'Zhang', 'Chen', 'Liu', 'Smith', 'Garcia', 'Müller',
+             'Tartakovsky', 'Lu', 'Perdikaris', 'Brunton', 'Kutz', 'Cai', 'Jin', 'Meng', 'Yang', 'Zhao']
+
+
+def build_synthetic_fixture(num_papers: int = 2000, seed: int = 7, max_references: int = 15) -> Dict:
+    """
+    Generate a deterministic fixture: papers with topical titles/abstracts
+    and a citation graph in which every paper cites earlier ones, biased
+    towards already well-cited papers.
+    """
+    rng = random.Random(seed)
+    papers = []
+    citations: Dict[str, List[str]] = {}
+    in_degree = Counter()
+    # One entry per citation received, so sampling from it favours well-cited papers
+    cited_pool: List[str] = []
+
+    for i in range(num_papers):
+        paper_id = f"{seed:02x}{i:010x}"
+        topic = rng.sample(_TOPICS, rng.randint(3, 6))
+        words = []
+        for word in topic:
+            words.append(word)
+            if rng.random() < 0.3:
+                words.append(rng.choice(_FILLER))
+        title = ' '.join(words).capitalize()
+        abstract = ' '.join(rng.choice(_TOPICS + _FILLER) for _ in range(rng.randint(30, 80)))
+        year = 1995 + int(30 * i / max(num_papers, 1))
+        volume = rng.randint(1, 500)
+        start_page = rng.randint(1, 2000)
+
+        references = []
+        if i:
+            for _ in range(rng.randint(0, max_references)):
+                if cited_pool and rng.random() < 0.5:
+                    cited = rng.choice(cited_pool)
+                else:
+                    cited = papers[rng.randrange(i)]['paperId']
+                if cited not in references:
+                    references.append(cited)
+        for cited in references:
+            citations.setdefault(cited, []).append(paper_id)
+            in_degree[cited] += 1
+            cited_pool.append(cited)
+
+        papers.append({
+            'paperId': paper_id,
+            'title': title,
+            'abstract': abstract if rng.random() < 0.9 else None,
+            'authors': [{'name': f"{rng.choice('ABCDEFGHJKLMNPRSTWXYZ')}. {rng.choice(_SURNAMES)}"}
+                        for _ in range(rng.randint(1, 5))],
+            'year': year,
+            'venue': rng.choice(_VENUES),
+            'url': f"https://www.semanticscholar.org/paper/{paper_id}",
+            'publicationDate': f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'externalIds': {'DOI': f"10.5555/mock.{seed}.{i}"},
+            'journal': {'name': '', 'volume': str(volume), 'pages': f"{start_page}-{start_page + rng.randint(5, 30)}"},
+        })
+
+    for paper in papers:
+        paper['citationCount'] = in_degree[paper['paperId']] * 10 + rng.randint(0, 9)
+
+    return {'papers': papers, 'citations': citations}
+
+
+def load_fixture(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        fixture = json.load(f)
+    fixture.setdefault('citations', {})
+    return fixture
+
+
+def write_dataset_dumps(fixture: Dict, out_dir: str, shard_size: int = 100000) -> Dict[str, int]:
+    """
+    Write the fixture as Semantic Scholar dataset shards (gzipped JSONL in
+    papers/, abstracts/ and citations/), for `scholar_crawler.py --ingest`.
+    Corpus IDs are assigned in fixture order.
+    """
+    corpus_ids = {p['paperId']: i + 1 for i, p in enumerate(fixture['papers'])}
+    rows = {
+        'papers': ({
+            'corpusid': corpus_ids[p['paperId']],
+            'externalids': dict(p.get('externalIds') or {}, CorpusId=str(corpus_ids[p['paperId']])),
+            'url': p.get('url'),
+            'title': p.get('title'),
+            'authors': p.get('authors') or [],
+            'venue': p.get('venue'),
+            'year': p.get('year'),
+            'citationcount': p.get('citationCount'),
+            'publicationdate': p.get('publicationDate'),
+            'journal': p.get('journal'),
+        } for p in fixture['papers']),
+        'abstracts': ({'corpusid': corpus_ids[p['paperId']], 'abstract': p['abstract']}
+                      for p in fixture['papers'] if p.get('abstract')),
+        'citations': ({'citingcorpusid': corpus_ids[citing], 'citedcorpusid': corpus_ids[cited]}
+                      for cited, citing_ids in fixture['citations'].items() if cited in corpus_ids
+                      for citing in citing_ids if citing in corpus_ids),
+    }
+    counts = {}
+    for name, records in rows.items():
+        os.makedirs(os.path.join(out_dir, name), exist_ok=True)
+        counts[name] = 0
+        out = None
+        for record in records:
+            if counts[name] % shard_size == 0:
+                if out:
+                    out.close()
+                out = gzip.open(os.path.join(out_dir, name, f"part-{counts[name] // shard_size:04d}.jsonl.gz"),
+                                'wt', encoding='utf-8')
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            counts[name] += 1
+        if out:
+            out.close()
+    return counts
+
+
+class FixtureIndex:
+    """Lookup tables and a small inverted index over a fixture."""
+
+    def __init__(self, fixture: Dict):
+        self.papers = {p['paperId']: p for p in fixture['papers']}
+        self.by_doi = {}
+        for paper in fixture['papers']:
+            doi = (paper.get('externalIds') or {}).get('DOI')
+            if doi:
+                self.by_doi[doi.lower()] = paper['paperId']
+
+        self.citations = {k: list(v) for k, v in fixture.get('citations', {}).items()}
+        self.references: Dict[str, List[str]] = {}
+        for cited, citing_ids in self.citations.items():
+            for citing in citing_ids:
+                self.references.setdefault(citing, []).append(cited)
+
+        self.postings: Dict[str, List[str]] = {}
+        for paper in fixture['papers']:
+            text = f"{paper.get('title') or ''} {paper.get('abstract') or ''}"
+            for token in set(_WORD_RE.findall(text.lower())):
+                self.postings.setdefault(token, []).append(paper['paperId'])
+
+    def resolve(self, raw_id: str) -> Optional[Dict]:
+        if raw_id.upper().startswith('DOI:'):
+            raw_id = self.by_doi.get(raw_id[4:].lower(), '')
+        return self.papers.get(raw_id)
+
+    def bulk_search(self, query: str, sort: Optional[str] = None) -> List[Dict]:
+        """Unranked matches in paperId order unless sorted, like the bulk endpoint."""
+        query = re.sub(r'(^|\s)[+|-]', ' ', query)
+        matches = sorted(self.search(query), key=lambda p: p['paperId'])
+        if sort:
+            field, _, order = sort.partition(':')
+            # publicationDate is an ISO string, citationCount a number; missing values sort last
+            present = [p for p in matches if p.get(field) is not None]
+            present.sort(key=lambda p: p[field], reverse=(order != 'asc'))
+            matches = present + [p for p in matches if p.get(field) is None]
+        return matches
+
+    def search(self, query: str, sort: Optional[str] = None) -> List[Dict]:
+        tokens = [t for t in _WORD_RE.findall(query.lower()) if t not in _QUERY_NOISE]
+        scores = Counter()
+        for token in tokens:
+            for paper_id in self.postings.get(token, ()):
+                scores[paper_id] += 1
+        ranked = [self.papers[pid] for pid, _ in scores.most_common()]
+        if sort:
+            field, _, order = sort.partition(':')
+            ranked.sort(key=lambda p: p.get(field) or 0, reverse=(order != 'asc'))
+        return ranked
+
+
+def project(paper: Optional[Dict], fields: Optional[str]) -> Optional[Dict]:
+    """Return only the requested fields, like the real API."""
+    if paper is None or not fields:
+        return paper
+    wanted = set(fields.split(','))
+    return {k: v for k, v in paper.items() if k == 'paperId' or k in wanted}
+
+
+class MockS2Handler(BaseHTTPRequestHandler):
+    server_version = 'MockS2/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body, headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _endpoint(self, path: str) -> str:
+        rest = path[len(API_PREFIX):].strip('/')
+        if rest == 'search':
+            return 'search'
+        if rest == 'search/bulk':
+            return 'bulk'
+        if rest == 'batch':
+            return 'batch'
+        if rest.endswith('/citations'):
+            return 'citations'
+        if rest.endswith('/references'):
+            return 'references'
+        return 'paper'
+
+    def _inject(self, endpoint: str) -> bool:
+        """Sleep and maybe answer with an injected error; True when a response was sent."""
+        server = self.server
+        latency, error, retry_after = server.draw_fault()
+        if latency:
+            time.sleep(latency)
+        if error:
+            server.count(endpoint, error)
+            headers = {'Retry-After': f'{retry_after:g}'} if error == 429 else None
+            self._send_json(error, {'message': 'injected error', 'code': error}, headers)
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = dict(parse_qsl(url.query))
+
+        if url.path == '/__stats':
+            self._send_json(200, self.server.snapshot())
+            return
+        if not url.path.startswith(API_PREFIX):
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        endpoint = self._endpoint(url.path)
+        if self._inject(endpoint):
+            return
+
+        index = self.server.index
+        fields = query.get('fields')
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', 100))
+
+        if endpoint == 'search':
+            results = index.search(query.get('query', ''), query.get('sort'))
+            page = results[offset:offset + limit]
+            body = {'total': len(results), 'offset': offset,
+                    'data': [project(p, fields) for p in page]}
+            if offset + limit < len(results):
+                body['next'] = offset + limit
+            status = 200
+        elif endpoint == 'bulk':
+            results = index.bulk_search(query.get('query', ''), query.get('sort'))
+            # Opaque to clients; here simply the offset of the next page
+            start = int(query.get('token') or 0)
+            page = results[start:start + BULK_PAGE_SIZE]
+            body = {'total': len(results), 'data': [project(p, fields) for p in page]}
+            if start + BULK_PAGE_SIZE < len(results):
+                body['token'] = str(start + BULK_PAGE_SIZE)
+            status = 200
+        elif endpoint in ('citations', 'references'):
+            raw_id = unquote(url.path[len(API_PREFIX):].strip('/').rsplit('/', 1)[0])
+            paper = index.resolve(raw_id)
+            if paper is None:
+                status, body = 404, {'error': 'Paper not found'}
+            else:
+                graph = index.citations if endpoint == 'citations' else index.references
+                key = 'citingPaper' if endpoint == 'citations' else 'citedPaper'
+                linked = graph.get(paper['paperId'], [])
+                page = linked[offset:offset + limit]
+                body = {'offset': offset, 'data': [{key: project(index.papers[pid], fields)} for pid in page]}
+                if offset + limit < len(linked):
+                    body['next'] = offset + limit
+                status = 200
+        else:
+            paper = index.resolve(unquote(url.path[len(API_PREFIX):].strip('/')))
+            if paper is None:
+                status, body = 404, {'error': 'Paper not found'}
+            else:
+                status, body = 200, project(paper, fields)
+
+        self.server.count(endpoint, status)
+        self._send_json(status, body)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        if url.path == '/__reset':
+            self.server.reset()
+            self._send_json(200, {'ok': True})
+            return
+        if url.path.rstrip('/') != API_PREFIX + '/batch':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        if self._inject('batch'):
+            return
+
+        try:
+            ids = json.loads(raw or b'{}').get('ids', [])
+        except json.JSONDecodeError:
+            self.server.count('batch', 400)
+            self._send_json(400, {'error': 'Invalid JSON'})
+            return
+
+        fields = dict(parse_qsl(url.query)).get('fields')
+        body = [project(self.server.index.resolve(str(pid)), fields) for pid in ids[:500]]
+        self.server.count('batch', 200)
+        self._send_json(200, body)
+
+
+class MockS2Server(ThreadingHTTPServer):
+    """
+    Threaded mock API server.
+
+    Args:
+        fixture: Fixture dict (see build_synthetic_fixture / load_fixture)
+        port: Port to bind on 127.0.0.1 (0 picks a free port)
+        latency_ms: Mean added latency per request
+        jitter_ms: Uniform jitter around the mean latency
+        error_429: Probability of answering 429 with Retry-After
+        error_5xx: Probability of answering 500/502/503
+        retry_after: Retry-After value in seconds for injected 429s
+        rate_limit: Enforce this many requests/s (burst of one second's worth);
+            excess requests get 429 with the time until the next free slot
+        seed: RNG seed for latency and error injection
+    """
+
+    daemon_threads = True
+
+    def __init__(self, fixture: Dict, port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_429: float = 0.0, error_5xx: float = 0.0, retry_after: float = 1.0,
+                 rate_limit: float = 0.0, seed: int = 0):
+        super().__init__(('127.0.0.1', port), MockS2Handler)
+        self.index = FixtureIndex(fixture)
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self._burst = max(1.0, rate_limit)
+        self._tokens = self._burst
+        self._last = time.monotonic()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/graph/v1"
+
+    def draw_fault(self):
+        with self._lock:
+            latency = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            roll = self._rng.random()
+            error = None
+            retry_after = self.retry_after
+            if roll < self.error_429:
+                error = 429
+            elif roll < self.error_429 + self.error_5xx:
+                error = self._rng.choice((500, 502, 503))
+            elif self.rate_limit > 0:
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._last) * self.rate_limit)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                else:
+                    error = 429
+                    retry_after = round((1.0 - self._tokens) / self.rate_limit, 3)
+        return latency, error, retry_after
+
+    def count(self, endpoint: str, status: int):
+        with self._lock:
+            self._counts[(endpoint, status)] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = dict(self._counts)
+        by_endpoint = Counter()
+        by_status = Counter()
+        for (endpoint, status), n in counts.items():
+            by_endpoint[endpoint] += n
+            by_status[str(status)] += n
+        return {'requests': sum(counts.values()), 'by_endpoint': dict(by_endpoint), 'by_status': dict(by_status)}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+    def start(self) -> 'MockS2Server':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Semantic Scholar Graph API for offline benchmarks")
+    parser.add_argument("--port", type=int, default=8000,
+                       help="Port on 127.0.0.1 (0 picks a free port; the URL is printed on stdout)")
+    parser.add_argument("--fixture", type=str, default=None,
+                       help="Fixture JSON with 'papers' (S2 paper objects) and 'citations' (paperId -> citing paperIds)")
+    parser.add_argument("--papers", type=int, default=2000,
+                       help="Size of the synthetic fixture when --fixture is not given (default: 2000)")
+    parser.add_argument("--seed", type=int, default=7,
+                       help="Seed for the synthetic fixture and for fault injection (default: 7)")
+    parser.add_argument("--dump-fixture", type=str, default=None,
+                       help="Write the synthetic fixture to this path and exit")
+    parser.add_argument("--dump-dataset", type=str, default=None,
+                       help="Write the fixture as dataset shards for scholar_crawler.py --ingest to this directory and exit")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                       help="Mean latency added to every request in ms (default: 0)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0,
+                       help="Uniform latency jitter in ms (default: 0)")
+    parser.add_argument("--error-429", type=float, default=0.0,
+                       help="Probability of an injected 429 response (default: 0)")
+    parser.add_argument("--error-5xx", type=float, default=0.0,
+                       help="Probability of an injected 500/502/503 response (default: 0)")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                       help="Retry-After seconds sent with injected 429s (default: 1)")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                       help="Answer 429 above this many requests/s, like the real API (default: off)")
+
+    args = parser.parse_args()
+
+    if args.fixture:
+        fixture = load_fixture(args.fixture)
+    else:
+        fixture = build_synthetic_fixture(args.papers, seed=args.seed)
+
+    if args.dump_fixture:
+        with open(args.dump_fixture, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, ensure_ascii=False)
+        print(f"INFO: Wrote fixture with {len(fixture['papers'])} papers to {args.dump_fixture}", file=sys.stderr)
+        return
+
+    if args.dump_dataset:
+        counts = write_dataset_dumps(fixture, args.dump_dataset)
+        print(f"INFO: Wrote {counts['papers']} papers, {counts['abstracts']} abstracts and "
+              f"{counts['citations']} citations to {args.dump_dataset}", file=sys.stderr)
+        return
+
+    server = MockS2Server(fixture, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          error_429=args.error_429, error_5xx=args.error_5xx,
+                          retry_after=args.retry_after, rate_limit=args.rate_limit, seed=args.seed)
+    print(server.url, flush=True)
+    print(f"INFO: Mock Semantic Scholar API with {len(fixture['papers'])} papers at {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Search plan parsing for scholar_crawler.py.
+
+Reads SEED/QUERY directives (and legacy backtick lists) from references-searcher
+Markdown plans. Kept free of the crawler's dependencies so that `--test-mode`
+can list a plan without loading the crawler. For the same reason it avoids
+dataclasses, typing and pathlib, which together cost more to import than
+the rest of `--test-mode`; annotations are never evaluated.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+from collections.abc import Iterator
+
+
+# The batch endpoint (POST /paper/batch) accepts at most 500 IDs per request
+IDS_BATCH_SIZE = 500
+
+
+class SearchDirective:
+    FIELDS = ('directive_type', 'raw_query', 'seed_info', 'filter_info', 'sort_info',
+              'line_number', 'source_file', 'source_line')
+    
+    def __init__(self, directive_type: str, raw_query: str, seed_info: str | None = None,
+                 filter_info: str | None = None, sort_info: str | None = None, line_number: int = 0,
+                 source_file: str = '', source_line: int = 0):
+        self.directive_type = directive_type
+        self.raw_query = raw_query
+        self.seed_info = seed_info
+        self.filter_info = filter_info
+        self.sort_info = sort_info
+        self.line_number = line_number
+        self.source_file = source_file
+        self.source_line = source_line
+    
+    def to_dict(self) -> dict:
+        """Field values by name, the inverse of `SearchDirective(**d)`."""
+        return {name: getattr(self, name) for name in self.FIELDS}
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        if self.directive_type == 'IDS':
+            return f"IDS: {len(self.raw_query.split())} paper IDs"
+        if self.directive_type == 'SEED':
+            sort_str = f" | SORT: '{self.sort_info}'" if self.sort_info else ""
+            return f"SEED: '{self.seed_info}' | FILTER: '{self.filter_info}'{sort_str}"
+        else:
+            sort_str = f" | SORT: '{self.sort_info}'" if self.sort_info else ""
+            return f"QUERY: '{self.raw_query}'{sort_str}"
+
+
+_HUMAN_ZONE_MARKER = '# 🧑‍💻 人类最高指令区'
+_SEED_LINE_RE = re.compile(r'(\d+)\.\s*SEED:\s*"([^"]+)"\s*\|\s*FILTER:\s*(.+?)(?:\s*\|\s*SORT:\s*"([^"]+)")?\s*$')
+_QUERY_LINE_RE = re.compile(r'(\d+)\.\s*QUERY:\s*(.+?)(?:\s*\|\s*SORT:\s*"([^"]+)")?\s*$')
+_LEGACY_LINE_RE = re.compile(r'(\d+)\.\s*`([^`]+)`')
+_LEGACY_SEED_RE = re.compile(r'SEED:\s*"([^"]+)"\s*\|\s*FILTER:\s*"([^"]*)"', re.IGNORECASE)
+_LEGACY_QUERY_RE = re.compile(r'QUERY:\s*(.+)', re.IGNORECASE)
+
+
+def normalize_paper_id(raw_id: str) -> str:
+    """Turn a DOI, DOI URL or prefixed identifier into a batch-endpoint paper ID."""
+    paper_id = raw_id.strip()
+    for prefix in ('https://doi.org/', 'http://doi.org/', 'https://dx.doi.org/', 'doi.org/'):
+        if paper_id.lower().startswith(prefix):
+            paper_id = paper_id[len(prefix):]
+            break
+    if paper_id.startswith('10.'):
+        return f"DOI:{paper_id}"
+    return paper_id
+
+
+def iter_directives(paths: list[str | os.PathLike]) -> Iterator[SearchDirective]:
+    """
+    Stream directives from one or more search plans in document order.
+
+    Each file is read line by line and every line is matched once, so
+    parsing is linear in the input size and the first directive is
+    available before the rest of the file has been read. A directive
+    whose type and query already appeared (in the same or an earlier
+    file) is skipped, which keeps the Human Override Zone entry when the
+    plan repeats it below.
+    """
+    seen = set()
+    for path in paths:
+        yield from _iter_file_directives(os.fspath(path), seen)
+
+
+def extract_directives_from_md(md_file: str | os.PathLike) -> list[SearchDirective]:
+    return list(iter_directives([md_file]))
+
+
+def _iter_file_directives(md_file: str, seen: set) -> Iterator[SearchDirective]:
+    counts = {'SEED': 0, 'QUERY': 0}
+    has_directives = False
+    duplicates = 0
+    human_count = 0
+    in_human_zone = False
+    legacy = []
+
+    try:
+        with open(md_file, 'r', encoding='utf-8-sig') as f:
+            for line_no, line in enumerate(f, 1):
+                if in_human_zone and '---' in line:
+                    in_human_zone = False
+                    print(f"INFO: Found {human_count} directives in Human Override Zone", file=sys.stderr)
+                elif _HUMAN_ZONE_MARKER in line:
+                    in_human_zone = True
+
+                directive = _parse_directive_line(line)
+                if directive is None:
+                    # Backtick-quoted lists are only used when the file has no SEED/QUERY lines at all
+                    if not has_directives:
+                        legacy_match = _LEGACY_LINE_RE.search(line)
+                        if legacy_match:
+                            legacy.append((line_no, legacy_match))
+                    continue
+
+                directive.source_file = md_file
+                directive.source_line = line_no
+                has_directives = True
+                key = _dedup_key(directive)
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                counts[directive.directive_type] += 1
+                if in_human_zone:
+                    human_count += 1
+                yield directive
+
+        if not has_directives:
+            for line_no, legacy_match in legacy:
+                directive = _parse_legacy_directive(legacy_match)
+                if directive is None:
+                    continue
+                directive.source_file = md_file
+                directive.source_line = line_no
+                key = _dedup_key(directive)
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                counts[directive.directive_type] += 1
+                yield directive
+
+        print(f"INFO: Extracted {counts['SEED'] + counts['QUERY']} directives from {os.path.basename(md_file)} "
+              f"({counts['SEED']} SEED, {counts['QUERY']} QUERY"
+              f"{f', {duplicates} duplicates skipped' if duplicates else ''})", file=sys.stderr)
+
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"ERROR: Failed to extract directives from {md_file}: {e}", file=sys.stderr)
+
+
+def _dedup_key(directive: SearchDirective) -> str:
+    # SORT is part of the key: variants differing only in SORT are kept, and the
+    # request planner serves them from one search
+    return f"{directive.directive_type}:{directive.raw_query}|{directive.sort_info or ''}"
+
+
+def _parse_directive_line(line: str) -> SearchDirective | None:
+    match = _SEED_LINE_RE.search(line)
+    if match:
+        seed_info = match.group(2).strip()
+        filter_info = match.group(3).strip()
+        sort_info = match.group(4).strip() if match.group(4) else None
+
+        if filter_info.startswith('"') and filter_info.endswith('"') and filter_info.count('"') == 2:
+            filter_info = filter_info[1:-1]
+
+        return SearchDirective(
+            directive_type='SEED',
+            raw_query=f'SEED: "{seed_info}" | FILTER: "{filter_info}"',
+            seed_info=seed_info,
+            filter_info=filter_info,
+            sort_info=sort_info,
+            line_number=int(match.group(1))
+        )
+
+    match = _QUERY_LINE_RE.search(line)
+    if match:
+        query_str = match.group(2).strip()
+        sort_info = match.group(3).strip() if match.group(3) else None
+
+        if query_str.startswith('"') and query_str.endswith('"') and query_str.count('"') == 2:
+            query_str = query_str[1:-1]
+
+        if '在此处添加' in query_str or query_str == '...':
+            return None
+
+        return SearchDirective(
+            directive_type='QUERY',
+            raw_query=query_str,
+            sort_info=sort_info,
+            line_number=int(match.group(1))
+        )
+
+    return None
+
+
+def _parse_legacy_directive(match) -> SearchDirective | None:
+    line_num = int(match.group(1))
+    query_str = match.group(2).strip()
+
+    if '在此处添加' in query_str or query_str == '...':
+        return None
+
+    seed_match = _LEGACY_SEED_RE.match(query_str)
+    if seed_match:
+        return SearchDirective(
+            directive_type='SEED',
+            raw_query=query_str,
+            seed_info=seed_match.group(1),
+            filter_info=seed_match.group(2),
+            line_number=line_num
+        )
+
+    query_match = _LEGACY_QUERY_RE.match(query_str)
+    if query_match:
+        extracted_query = query_match.group(1).strip()
+        if extracted_query.startswith('"') and extracted_query.endswith('"'):
+            extracted_query = extracted_query[1:-1]
+        return SearchDirective(
+            directive_type='QUERY',
+            raw_query=extracted_query,
+            line_number=line_num
+        )
+
+    return SearchDirective(
+        directive_type='QUERY',
+        raw_query=query_str,
+        line_number=line_num
+    )
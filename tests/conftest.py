@@ -0,0 +1,59 @@
+"""
+Shared fixtures for the scholar-crawler tests.
+
+End-to-end tests run scholar_crawler.py in a subprocess against the mock
+Semantic Scholar server (mock_s2_server.py), with HOME pointed at a
+temporary directory so caches and the seed table never touch the user's.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scholar-crawler' / 'scripts'
+CRAWLER = SCRIPTS_DIR / 'scholar_crawler.py'
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from mock_s2_server import MockS2Server, build_synthetic_fixture  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def fixture_data():
+    return build_synthetic_fixture(num_papers=300, seed=7)
+
+
+@pytest.fixture
+def mock_api(fixture_data):
+    server = MockS2Server(fixture_data).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def write_plan(tmp_path):
+    def write(*lines: str, name: str = 'search_plan.md') -> Path:
+        path = tmp_path / name
+        path.write_text('# Search plan\n\n' + '\n'.join(lines) + '\n', encoding='utf-8')
+        return path
+    return write
+
+
+@pytest.fixture
+def run_crawler(tmp_path, mock_api):
+    """Run the crawler CLI against the mock server; returns the CompletedProcess."""
+    home = tmp_path / 'home'
+    home.mkdir()
+    env = dict(os.environ, HOME=str(home), USERPROFILE=str(home))
+    env.pop('SEMANTIC_SCHOLAR_API_KEY', None)
+
+    def run(*args: str, check: bool = True) -> subprocess.CompletedProcess:
+        cmd = [sys.executable, str(CRAWLER), '--api-base', mock_api.url, '--output-dir', str(tmp_path / 'out'),
+               '--no-fallback', '--delay-max', '0', *args]
+        result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', env=env, timeout=120)
+        if check:
+            assert result.returncode == 0, result.stderr
+        return result
+    return run
@@ -0,0 +1,52 @@
+import csv
+
+import pytest
+
+from crawler_core import ScholarCrawler
+
+pytest.importorskip('requests')
+
+
+def _doi(paper):
+    return paper['externalIds']['DOI']
+
+
+def test_batch_lookup_chunks_and_normalizes_ids(mock_api, fixture_data):
+    papers = fixture_data['papers']
+    ids = []
+    for i, paper in enumerate(papers):
+        # Every form the plan may carry: bare paperId, bare, prefixed and URL DOIs
+        ids.append([paper['paperId'], _doi(paper), f'DOI:{_doi(paper).upper()}',
+                    f'https://doi.org/{_doi(paper)}'][i % 4])
+    ids += [f'missing{i}' for i in range(250)] + ['10.9999/unknown']
+
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url)
+    results = crawler.fetch_papers_batch(ids)
+    crawler.close()
+
+    assert mock_api.snapshot()['by_endpoint'] == {'batch': 2}  # 551 IDs: 500 + 51
+    assert len(results) == len(ids)
+    assert [r.paper_id if r else None for r in results[:len(papers)]] == [p['paperId'] for p in papers]
+    assert results[len(papers):] == [None] * 251
+
+
+def test_ids_file_resolves_every_known_id(tmp_path, mock_api, fixture_data, run_crawler):
+    papers = fixture_data['papers']
+    ids_file = tmp_path / 'ids.txt'
+    lines = ['# exported from Zotero', '']
+    lines += [f'https://doi.org/{_doi(p)}' if i % 2 else p['paperId'] for i, p in enumerate(papers)]
+    lines += [f'missing{i}' for i in range(300)]
+    ids_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    result = run_crawler('--ids-file', str(ids_file), '--test-mode')
+    assert 'Batch requests: 2' in result.stdout
+    assert mock_api.snapshot()['requests'] == 0
+
+    result = run_crawler('--ids-file', str(ids_file), '--no-cache')
+    assert mock_api.snapshot()['by_endpoint'] == {'batch': 2}
+    assert f'Resolving {len(papers) + 300} paper IDs' in result.stderr
+    (table,) = (tmp_path / 'out').glob('literature_review_*.csv')
+    with open(table, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(row['DOI'] for row in rows) == sorted(_doi(p) for p in papers)
+    assert {row['Directive_Type'] for row in rows} == {'IDS'}
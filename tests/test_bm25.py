@@ -0,0 +1,82 @@
+import math
+
+import pytest
+
+from crawler_core import BM25Index, BM25Scorer, CorpusStats, Paper, tokenize
+
+pytest.importorskip('numpy')
+
+DOCS = [
+    'physics informed neural networks for porous media flow',
+    'lattice boltzmann simulation of multiphase flow in porous media',
+    'deep learning surrogate model',
+    'porous porous porous media',
+    '',
+]
+
+
+def reference_bm25(documents, query, k1=1.5, b=0.75):
+    """Textbook Okapi BM25 with the non-negative IDF, one document at a time."""
+    docs = [tokenize(d) for d in documents]
+    n = len(docs)
+    avgdl = sum(map(len, docs)) / n
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for term in tokenize(query):
+            df = sum(1 for d in docs if term in d)
+            if not df:
+                continue
+            idf = math.log((n - df + 0.5) / (df + 0.5) + 1.0)
+            tf = doc.count(term)
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avgdl))
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_splits_words_and_cjk_bigrams():
+    assert tokenize('Physics-Informed Neural_Networks') == ('physics', 'informed', 'neural', 'networks')
+    assert tokenize('多孔介质 flow') == ('多孔', '孔介', '介质', 'flow')
+    assert tokenize('相') == ('相',)
+
+
+@pytest.mark.parametrize('query', ['porous media', 'flow', 'porous porous', 'unseen words', 'lattice flow media'])
+def test_index_matches_reference_bm25(query):
+    index = BM25Index([tokenize(d) for d in DOCS])
+    assert index.score(query.split()) == pytest.approx(reference_bm25(DOCS, query))
+
+
+def test_score_many_matches_individual_queries():
+    index = BM25Index([tokenize(d) for d in DOCS])
+    queries = [['porous', 'media'], ['deep', 'learning'], ['nothing'], ['flow']]
+    many = index.score_many(queries)
+    assert many.shape == (len(queries), len(DOCS))
+    for row, keywords in zip(many, queries):
+        assert row == pytest.approx(index.score(keywords))
+
+
+def test_corpus_stats_supply_the_idf():
+    stats = CorpusStats()
+    background = [Paper(title=f'porous media study {i}', paper_id=str(i)) for i in range(20)]
+    stats.add(background)
+    stats.add(background)  # papers are counted once
+    assert stats.doc_count == 20
+
+    candidates = [Paper(title='porous media', paper_id='a'), Paper(title='lattice boltzmann', paper_id='b')]
+    local = BM25Index.from_papers(candidates).score(['porous'])
+    shared = BM25Index.from_papers(candidates, corpus_stats=stats).score(['porous'])
+    # "porous" is in every background paper, so the global IDF is much smaller than the local one
+    assert 0 < shared[0] < local[0]
+    assert shared[1] == local[1] == 0
+
+
+def test_scorer_ranks_mock_search_results(fixture_data):
+    papers = [Paper.from_s2(item) for item in fixture_data['papers'][:200]]
+    BM25Scorer().compute_scores(papers, ['lattice', 'boltzmann'])
+    ranked = sorted(papers, key=lambda p: p.bm25_score, reverse=True)
+
+    matching = [p for p in papers if {'lattice', 'boltzmann'} <= set(tokenize(p.title))]
+    assert matching
+    top = ranked[:len(matching)]
+    assert all('lattice' in tokenize(p.title + ' ' + p.abstract) for p in top)
+    assert ranked[-1].bm25_score == 0.0
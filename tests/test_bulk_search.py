@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+import mock_s2_server
+from crawler_core import ScholarCrawler
+
+pytest.importorskip('requests')
+
+
+@pytest.fixture
+def small_pages(monkeypatch):
+    monkeypatch.setattr(mock_s2_server, 'BULK_PAGE_SIZE', 10)
+    return 10
+
+
+def _bulk_requests(mock_api):
+    return mock_api.snapshot()['by_endpoint'].get('bulk', 0)
+
+
+def test_follows_tokens_until_the_last_page(mock_api, small_pages):
+    expected = [p['paperId'] for p in mock_api.index.bulk_search('flow')]
+    assert len(expected) > 2 * small_pages
+
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url)
+    ids = [item['paperId'] for item in crawler.iter_bulk_search('flow')]
+    crawler.close()
+    assert ids == expected
+    # The last page carries no token, which ends the walk
+    assert _bulk_requests(mock_api) == math.ceil(len(expected) / small_pages)
+
+
+def test_stops_at_the_cap_without_fetching_later_pages(mock_api, small_pages):
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url)
+    items = list(crawler.iter_bulk_search('flow', cap=25))
+    assert len(items) == 25
+    assert _bulk_requests(mock_api) == 3
+
+    mock_api.reset()
+    stream = crawler.iter_bulk_search('flow')
+    next(stream)
+    stream.close()
+    crawler.close()
+    assert _bulk_requests(mock_api) == 1
+
+
+def test_bulk_mode_search_maps_sort_and_cap(mock_api, small_pages):
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url, bulk=True, bulk_cap=15)
+    papers = crawler.search_semantic_scholar('flow', max_results=100, sort_by='citationCount:desc')
+    crawler.close()
+    assert len(papers) == 15
+    citations = [p.citations for p in papers]
+    assert citations == sorted(citations, reverse=True)
+    assert _bulk_requests(mock_api) == 2
+    assert 'search' not in mock_api.snapshot()['by_endpoint']
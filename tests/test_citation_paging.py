@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from crawler_core import ScholarCrawler
+
+pytest.importorskip('requests')
+
+
+def _most_linked(links):
+    paper_id, linked = max(links.items(), key=lambda item: len(item[1]))
+    return paper_id, len(linked)
+
+
+def _requests(mock_api, endpoint):
+    return mock_api.snapshot()['by_endpoint'].get(endpoint, 0)
+
+
+def test_citations_follow_next_until_the_last_page(mock_api):
+    paper_id, total = _most_linked(mock_api.index.citations)
+    assert total > 30
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url)
+    citing = list(crawler.iter_citations(paper_id, page_size=10, max_pages=100))
+    assert len(citing) == len({p['paperId'] for p in citing}) == total
+    assert _requests(mock_api, 'citations') == math.ceil(total / 10)
+
+    # max_pages caps the walk even though more pages remain
+    mock_api.reset()
+    assert len(list(crawler.iter_citations(paper_id, page_size=10, max_pages=2))) == 20
+    assert _requests(mock_api, 'citations') == 2
+    crawler.close()
+
+
+def test_references_page_the_same_way(mock_api):
+    paper_id, total = _most_linked(mock_api.index.references)
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url)
+    cited = list(crawler.iter_references(paper_id, page_size=4, max_pages=100))
+    crawler.close()
+    assert sorted(p['paperId'] for p in cited) == sorted(mock_api.index.references[paper_id])
+    assert _requests(mock_api, 'references') == math.ceil(total / 4)
+
+
+def test_pages_are_fetched_only_as_they_are_consumed(mock_api):
+    paper_id, _ = _most_linked(mock_api.index.citations)
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url)
+    stream = crawler.iter_citations(paper_id, page_size=10, max_pages=100)
+    for _ in range(11):
+        next(stream)
+    stream.close()
+    crawler.close()
+    assert _requests(mock_api, 'citations') == 2
+
+
+def test_seed_search_stops_once_it_has_enough_citing_papers(mock_api):
+    paper_id, total = _most_linked(mock_api.index.citations)
+    paper = mock_api.index.papers[paper_id]
+    seed = f"{paper['authors'][0]['name'].split()[-1]} {paper['year']} {paper['title']}"
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url)
+    papers = crawler.search_by_seed(seed, '', max_results=10)
+    crawler.close()
+    assert papers[0].paper_id == paper_id and papers[0].is_seed_source
+    assert len(papers) == 10  # the seed plus the top 9 citing papers
+    # One 20-citation page covers the 10 wanted, out of the seed's many more
+    assert total > 20
+    assert _requests(mock_api, 'citations') == 1
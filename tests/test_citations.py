@@ -0,0 +1,131 @@
+import csv
+
+import pytest
+
+from crawler_core import CITATION_STYLES, BibTeXFormatter, Paper, StreamingCitationWriter, format_citation_gbt7714
+
+JOURNAL = Paper(title='Physics-informed neural networks',
+                authors=('Maziar Raissi', 'Paris Perdikaris', 'George Em Karniadakis'), year=2019,
+                venue='Journal of Computational Physics', volume='378', pages='686-707',
+                doi='10.1016/j.jcp.2018.10.045')
+CONFERENCE = Paper(title='Deep residual learning for image recognition', authors=('Kaiming He', 'Ludwig van Beethoven'),
+                   year=2016, venue='IEEE Conference on Computer Vision and Pattern Recognition', pages='770-778',
+                   url='https://example.org/x')
+
+
+# The Citation_GB column: family name first, then the initials of the given names
+@pytest.mark.parametrize('paper, expected', [
+    (JOURNAL, 'Raissi M., Perdikaris P., Karniadakis G.E.. Physics-informed neural networks[J]. Journal of Computational '
+              'Physics, 2019, 378, 686-707. https://doi.org/10.1016/j.jcp.2018.10.045'),
+    (Paper(title='深度学习在多孔介质中的应用', authors=('张三', '李四', '王五', '赵六'), year=2021, venue='力学学报',
+           volume='53', issue='2', pages='1-10'),
+     '张三, 李四, 王五, 等. 深度学习在多孔介质中的应用[J]. 力学学报, 2021, 53(2), 1-10'),
+    (Paper(title='Attention is all you need', year=2017, venue='Advances in Neural Information Processing Systems',
+           authors=('Ashish Vaswani', 'Noam Shazeer', 'Niki Parmar', 'Jakob Uszkoreit')),
+     'Vaswani A., Shazeer N., Parmar N., et al. Attention is all you need[J]. '
+     'Advances in Neural Information Processing Systems, 2017'),
+    (Paper(title='Pore-scale modelling of two-phase flow: a PhD thesis', authors=('Ann Lee',), year=2015,
+           venue='Imperial College London'),
+     'Lee A.. Pore-scale modelling of two-phase flow: a PhD thesis[D]. Imperial College London'),
+    (Paper(title='Numerical Recipes', year=2007, venue='Cambridge University Press'),
+     'Numerical Recipes[M]. Cambridge University Press'),
+    (Paper(title='Untitled preprint', year=2020), 'Untitled preprint[J]. 2020'),
+])
+def test_gbt7714(paper, expected):
+    assert format_citation_gbt7714(paper) == expected
+    assert CITATION_STYLES['gbt7714']().format(paper) == expected
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Maziar Raissi', 'Raissi M.'),
+    ('Raissi, Maziar', 'Raissi M.'),
+    ('George Em Karniadakis', 'Karniadakis G.E.'),
+    ('Jean-Pierre  Fouque', 'Fouque J.-P.'),
+    ('Ludwig van Beethoven', 'van Beethoven L.'),
+    ('Plato', 'Plato'),
+    ('张三', '张三'),
+])
+def test_gbt7714_author_is_family_name_then_initials(name, expected):
+    assert CITATION_STYLES['gbt7714'].format_author(name) == expected
+
+
+def test_apa():
+    apa = CITATION_STYLES['apa']()
+    assert apa.format(JOURNAL) == (
+        'Raissi, M., Perdikaris, P., & Karniadakis, G. E. (2019). Physics-informed neural networks. '
+        'Journal of Computational Physics, 378, 686–707. https://doi.org/10.1016/j.jcp.2018.10.045')
+    assert apa.format(CONFERENCE) == (
+        'He, K., & van Beethoven, L. (2016). Deep residual learning for image recognition. '
+        'In IEEE Conference on Computer Vision and Pattern Recognition (pp. 770–778). https://example.org/x')
+
+
+def test_bibtex():
+    bibtex = CITATION_STYLES['bibtex']()
+    assert bibtex.format(JOURNAL) == (
+        '@article{raissi2019physicsinformed,\n'
+        '  author = {Raissi, Maziar and Perdikaris, Paris and Karniadakis, George Em},\n'
+        '  title = {Physics-informed neural networks},\n'
+        '  journal = {Journal of Computational Physics},\n'
+        '  year = {2019},\n'
+        '  volume = {378},\n'
+        '  pages = {686--707},\n'
+        '  doi = {10.1016/j.jcp.2018.10.045},\n'
+        '}\n')
+    assert bibtex.format(CONFERENCE).startswith('@inproceedings{he2016deep,\n')
+
+
+def test_bibtex_keys_are_unique_and_text_is_escaped():
+    bibtex = BibTeXFormatter()
+    paper = Paper(title='Flow & 50% of_things', authors=('A Smith',), year=2020)
+    entries = [bibtex.format(paper) for _ in range(3)]
+    assert [e.split('\n', 1)[0] for e in entries] == [
+        '@article{smith2020flow,', '@article{smith2020flowa,', '@article{smith2020flowb,']
+    assert r'title = {Flow \& 50\% of\_things},' in entries[0]
+    # Keys are per file: a new formatter starts over
+    assert BibTeXFormatter().citation_key(paper) == 'smith2020flow'
+
+
+def test_ris():
+    ris = CITATION_STYLES['ris']()
+    assert ris.format(CONFERENCE) == (
+        'TY  - CPAPER\n'
+        'AU  - He, Kaiming\n'
+        'AU  - van Beethoven, Ludwig\n'
+        'TI  - Deep residual learning for image recognition\n'
+        'T2  - IEEE Conference on Computer Vision and Pattern Recognition\n'
+        'PY  - 2016\n'
+        'SP  - 770\n'
+        'EP  - 778\n'
+        'UR  - https://example.org/x\n'
+        'ER  - \n')
+    assert ris.format(JOURNAL).startswith('TY  - JOUR\n')
+
+
+@pytest.mark.parametrize('style', sorted(CITATION_STYLES))
+def test_streaming_writer(tmp_path, style):
+    path = tmp_path / f'references{CITATION_STYLES[style].suffix}'
+    writer = StreamingCitationWriter(path, style)
+    writer.write_papers([JOURNAL])
+    writer.write_papers([CONFERENCE])
+    writer.close()
+    formatter = CITATION_STYLES[style]()
+    assert path.read_bytes() == formatter.render([JOURNAL, CONFERENCE]).encode('utf-8')
+
+
+def test_every_style_is_exported(tmp_path, mock_api, write_plan, run_crawler):
+    plan = write_plan('1. QUERY: "lattice" AND "boltzmann"')
+    run_crawler('--input', str(plan), '--no-cache', '--citations', *sorted(CITATION_STYLES))
+    out = tmp_path / 'out'
+    (table,) = out.glob('literature_review_*.csv')
+    with open(table, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert rows
+
+    def read(style):
+        (path,) = out.glob(f'references_*{CITATION_STYLES[style].suffix}')
+        return path.read_text(encoding='utf-8')
+
+    assert read('gbt7714').splitlines() == [row['Citation_GB'] for row in rows]
+    assert len(read('apa').splitlines()) == len(rows)
+    assert read('bibtex').count('\n@') + 1 == len(rows)
+    assert read('ris').count('TY  - ') == read('ris').count('ER  - ') == len(rows)
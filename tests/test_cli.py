@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+import crawler_core
+import scholar_crawler
+from conftest import CRAWLER
+
+
+def test_test_mode_does_not_load_the_crawler(write_plan):
+    plan = write_plan('1. QUERY: "porous media"', '2. SEED: "Raissi 2019" | FILTER: "flow"')
+    code = (f"import runpy, sys; sys.argv = ['scholar_crawler.py', '--input', {str(plan)!r}, '--test-mode']; "
+            f"runpy.run_path({str(CRAWLER)!r}, run_name='__main__'); "
+            "print(sorted(m for m in ('crawler_core', 'numpy', 'requests', 'sqlite3') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, encoding='utf-8',
+                            cwd=str(CRAWLER.parent), timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert 'Total: 2 directives' in result.stdout
+    assert result.stdout.splitlines()[-1] == '[]'
+
+
+def test_citation_choices_match_the_formatters():
+    assert scholar_crawler.CITATION_STYLE_NAMES == sorted(crawler_core.CITATION_STYLES)
+
+
+def test_module_still_exposes_the_crawler_api():
+    assert scholar_crawler.ScholarCrawler is crawler_core.ScholarCrawler
+    assert scholar_crawler.ScholarCrawler.BATCH_SIZE == 500
@@ -0,0 +1,64 @@
+import pytest
+
+from crawler_core import CSV_COLUMNS, Paper, papers_to_arrow, write_columnar_table
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def _papers(prefix, n, venue='Journal of Fluid Mechanics'):
+    return [Paper(title=f'{prefix} {i}', authors=('A. Li', 'B. Wang'), year=2000 + i if i else 0,
+                  citations=i * 10, venue=venue, doi=f'10.1/{prefix}{i}', query_group=f'QUERY_1: {prefix}...')
+            for i in range(n)]
+
+
+def _read(path, fmt):
+    if fmt == 'arrow':
+        with pa.memory_map(str(path), 'r') as source:
+            return pa.ipc.open_file(source).read_all()
+    return pq.read_table(path)
+
+
+def test_arrow_table_types():
+    table = papers_to_arrow(_papers('flow', 3))
+    assert table.column_names == CSV_COLUMNS
+    assert table.schema.field('Authors').type == pa.list_(pa.string())
+    assert table.schema.field('Year').type == pa.int16()
+    assert pa.types.is_dictionary(table.schema.field('Venue').type)
+    assert table.column('Year').to_pylist() == [None, 2001, 2002]
+    assert table.column('Authors').to_pylist()[0] == ['A. Li', 'B. Wang']
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_append_keeps_existing_rows(tmp_path, fmt):
+    path = tmp_path / f'literature.{fmt}'
+    assert write_columnar_table(papers_to_arrow(_papers('flow', 3)), path, fmt) == 3
+    # New dictionary values in the appended batch must not clash with the stored ones
+    assert write_columnar_table(papers_to_arrow(_papers('boltzmann', 2, venue='NeurIPS')), path, fmt, append=True) == 5
+
+    table = _read(path, fmt)
+    assert table.column('Title').to_pylist() == ['flow 0', 'flow 1', 'flow 2', 'boltzmann 0', 'boltzmann 1']
+    assert table.column('Venue').to_pylist()[-1] == 'NeurIPS'
+    assert not path.with_name(path.name + '.tmp').exists()
+
+
+def test_append_rejects_a_different_schema(tmp_path):
+    path = tmp_path / 'literature.parquet'
+    pq.write_table(pa.table({'Title': ['x']}), path)
+    with pytest.raises(ValueError):
+        write_columnar_table(papers_to_arrow(_papers('flow', 1)), path, 'parquet', append=True)
+    assert pq.read_table(path).num_rows == 1
+
+
+def test_crawl_appends_to_an_arrow_file(tmp_path, write_plan, run_crawler):
+    target = tmp_path / 'literature.arrow'
+    first = write_plan('1. QUERY: "lattice" AND "boltzmann"', name='first.md')
+    second = write_plan('1. QUERY: "deep" AND "learning"', name='second.md')
+    run_crawler('--input', str(first), '--format', 'arrow', '--append-to', str(target))
+    rows = _read(target, 'arrow').num_rows
+    result = run_crawler('--input', str(second), '--format', 'arrow', '--append-to', str(target))
+
+    table = _read(target, 'arrow')
+    assert rows < table.num_rows
+    assert f"({table.num_rows} rows total)" in result.stderr
+    assert not list((tmp_path / 'out').glob('literature_review_*.csv'))
@@ -0,0 +1,82 @@
+import csv
+
+from crawler_core import CorpusStore, Paper
+
+
+def _paper(title, **kwargs):
+    kwargs.setdefault('abstract', '')
+    return Paper(title=title, authors=('Ann Lee',), year=kwargs.pop('year', 2020), **kwargs)
+
+
+def test_upsert_replaces_a_paper_and_its_index_entry(tmp_path):
+    store = CorpusStore(tmp_path / 'corpus.sqlite3')
+    store.upsert([_paper('Lattice Boltzmann preprint', doi='10.1/LB', citations=1)])
+    store.upsert([_paper('Lattice Boltzmann methods for porous media', doi='10.1/lb', citations=42,
+                         paper_id='s2lb')])
+    assert store.count() == 1
+    (paper,) = store.search('"porous media"', 10)
+    assert (paper.title, paper.citations, paper.paper_id) == ('Lattice Boltzmann methods for porous media', 42, 's2lb')
+    # The old title's text no longer matches
+    assert store.search('preprint', 10) == []
+    store.close()
+
+
+def test_papers_without_a_doi_are_keyed_by_id_then_title(tmp_path):
+    store = CorpusStore(tmp_path / 'corpus.sqlite3')
+    store.upsert([_paper('Phase field fracture', paper_id='a'), _paper('Phase field fracture', paper_id='a'),
+                  _paper('Neural operators'), _paper('Neural  operators!'), _paper('')])
+    assert store.count() == 2
+    store.close()
+
+
+def test_search_supports_the_plan_query_syntax(tmp_path):
+    store = CorpusStore(tmp_path / 'corpus.sqlite3')
+    store.upsert([
+        _paper('Lattice Boltzmann simulation of porous media', citations=5, year=2018),
+        _paper('Lattice Boltzmann turbulence', citations=50, year=2021),
+        _paper('Pore network models', abstract='Flow in porous media', citations=9, year=2015),
+        _paper('深度学习在多孔介质中的应用', citations=3),
+    ])
+
+    def titles(query, sort_by=None):
+        return [p.title for p in store.search(query, 10, sort_by)]
+
+    assert titles('"lattice boltzmann" AND "porous"') == ['Lattice Boltzmann simulation of porous media']
+    assert titles('"lattice boltzmann" NOT porous') == ['Lattice Boltzmann turbulence']
+    assert titles('turbulence OR network', 'citationCount:desc') == ['Lattice Boltzmann turbulence',
+                                                                     'Pore network models']
+    assert titles('porous', 'year:asc') == ['Pore network models', 'Lattice Boltzmann simulation of porous media']
+    assert titles('多孔介质') == ['深度学习在多孔介质中的应用']
+    assert [p.title for p in store.search_title('lattice boltzmann TURBULENCE', 10)] == ['Lattice Boltzmann turbulence']
+    store.close()
+
+
+def test_seed_results_round_trip(tmp_path):
+    store = CorpusStore(tmp_path / 'corpus.sqlite3')
+    seed = _paper('Physics-informed neural networks', doi='10.1/pinn', is_seed_source=True)
+    citing = [_paper(f'Citing paper {i}', doi=f'10.1/c{i}') for i in range(3)]
+    store.upsert([seed] + citing)
+    store.record_seed('Raissi 2019 Physics-informed', [seed] + citing)
+    results = store.seed_results('raissi 2019   physics-informed')
+    assert results[0].title == seed.title and results[0].is_seed_source
+    assert sorted(p.title for p in results[1:]) == [p.title for p in citing]
+    assert not any(p.is_seed_source for p in results[1:])
+    store.close()
+
+
+def test_offline_run_is_answered_from_the_store(tmp_path, mock_api, fixture_data, write_plan, run_crawler):
+    paper = fixture_data['papers'][10]
+    seed = f"{paper['authors'][0]['name'].split()[-1]} {paper['year']} {paper['title']}"
+    plan = write_plan('1. QUERY: "lattice" AND "boltzmann"', f'2. SEED: "{seed}" | FILTER: ""')
+    corpus = tmp_path / 'corpus.sqlite3'
+    run_crawler('--input', str(plan), '--no-cache', '--corpus-db', str(corpus))
+    assert mock_api.snapshot()['requests'] > 0
+
+    mock_api.reset()
+    result = run_crawler('--input', str(plan), '--no-cache', '--corpus-db', str(corpus), '--offline')
+    assert mock_api.snapshot()['requests'] == 0
+    assert result.stderr.count('Local store returned') == 2
+    tables = sorted((tmp_path / 'out').glob('literature_review_*.csv'))
+    with open(tables[-1], encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert {row['Directive_Type'] for row in rows} == {'QUERY', 'SEED'}
@@ -0,0 +1,78 @@
+import csv
+
+import pytest
+
+from crawler_core import CSV_COLUMNS, Paper, StreamingCsvWriter, format_citation_gbt7714
+
+
+def _read(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return list(csv.reader(f))
+
+
+def _papers(n, start=0):
+    return [Paper(title=f'Paper {i}, "quoted"\nacross lines', authors=('A. Li', 'B. Wang'), year=2020,
+                  abstract='x' * 300, doi=f'10.1/{i}', query_group='QUERY_1: porous...')
+            for i in range(start, start + n)]
+
+
+def test_rows_are_readable_before_close(tmp_path):
+    path = tmp_path / 'out.csv'
+    writer = StreamingCsvWriter(path, flush_every=1)
+    writer.write_papers(_papers(2))
+    rows = _read(path)
+    assert rows[0] == CSV_COLUMNS
+    assert len(rows) == 3
+
+    writer.write_papers(_papers(3, start=2))
+    writer.close()
+    rows = _read(path)
+    assert writer.rows_written == 5
+    assert [row[CSV_COLUMNS.index('DOI')] for row in rows[1:]] == [f'10.1/{i}' for i in range(5)]
+    assert path.read_bytes().startswith(b'\xef\xbb\xbf')
+    assert path.read_bytes().count(b'\xef\xbb\xbf') == 1
+
+
+def test_row_layout(tmp_path):
+    path = tmp_path / 'out.csv'
+    writer = StreamingCsvWriter(path)
+    (paper,) = _papers(1)
+    paper.seed_paper = 'Raissi 2019'
+    writer.write_papers([paper])
+    writer.close()
+    row = dict(zip(CSV_COLUMNS, _read(path)[1]))
+    assert row['Title'] == paper.title
+    assert row['Authors'] == 'A. Li; B. Wang'
+    assert row['Directive_Type'] == 'SEED'
+    assert row['Abstract_Summary'] == 'x' * 200 + '...'
+    assert row['Citation_GB'] == format_citation_gbt7714(paper)
+
+
+@pytest.mark.parametrize('authors, expected', [
+    ('A. Li; B. Wang', ('A. Li', 'B. Wang')),
+    ('Ann Lee and Bo Sandberg', ('Ann Lee', 'Bo Sandberg')),
+    ('Ann Lee, Bo Sandberg', ('Ann Lee', 'Bo Sandberg')),
+    ('Raissi, Maziar', ('Raissi, Maziar',)),
+    ('Raissi, Maziar; van Beethoven, Ludwig', ('Raissi, Maziar', 'van Beethoven, Ludwig')),
+    ('Raissi, Maziar and Perdikaris, Paris', ('Raissi, Maziar', 'Perdikaris, Paris')),
+])
+def test_author_strings_are_split_into_names(authors, expected):
+    assert Paper(title='x', authors=authors).authors == expected
+
+
+def test_no_file_without_papers(tmp_path):
+    writer = StreamingCsvWriter(tmp_path / 'out.csv')
+    writer.write_papers([])
+    writer.close()
+    assert not (tmp_path / 'out.csv').exists()
+    assert writer.rows_written == 0
+
+
+def test_crawl_streams_every_collected_paper(tmp_path, write_plan, run_crawler):
+    plan = write_plan('1. QUERY: "lattice" AND "boltzmann"', '2. QUERY: "deep" AND "learning"')
+    result = run_crawler('--input', str(plan), '--no-dedup')
+    (path,) = (tmp_path / 'out').glob('literature_review_*.csv')
+    rows = _read(path)
+    assert rows[0] == CSV_COLUMNS
+    assert len(rows) > 1
+    assert f"Saved {len(rows) - 1} papers to {path}" in result.stderr
@@ -0,0 +1,112 @@
+import csv
+
+import pytest
+
+from crawler_core import NUMPY_AVAILABLE, Paper, PaperDeduplicator, PaperSpool
+
+needs_numpy = pytest.mark.skipif(not NUMPY_AVAILABLE, reason='near-duplicate detection needs numpy')
+
+
+def test_doi_and_paper_id_matches_merge():
+    papers = [
+        Paper(title='Porous media flow', doi='10.1/ABC', query_group='QUERY_1'),
+        Paper(title='Porous media flow (preprint)', doi='10.1/abc', query_group='QUERY_2'),
+        Paper(title='Lattice Boltzmann', paper_id='s2-1', query_group='QUERY_1'),
+        Paper(title='Lattice Boltzmann methods', paper_id='s2-1', query_group='QUERY_3'),
+    ]
+    dedup = PaperDeduplicator()
+    result = dedup.deduplicate(papers)
+    assert [p.title for p in result] == ['Porous media flow', 'Lattice Boltzmann']
+    assert result[0].query_group == 'QUERY_1; QUERY_2'
+    assert result[1].query_group == 'QUERY_1; QUERY_3'
+    assert dedup.stats['doi_or_id'] == 2
+
+
+def test_normalized_title_matches_merge_and_keep_the_published_record():
+    preprint = Paper(title='Deep learning: a review', citations=3, query_group='QUERY_1',
+                     abstract='An abstract.', url='https://arxiv.org/abs/1')
+    published = Paper(title='Deep Learning - A Review', doi='10.1/dl', venue='Nature', citations=40,
+                      year=2015, query_group='QUERY_2')
+    dedup = PaperDeduplicator()
+    (merged,) = dedup.deduplicate([preprint, published])
+    assert dedup.stats['title'] == 1
+    assert (merged.title, merged.doi, merged.venue, merged.year) == ('Deep Learning - A Review', '10.1/dl', 'Nature', 2015)
+    # Missing fields are filled from the other versions
+    assert (merged.abstract, merged.url, merged.citations) == ('An abstract.', 'https://arxiv.org/abs/1', 40)
+    assert merged.query_group == 'QUERY_1; QUERY_2'
+
+
+@needs_numpy
+def test_near_duplicate_titles_merge():
+    papers = [
+        Paper(title='Physics-informed neural networks for multiphase flow in porous media', year=2021),
+        Paper(title='Physics informed neural networks for multiphase flows in porous media', year=2022),
+        Paper(title='Graph transformers for reservoir simulation', year=2021),
+    ]
+    dedup = PaperDeduplicator()
+    result = dedup.deduplicate(papers)
+    assert len(result) == 2
+    assert dedup.stats['near_duplicate'] == 1
+
+
+@needs_numpy
+@pytest.mark.parametrize('first, second', [
+    (Paper(title='Lattice Boltzmann simulation of porous media flow, Part 1', year=2020),
+     Paper(title='Lattice Boltzmann simulation of porous media flow, Part 2', year=2020)),
+    (Paper(title='Physics-informed neural networks for multiphase flow in porous media', year=2010),
+     Paper(title='Physics informed neural networks for multiphase flows in porous media', year=2022)),
+])
+def test_different_numbers_or_distant_years_are_kept_apart(first, second):
+    assert len(PaperDeduplicator().deduplicate([first, second])) == 2
+
+
+def test_result_keeps_first_seen_order():
+    papers = [Paper(title=t, doi=d) for t, d in (('C paper', '10.1/c'), ('A paper', '10.1/a'),
+                                                  ('C again', '10.1/c'), ('B paper', '10.1/b'))]
+    assert [p.doi for p in PaperDeduplicator().deduplicate(papers)] == ['10.1/c', '10.1/a', '10.1/b']
+
+
+@needs_numpy
+def test_streamed_batches_match_a_single_pass(tmp_path):
+    papers = [Paper(title=t, doi=d, year=2020, query_group=g) for t, d, g in (
+        ('Lattice Boltzmann methods for porous media flow', '10.1/a', 'QUERY_1'),
+        ('Phase field fracture', '10.1/b', 'QUERY_1'),
+        ('Lattice Boltzmann method for porous media flows', '', 'QUERY_2'),
+        ('Phase field fracture', '10.1/c', 'QUERY_2'),
+        ('Neural operators', '10.1/b', 'QUERY_3'),
+    )]
+    expected = [(p.doi, p.query_group) for p in PaperDeduplicator().deduplicate([Paper.from_dict(p.to_dict())
+                                                                                  for p in papers])]
+
+    spool = PaperSpool(tmp_path / 'papers.sqlite3')
+    dedup = PaperDeduplicator()
+    for batch in (papers[:2], papers[2:4], papers[4:]):
+        spool.append(batch)
+        dedup.add(batch)
+    spool.set_roots(dedup.roots())
+    assert [(p.doi, p.query_group) for p in dedup.merge_groups(spool.groups())] == expected
+    assert [p.title for p in spool] == [p.title for p in papers]
+    spool.close()
+    assert not (tmp_path / 'papers.sqlite3').exists()
+
+
+def test_overlapping_directives_are_deduplicated(tmp_path, write_plan, run_crawler):
+    # Both queries match papers on porous media flow
+    plan = write_plan('1. QUERY: "porous" AND "media"', '2. QUERY: "porous" AND "flow"')
+
+    def rows(*args):
+        for path in (tmp_path / 'out').glob('literature_review_*.csv'):
+            path.unlink()
+        result = run_crawler('--input', str(plan), '--max-results', '50', *args)
+        (path,) = (tmp_path / 'out').glob('literature_review_*.csv')
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            return list(csv.DictReader(f)), result.stderr
+
+    raw, _ = rows('--no-dedup')
+    deduped, stderr = rows()
+    dois = [row['DOI'] for row in deduped]
+    assert len(dois) == len(set(dois)) == len({row['DOI'] for row in raw}) < len(raw)
+    assert f"Deduplicated {len(raw)} -> {len(deduped)} papers" in stderr
+    assert any('; ' in row['Query_Group'] for row in deduped)
+    # The scratch spool is gone once the run has exported
+    assert not list((tmp_path / 'out').glob('crawl_run_*/papers.sqlite3'))
@@ -0,0 +1,118 @@
+import time
+
+import pytest
+
+import crawler_core
+from crawler_core import METRICS, ScholarCrawler
+
+pytest.importorskip('requests')
+
+
+class FakeSearch:
+    """A scholarly search iterator: the first page loads with the search, later ones on demand, ten per page."""
+
+    def __init__(self, query, total, loads):
+        self._pubs = [{'bib': {'title': f'{query} result {i}', 'author': ['Ann Lee'], 'pub_year': '2020'},
+                       'num_citations': i} for i in range(total)]
+        self._rows = []
+        self._pos = 0
+        self._loads = loads
+        self._load_page()
+
+    def _load_page(self):
+        page = self._pubs[len(self._rows):len(self._rows) + 10]
+        if page:
+            self._loads.append(len(self._rows) // 10 + 1)
+            self._rows.extend(page)
+
+    def __next__(self):
+        if self._pos >= len(self._rows):
+            self._load_page()
+            if self._pos >= len(self._rows):
+                raise StopIteration
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+
+class FakeScholarly:
+    def __init__(self, total=30):
+        self.total = total
+        self.queries = []
+        self.page_loads = []
+
+    def set_timeout(self, timeout):
+        pass
+
+    def set_retries(self, retries):
+        pass
+
+    def search_pubs(self, query):
+        self.queries.append(query)
+        return FakeSearch(query, self.total, self.page_loads)
+
+
+@pytest.fixture
+def scholarly(monkeypatch):
+    fake = FakeScholarly()
+    monkeypatch.setattr(crawler_core, 'scholarly', fake)
+    monkeypatch.setattr(crawler_core, 'SCHOLARLY_AVAILABLE', True)
+    return fake
+
+
+@pytest.fixture
+def pauses(monkeypatch):
+    taken = []
+
+    def pause(cancel):
+        taken.append(cancel)
+        return not (cancel is not None and cancel.is_set())
+    monkeypatch.setattr(ScholarCrawler, '_gs_pause', staticmethod(pause))
+    return taken
+
+
+def _speculative(outcome):
+    return METRICS.total('scholar_google_scholar_speculative_total', outcome=outcome)
+
+
+def test_pauses_before_each_result_page(scholarly, pauses):
+    crawler = ScholarCrawler(delay_range=(0, 0))
+    papers = crawler.search_google_scholar('porous media', max_results=25)
+    crawler.close()
+    assert len(papers) == 25 and papers[0].source == 'Google Scholar'
+    # One pause before the search, then one per further page, none between items of a page
+    assert scholarly.page_loads == [1, 2, 3]
+    assert len(pauses) == 3
+
+
+def test_speculative_query_is_cancelled_when_semantic_scholar_answers(scholarly, mock_api):
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url, speculative_fallback=True)
+    cancelled = _speculative('cancelled')
+    start = time.monotonic()
+    papers = crawler.search_with_fallback('lattice boltzmann', max_results=10)
+    crawler.close()
+    assert papers and all(p.source != 'Google Scholar' for p in papers)
+    # Cancelling wakes the speculative query from its 5-10 s pause before anything is sent
+    assert time.monotonic() - start < 3
+    assert scholarly.queries == []
+    assert _speculative('cancelled') == cancelled + 1
+
+
+def test_speculative_query_fills_in_when_semantic_scholar_falls_short(scholarly, pauses, mock_api):
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url, speculative_fallback=True)
+    used = _speculative('used')
+    papers = crawler.search_with_fallback('zzqx nonexistent', max_results=10)
+    crawler.close()
+    assert scholarly.queries == ['zzqx nonexistent']
+    assert [p.source for p in papers] == ['Google Scholar'] * 10
+    assert _speculative('used') == used + 1
+
+
+def test_close_stops_a_waiting_speculative_query(scholarly):
+    crawler = ScholarCrawler(delay_range=(0, 0))
+    future, _ = crawler._start_speculative_gs('porous media', 10)
+    time.sleep(0.1)  # now inside its 5-10 s up-front pause
+    start = time.monotonic()
+    crawler.close()
+    assert future.result(timeout=3) == []
+    assert time.monotonic() - start < 3
+    assert scholarly.queries == []
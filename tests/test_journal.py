@@ -0,0 +1,92 @@
+import csv
+import json
+import shutil
+from datetime import datetime, timedelta
+
+from crawler_core import CrawlJournal, Paper
+from search_plan import SearchDirective
+
+PLAN = (
+    '1. QUERY: "porous" AND "media"',
+    '2. QUERY: "lattice" AND "boltzmann"',
+    '3. QUERY: "neural" AND "operator"',
+)
+
+
+def _directives():
+    return [SearchDirective(directive_type='QUERY', raw_query=q, line_number=i)
+            for i, q in enumerate(('porous media', 'lattice boltzmann'), 1)]
+
+
+def _csv_dois(out_dir):
+    (path,) = out_dir.glob('literature_review_*.csv')
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return sorted(row['DOI'] for row in csv.DictReader(f))
+
+
+def test_plan_round_trip(tmp_path):
+    journal = CrawlJournal(tmp_path / 'run')
+    directives = _directives()
+    assert list(journal.record_plan(iter(directives), 'plan.md')) == directives
+
+    loaded, source = CrawlJournal(tmp_path / 'run').load_plan()
+    assert loaded == directives
+    assert source == 'plan.md'
+
+
+def test_completed_ignores_torn_final_line(tmp_path):
+    journal = CrawlJournal(tmp_path / 'run')
+    first, second = _directives()
+    journal.record(1, first, [Paper(title='Porous media flow', doi='10.1/a', authors=('A. Li',), year=2020)])
+    with open(journal.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"key": "2:QUERY:lattice')  # crash mid-write
+
+    reopened = CrawlJournal(tmp_path / 'run')
+    reopened.record(2, second, [])
+    done = reopened.completed()
+    assert set(done) == {CrawlJournal.directive_key(1, first), CrawlJournal.directive_key(2, second)}
+    (paper,) = done[CrawlJournal.directive_key(1, first)]
+    assert (paper.title, paper.doi, paper.authors, paper.year) == ('Porous media flow', '10.1/a', ('A. Li',), 2020)
+
+
+def test_resume_skips_completed_directives(tmp_path, mock_api, write_plan, run_crawler):
+    plan = write_plan(*PLAN)
+    run_crawler('--input', str(plan), '--no-cache')
+    (run_dir,) = (tmp_path / 'out').glob('crawl_run_*')
+    entries = (run_dir / 'journal.jsonl').read_text(encoding='utf-8').splitlines()
+    assert len(entries) == 3
+    first_requests = mock_api.snapshot()['requests']
+    expected = _csv_dois(tmp_path / 'out')
+    assert expected
+
+    # Simulate a crash after the first directive
+    (run_dir / 'journal.jsonl').write_text(entries[0] + '\n', encoding='utf-8')
+    for path in (tmp_path / 'out').glob('literature_review_*.csv'):
+        path.unlink()
+    mock_api.reset()
+
+    result = run_crawler('--resume', str(run_dir), '--no-cache')
+    assert '1/3 directives already done' in result.stderr
+    assert result.stderr.count('(from journal)') == 1
+    assert 0 < mock_api.snapshot()['requests'] < first_requests
+    assert _csv_dois(tmp_path / 'out') == expected
+    assert len((run_dir / 'journal.jsonl').read_text(encoding='utf-8').splitlines()) == 3
+    assert json.loads(entries[0])['key'].startswith('1:QUERY:')
+
+
+def test_fresh_run_never_adopts_an_existing_journal(tmp_path, mock_api, write_plan, run_crawler):
+    plan = write_plan(*PLAN)
+    run_crawler('--input', str(plan), '--no-cache')
+    (run_dir,) = (tmp_path / 'out').glob('crawl_run_*')
+    # Occupy the run directories of the next few seconds, as a run started in the same second would
+    now = datetime.now()
+    for offset in range(10):
+        target = tmp_path / 'out' / f"crawl_run_{(now + timedelta(seconds=offset)):%Y%m%d_%H%M%S}"
+        if target != run_dir:
+            shutil.copytree(run_dir, target)
+    mock_api.reset()
+
+    result = run_crawler('--input', str(plan), '--no-cache')
+    assert 'from journal' not in result.stderr
+    assert mock_api.snapshot()['requests'] > 0
+    assert len(list((tmp_path / 'out').glob('crawl_run_*_2'))) == 1
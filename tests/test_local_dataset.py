@@ -0,0 +1,106 @@
+import csv
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from crawler_core import LocalDataset, tokenize  # noqa: E402
+from mock_s2_server import write_dataset_dumps  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def dumps(tmp_path_factory, fixture_data):
+    dump_dir = tmp_path_factory.mktemp('dumps')
+    write_dataset_dumps(fixture_data, str(dump_dir), shard_size=120)
+    return dump_dir
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory, dumps):
+    # Tiny runs so the build goes through the multi-run merge
+    ds = LocalDataset.build(dumps, tmp_path_factory.mktemp('dataset'), run_size=2000)
+    yield ds
+    ds.close()
+
+
+def _text(record):
+    return set(tokenize(f"{record.get('title') or ''} {record.get('abstract') or ''}"))
+
+
+def test_lookup_by_any_identifier(dataset, fixture_data):
+    paper = fixture_data['papers'][10]
+    ordinal = dataset.ordinal(paper['paperId'])
+    assert ordinal is not None
+    assert dataset.ordinal('DOI:' + paper['externalIds']['DOI'].upper()) == ordinal
+    assert dataset.ordinal('https://doi.org/' + paper['externalIds']['DOI']) == ordinal
+    assert dataset.ordinal('CorpusId:11') == ordinal
+    assert dataset.ordinal('0' * 40) is None
+
+    record = dataset.record(ordinal)
+    assert (record['paperId'], record['title'], record['abstract']) == (
+        paper['paperId'], paper['title'], paper['abstract'])
+
+
+def test_citation_graph_matches_the_dumps(dataset, fixture_data):
+    paper_id, citing = next((k, v) for k, v in fixture_data['citations'].items() if len(v) > 5)
+    linked = list(dataset.iter_linked(paper_id, 'forward', limit=1000))
+    assert {r['paperId'] for r in linked} == set(citing)
+    counts = [r['citationCount'] for r in linked]
+    assert counts == sorted(counts, reverse=True)
+    assert len(list(dataset.iter_linked(paper_id, 'forward', limit=3))) == 3
+
+    assert any(paper_id == r['paperId'] for r in dataset.iter_linked(citing[0], 'backward', limit=1000))
+
+
+def test_search_evaluates_boolean_queries(dataset):
+    both = dataset.search('"lattice" AND "boltzmann"', limit=1000)
+    assert both and all({'lattice', 'boltzmann'} <= _text(r) for r in both)
+
+    either = dataset.search('lattice OR boltzmann', limit=1000)
+    assert len(either) >= len(both)
+    assert all(_text(r) & {'lattice', 'boltzmann'} for r in either)
+
+    without = dataset.search('lattice NOT boltzmann', limit=1000)
+    assert all('lattice' in _text(r) and 'boltzmann' not in _text(r) for r in without)
+    assert len(without) + len(both) == len(dataset.search('lattice', limit=1000))
+
+
+def test_search_ranks_and_sorts(dataset):
+    ranked = dataset.search('lattice boltzmann', limit=5)
+    assert len(ranked) <= 5
+    ordinals = np.asarray([dataset.ordinal(r['paperId']) for r in ranked])
+    scores = dataset.bm25(ordinals, ['lattice', 'boltzmann'])
+    assert list(scores) == sorted(scores, reverse=True)
+
+    by_year = dataset.search('lattice', limit=1000, sort_by='year:desc')
+    years = [r['year'] for r in by_year]
+    assert years == sorted(years, reverse=True)
+
+
+def test_external_sort_matches_a_single_run(tmp_path, dumps, dataset):
+    # Runs far smaller than the corpus, with boundaries inside terms' postings and papers' edge lists
+    merged = LocalDataset.build(dumps, tmp_path / 'merged', run_size=97)
+    single = LocalDataset.build(dumps, tmp_path / 'single', run_size=10 ** 9)
+    assert len(merged.postings) > 10 * 97 and merged.meta['citations'] > 10 * 97
+    for name in LocalDataset.ARRAYS:
+        assert np.array_equal(getattr(merged, name), getattr(single, name)), name
+    assert not list((tmp_path / 'merged').glob('tmp*'))
+    merged.close()
+    single.close()
+
+
+def test_missing_index_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError, match='--ingest'):
+        LocalDataset(tmp_path)
+
+
+def test_local_backend_runs_without_the_api(tmp_path, dumps, mock_api, write_plan, run_crawler):
+    plan = write_plan('1. QUERY: "lattice" AND "boltzmann"')
+    dataset_dir = tmp_path / 'dataset'
+    run_crawler('--ingest', str(dumps), '--dataset-dir', str(dataset_dir), '--backend', 'local',
+                '--input', str(plan), '--no-cache')
+    assert mock_api.snapshot()['requests'] == 0
+    (path,) = (tmp_path / 'out').glob('literature_review_*.csv')
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        titles = [row['Title'] for row in csv.DictReader(f)]
+    assert titles
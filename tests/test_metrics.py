@@ -0,0 +1,56 @@
+import json
+
+from crawler_core import MetricsRegistry
+
+
+def test_counters_and_histograms():
+    registry = MetricsRegistry()
+    responses = registry.counter('http_responses_total', 'Responses', ('endpoint', 'status'))
+    responses.inc(endpoint='search', status=200)
+    responses.inc(2, endpoint='search', status=429)
+    latency = registry.histogram('http_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1.0))
+    latency.observe(0.05, endpoint='search')
+    latency.observe(0.5, endpoint='search')
+    latency.observe(5.0, endpoint='search')
+
+    assert registry.total('http_responses_total') == 3
+    assert registry.total('http_responses_total', status=429) == 2
+    assert registry.total('http_seconds', endpoint='search') == 5.55
+
+    (series,) = registry.to_dict()['metrics']['http_seconds']['series']
+    assert (series['count'], series['buckets']) == (3, {'0.1': 1, '1.0': 2})
+
+
+def test_prometheus_exposition():
+    registry = MetricsRegistry()
+    registry.counter('cache_total', 'Cache lookups', ('result',)).inc(result='hit "quoted"')
+    registry.histogram('wait_seconds', 'Wait', buckets=(1.0,)).observe(2.0)
+    assert registry.to_prometheus().splitlines() == [
+        '# HELP cache_total Cache lookups',
+        '# TYPE cache_total counter',
+        'cache_total{result="hit \\"quoted\\""} 1',
+        '# HELP wait_seconds Wait',
+        '# TYPE wait_seconds histogram',
+        'wait_seconds_bucket{le="1"} 0',
+        'wait_seconds_bucket{le="+Inf"} 1',
+        'wait_seconds_sum 2',
+        'wait_seconds_count 1',
+    ]
+
+
+def test_run_writes_the_summary(tmp_path, mock_api, write_plan, run_crawler):
+    plan = write_plan('1. QUERY: "lattice" AND "boltzmann"', '2. QUERY: "porous" AND "media"')
+    run_crawler('--input', str(plan), '--no-cache', '--metrics-json', str(tmp_path / 'metrics.json'),
+                '--metrics-prom', str(tmp_path / 'metrics.prom'))
+    metrics = json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8'))['metrics']
+
+    responses = {(s['labels']['endpoint'], s['labels']['status']): s['value']
+                 for s in metrics['scholar_http_responses_total']['series']}
+    assert responses == {('search', '200'): mock_api.snapshot()['requests']}
+    (directives,) = metrics['scholar_directive_seconds']['series']
+    assert (directives['labels'], directives['count']) == ({'directive_type': 'QUERY'}, 2)
+    stages = {s['labels']['stage'] for s in metrics['scholar_stage_seconds']['series']}
+    assert {'fetch', 'score', 'export'} <= stages
+
+    prom = (tmp_path / 'metrics.prom').read_text(encoding='utf-8')
+    assert 'scholar_http_responses_total{endpoint="search",status="200"} 2' in prom
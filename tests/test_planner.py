@@ -0,0 +1,115 @@
+import pytest
+
+from crawler_core import ScholarCrawler, SnowballConfig
+from search_plan import SearchDirective
+
+pytest.importorskip('requests')
+
+
+def _seed(seed, filter_info, sort=None):
+    return SearchDirective('SEED', f'SEED: "{seed}" | FILTER: "{filter_info}"', seed_info=seed,
+                           filter_info=filter_info, sort_info=sort)
+
+
+def test_plan_groups_shared_work():
+    crawler = ScholarCrawler(delay_range=(0, 0))
+    directives = [
+        _seed('Raissi 2019 Physics-informed', 'porous'),
+        _seed('raissi (2019) physics informed', 'flow', sort='recency'),
+        _seed('Karniadakis 2021', 'flow'),
+        SearchDirective('QUERY', 'Lattice  Boltzmann'),
+        SearchDirective('QUERY', 'lattice boltzmann', sort_info='citation'),
+        SearchDirective('QUERY', 'phase field'),
+        SearchDirective('IDS', 'a b c'),
+    ]
+    plan = crawler.plan_requests(directives, max_results=10)
+    assert {(kind, work.directives) for (kind, _), work in plan.items()} == {('seed', 2), ('query', 2)}
+    (query,) = [work for (kind, _), work in plan.items() if kind == 'query']
+    assert query.limit == 20
+    assert query.sorts == {None, 'citationCount:desc'}
+    crawler.close()
+
+
+def test_differing_sorts_are_shared_only_when_reproducible_locally():
+    crawler = ScholarCrawler(delay_range=(0, 0))
+    directives = [SearchDirective('QUERY', 'flow'), SearchDirective('QUERY', 'flow', sort_info='citation')]
+    (work,) = crawler.plan_requests(directives, sort_by='year:asc').values()
+    assert work.sorts == {'year:asc', 'citationCount:desc'}
+    assert crawler.plan_requests(directives, sort_by='relevance') == {}
+    crawler.close()
+
+
+def test_shared_work_is_released_after_the_last_claim(mock_api):
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url)
+    directives = [SearchDirective('QUERY', 'lattice boltzmann'),
+                  SearchDirective('QUERY', 'lattice boltzmann', sort_info='recency')]
+    (work,) = crawler.plan_requests(directives).values()
+    first, second = (crawler.execute_directive(d) for d in directives)
+    assert mock_api.snapshot()['by_endpoint'] == {'search': 1}
+    assert sorted(p.paper_id for p in first) == sorted(p.paper_id for p in second)
+    years = [p.year for p in second]
+    assert years == sorted(years, reverse=True)
+    assert work.future is None and work.unclaimed == 0
+    assert crawler._planned == {}
+    crawler.close()
+
+
+def test_snowballed_seeds_are_not_planned():
+    crawler = ScholarCrawler(delay_range=(0, 0), snowball=SnowballConfig(depth=2))
+    assert crawler.plan_requests([_seed('Raissi 2019', 'porous'), _seed('Raissi 2019', 'flow')]) == {}
+    crawler.close()
+
+
+def test_coalescing_saves_requests(tmp_path, mock_api, fixture_data, write_plan, run_crawler):
+    paper = fixture_data['papers'][10]
+    seed = f"{paper['authors'][0]['name'].split()[-1]} {paper['year']} {paper['title']}"
+    plan = write_plan(
+        f'1. SEED: "{seed}" | FILTER: "porous"',
+        f'2. SEED: "{seed}" | FILTER: "flow" | SORT: "recency"',
+        '3. QUERY: "lattice" AND "boltzmann"',
+        '4. QUERY: "lattice" AND "boltzmann" | SORT: "citation"',
+    )
+
+    def requests(*args):
+        mock_api.reset()
+        result = run_crawler('--input', str(plan), '--no-cache', '--no-dedup', *args)
+        return mock_api.snapshot()['by_endpoint'], result.stderr
+
+    coalesced, stderr = requests()
+    assert '4 directives share 1 seed(s) and 1 query(ies)' in stderr
+    separate, _ = requests('--no-coalesce')
+    assert coalesced['search'] == 2 and separate['search'] == 4
+    assert coalesced['citations'] < separate['citations']
+
+
+def test_plan_window_bounds_the_look_ahead(mock_api, fixture_data, write_plan, run_crawler):
+    paper = fixture_data['papers'][10]
+    seed = f"{paper['authors'][0]['name'].split()[-1]} {paper['year']} {paper['title']}"
+    plan = write_plan(
+        f'1. SEED: "{seed}" | FILTER: "porous"',
+        f'2. SEED: "{seed}" | FILTER: "flow" | SORT: "recency"',
+        '3. QUERY: "lattice" AND "boltzmann"',
+        '4. QUERY: "lattice" AND "boltzmann" | SORT: "citation"',
+        '5. QUERY: "lattice" AND "boltzmann" | SORT: "recency"',
+    )
+    result = run_crawler('--input', str(plan), '--no-cache', '--no-dedup', '--plan-window', '2')
+    # Each window is planned on its own: the seed pair, the query pair, then a lone query
+    assert '2 directives share 1 seed(s) and 0 query(ies)' in result.stderr
+    assert '2 directives share 0 seed(s) and 1 query(ies)' in result.stderr
+    assert result.stderr.count('Request plan') == 2
+
+
+def test_resume_plans_only_pending_directives(tmp_path, mock_api, write_plan, run_crawler):
+    plan = write_plan('1. QUERY: "lattice" AND "boltzmann"',
+                      '2. QUERY: "lattice" AND "boltzmann" | SORT: "citation"',
+                      '3. QUERY: "porous" AND "media"')
+    assert '2 directives share' in run_crawler('--input', str(plan), '--no-cache').stderr
+    (run_dir,) = (tmp_path / 'out').glob('crawl_run_*')
+    journal = run_dir / 'journal.jsonl'
+    journal.write_text(journal.read_text(encoding='utf-8').splitlines()[0] + '\n', encoding='utf-8')
+
+    mock_api.reset()
+    result = run_crawler('--resume', str(run_dir), '--no-cache')
+    # Directive 1 is done, so directive 2 has nothing to share with
+    assert 'Request plan' not in result.stderr
+    assert mock_api.snapshot()['by_endpoint'] == {'search': 2}
@@ -0,0 +1,190 @@
+import threading
+import time
+
+import pytest
+
+from crawler_core import AdaptiveRateLimiter, CANCEL, CrawlCancelled, RateLimitState, TokenBucketRateLimiter
+
+
+def test_bucket_paces_requests():
+    limiter = TokenBucketRateLimiter(rate=50.0, capacity=1.0)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    # The first token is available immediately, the other five at 1/50 s intervals
+    assert time.monotonic() - start >= 5 / 50 - 0.01
+
+
+def test_bucket_is_shared_across_threads():
+    limiter = TokenBucketRateLimiter(rate=100.0, capacity=1.0)
+    grants = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(5):
+            limiter.acquire()
+            with lock:
+                grants.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    grants.sort()
+    assert len(grants) == 20
+    assert grants[-1] - grants[0] >= 19 / 100 - 0.01
+
+
+def test_window_caps_requests_on_top_of_the_rate():
+    # A fast per-second rate, but only 5 requests per 0.5 s window (10/s once the burst is spent)
+    limiter = TokenBucketRateLimiter(rate=1000.0, capacity=1.0, window=(5, 0.5))
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
+    # The window refills one request per 0.1 s from the first grant, however long the burst took
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.19
+
+
+def test_window_is_shared_across_threads():
+    limiter = TokenBucketRateLimiter(rate=1000.0, capacity=1.0, window=(4, 0.4))
+    grants = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(3):
+            limiter.acquire()
+            with lock:
+                grants.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    grants.sort()
+    # The 4-request window drains at once; the other 8 grants wait for it to refill at 10/s
+    assert grants[3] - grants[0] < 0.05
+    assert grants[-1] - grants[0] >= 8 / 10 - 0.01
+
+
+def test_public_api_requests_pass_the_window():
+    from crawler_core import S2_WINDOW_REQUESTS, S2_WINDOW_SECONDS, ScholarCrawler
+
+    window = (S2_WINDOW_REQUESTS, S2_WINDOW_SECONDS)
+    for kwargs in ({}, {'delay_range': (1.0, 1.1)}, {'api_key': 'secret-key'}):
+        crawler = ScholarCrawler(**kwargs)
+        assert crawler.rate_limiter.window == window
+        crawler.close()
+    # Mock servers and mirrors are not bound by the public quota
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base='http://127.0.0.1:1')
+    assert crawler.rate_limiter.window is None
+    crawler.close()
+
+
+def test_retry_after_pauses_every_caller():
+    limiter = TokenBucketRateLimiter(rate=1000.0, capacity=1.0)
+    limiter.acquire()
+    limiter.feedback(429, retry_after=0.15)
+    assert limiter.acquire() >= 0.1
+
+
+def test_cancel_interrupts_a_waiting_acquire():
+    limiter = TokenBucketRateLimiter(rate=0.2, capacity=1.0)
+    limiter.acquire()
+    timer = threading.Timer(0.1, CANCEL.set)
+    timer.start()
+    start = time.monotonic()
+    try:
+        with pytest.raises(CrawlCancelled):
+            limiter.acquire()  # the next token is five seconds away
+    finally:
+        timer.join()
+        CANCEL.clear()
+    assert time.monotonic() - start < 2
+
+
+def test_cancel_interrupts_a_retry_wait(fixture_data):
+    pytest.importorskip('requests')
+    from crawler_core import HttpTransport
+    from mock_s2_server import MockS2Server
+
+    # Retry-After overrides the jittered backoff, so the first retry waits a full five seconds
+    server = MockS2Server(fixture_data, error_429=1.0, retry_after=5.0).start()
+    transport = HttpTransport(max_retries=3)
+    timer = threading.Timer(0.3, CANCEL.set)
+    timer.start()
+    start = time.monotonic()
+    try:
+        with pytest.raises(CrawlCancelled):
+            transport.request('GET', server.url + '/paper/search', params={'query': 'flow'})
+    finally:
+        timer.join()
+        CANCEL.clear()
+        server.stop()
+    assert time.monotonic() - start < 3
+
+
+def test_adaptive_limiter_follows_aimd():
+    limiter = AdaptiveRateLimiter(rate=1.0, min_rate=0.5, max_rate=4.0, increase=0.1, decrease=0.5, slow_start=0.5)
+    limiter.feedback(200)
+    limiter.feedback(200)
+    assert limiter.rate == pytest.approx(2.0)  # slow start takes larger, still additive, steps
+    limiter.feedback(429)
+    assert limiter.rate == pytest.approx(1.0)
+    # 429s already in flight when the rate was cut do not cut it again
+    limiter.feedback(429)
+    assert limiter.rate == pytest.approx(1.0)
+    # After the first throttling signal growth is additive
+    limiter.feedback(200)
+    assert limiter.rate == pytest.approx(1.1)
+    for _ in range(100):
+        limiter.feedback(200)
+    assert limiter.rate == pytest.approx(4.0)
+
+
+def test_adaptive_limiter_respects_the_floor():
+    limiter = AdaptiveRateLimiter(rate=10.0, min_rate=0.5, max_rate=1.0)
+    assert limiter.rate == 1.0
+    for _ in range(5):
+        limiter._last_cut = 0.0
+        limiter.feedback(429)
+    assert limiter.rate == 0.5
+    limiter.feedback(500)
+    assert limiter.rate == 0.5
+
+
+def test_learned_rates_persist_per_tier(tmp_path):
+    path = tmp_path / 'rate_state.json'
+    keyed = RateLimitState.tier_key('https://api.example/graph/v1', 'secret-key')
+    anonymous = RateLimitState.tier_key('https://api.example/graph/v1', '')
+    assert 'secret-key' not in keyed and keyed != anonymous
+
+    RateLimitState(path).save(keyed, 3.25)
+    state = RateLimitState(path)
+    assert state.load(keyed) == 3.25
+    assert state.load(anonymous) is None
+
+    state._entries[keyed]['updated'] -= RateLimitState.MAX_AGE + 1
+    assert state.load(keyed) is None
+
+
+def test_tiers_stay_within_the_documented_budget(capsys):
+    from crawler_core import S2_KEYED_RPS, S2_WINDOW_REQUESTS, S2_WINDOW_SECONDS, ScholarCrawler
+
+    budgets = {'anonymous': S2_WINDOW_REQUESTS / S2_WINDOW_SECONDS, 'api_key': S2_KEYED_RPS}
+    for tier, (start, min_rate, max_rate) in ScholarCrawler.RATE_TIERS.items():
+        assert min_rate < start < max_rate <= budgets[tier]
+
+    crawler = ScholarCrawler(api_key='secret-key')
+    limiter = crawler.rate_limiter
+    for _ in range(100):
+        limiter.feedback(200)
+    crawler.close()
+    assert limiter.rate == S2_KEYED_RPS
+    err = capsys.readouterr().err
+    assert 'starting at 0.50 requests/s' in err and 'ceiling 1.00/s' in err and 'at most 1.00/s' in err
@@ -0,0 +1,93 @@
+import json
+import zlib
+
+import pytest
+
+import crawler_core
+from crawler_core import ResponseCache
+
+URL = 'https://api.example/graph/v1/paper/search'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(crawler_core.time, 'time', lambda: now[0])
+    return now
+
+
+def _size(data):
+    return len(zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8')))
+
+
+def test_key_ignores_param_and_field_order(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.set('search', URL, {'query': 'flow', 'fields': 'title,year'}, {'data': [1]})
+    assert cache.get('search', URL, {'fields': 'year, title', 'query': 'flow'}) == {'data': [1]}
+    assert cache.get('search', URL, {'query': 'flow', 'fields': 'title'}) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_entries_expire_after_their_endpoint_ttl(tmp_path, clock):
+    cache = ResponseCache(tmp_path, ttls={'search': 60})
+    cache.set('search', URL, {'query': 'flow'}, {'data': []})
+    cache.set('paper', URL + '/x', None, {'paperId': 'x'})
+    clock[0] += 60
+    assert cache.get('search', URL, {'query': 'flow'}) == {'data': []}
+    clock[0] += 1
+    assert cache.get('search', URL, {'query': 'flow'}) is None
+    # Paper details keep the 30-day default
+    assert cache.get('paper', URL + '/x', None) == {'paperId': 'x'}
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, clock):
+    payload = {'data': ['x' * 200]}
+    cache = ResponseCache(tmp_path, max_bytes=2 * _size(payload))
+    for query in ('a', 'b'):
+        clock[0] += 1
+        cache.set('search', URL, {'query': query}, payload)
+    clock[0] += 1
+    assert cache.get('search', URL, {'query': 'a'}) == payload  # now b is the least recently used
+
+    clock[0] += 1
+    cache.set('search', URL, {'query': 'c'}, payload)
+    assert cache.get('search', URL, {'query': 'b'}) is None
+    assert cache.get('search', URL, {'query': 'a'}) == payload
+    assert cache.get('search', URL, {'query': 'c'}) == payload
+    cache.close()
+
+
+def test_store_stays_under_the_size_cap(tmp_path, clock):
+    max_bytes = 4096
+    cache = ResponseCache(tmp_path, max_bytes=max_bytes)
+    for i in range(200):
+        clock[0] += 1
+        cache.set('search', URL, {'query': str(i)}, {'data': [f'{i}-{j}' for j in range(20)]})
+        assert cache._total_bytes <= max_bytes
+    stored = cache._conn.execute('SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses').fetchone()
+    assert stored[0] == cache._total_bytes and 0 < stored[1] < 200
+    assert cache.get('search', URL, {'query': '199'}) is not None
+    cache.close()
+
+    # The running total is rebuilt from the store on reopen
+    assert ResponseCache(tmp_path, max_bytes=max_bytes)._total_bytes == stored[0]
+
+
+def test_refresh_skips_reads_but_still_writes(tmp_path):
+    ResponseCache(tmp_path).set('search', URL, {'query': 'flow'}, {'data': ['old']})
+    cache = ResponseCache(tmp_path, refresh=True)
+    assert cache.get('search', URL, {'query': 'flow'}) is None
+    cache.set('search', URL, {'query': 'flow'}, {'data': ['new']})
+    cache.close()
+    assert ResponseCache(tmp_path).get('search', URL, {'query': 'flow'}) == {'data': ['new']}
+
+
+def test_repeated_run_is_served_from_the_cache(mock_api, write_plan, run_crawler):
+    plan = write_plan('1. QUERY: "lattice" AND "boltzmann"', '2. QUERY: "porous" AND "media"')
+    run_crawler('--input', str(plan))
+    assert mock_api.snapshot()['requests'] == 2
+    mock_api.reset()
+    run_crawler('--input', str(plan))
+    assert mock_api.snapshot()['requests'] == 0
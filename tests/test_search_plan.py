@@ -0,0 +1,114 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import CRAWLER
+from search_plan import SearchDirective, extract_directives_from_md, iter_directives, normalize_paper_id
+
+
+def _summary(directives):
+    return [(d.directive_type, d.raw_query, d.seed_info, d.filter_info, d.sort_info, d.line_number)
+            for d in directives]
+
+
+def test_seed_and_query_lines(write_plan):
+    plan = write_plan(
+        '1. SEED: "Raissi 2019 Physics-informed neural networks" | FILTER: "porous media" | SORT: "citationCount:desc"',
+        '2. SEED: "Karniadakis 2021" | FILTER: multiphase AND flow',
+        '3. QUERY: "lattice boltzmann" AND surfactant',
+        '4. QUERY: "phase field" | SORT: "year:desc"',
+        '5. QUERY: "在此处添加检索式"',
+        '6. QUERY: ...',
+        'Some prose mentioning QUERY: without a number',
+    )
+    assert _summary(extract_directives_from_md(plan)) == [
+        ('SEED', 'SEED: "Raissi 2019 Physics-informed neural networks" | FILTER: "porous media"',
+         'Raissi 2019 Physics-informed neural networks', 'porous media', 'citationCount:desc', 1),
+        ('SEED', 'SEED: "Karniadakis 2021" | FILTER: "multiphase AND flow"',
+         'Karniadakis 2021', 'multiphase AND flow', None, 2),
+        ('QUERY', '"lattice boltzmann" AND surfactant', None, None, None, 3),
+        ('QUERY', 'phase field', None, None, 'year:desc', 4),
+    ]
+
+
+def test_legacy_backtick_lists_only_without_directive_lines(write_plan):
+    legacy = write_plan(
+        '1. `SEED: "Raissi 2019" | FILTER: "porous"`',
+        '2. `QUERY: "deep learning"`',
+        '3. `plain keywords`',
+        name='legacy.md',
+    )
+    assert _summary(extract_directives_from_md(legacy)) == [
+        ('SEED', 'SEED: "Raissi 2019" | FILTER: "porous"', 'Raissi 2019', 'porous', None, 1),
+        ('QUERY', 'deep learning', None, None, None, 2),
+        ('QUERY', 'plain keywords', None, None, None, 3),
+    ]
+
+    mixed = write_plan('1. `ignored backticks`', '2. QUERY: "kept"', name='mixed.md')
+    assert [d.raw_query for d in extract_directives_from_md(mixed)] == ['kept']
+
+
+def test_duplicates_across_files_keep_the_first(tmp_path, write_plan):
+    first = write_plan(
+        '# 🧑‍💻 人类最高指令区',
+        '1. QUERY: "porous media"',
+        '---',
+        '2. QUERY: "porous media"',
+        '3. QUERY: "porous media" | SORT: "year:desc"',
+        name='first.md',
+    )
+    second = write_plan('1. QUERY: "porous media"', '2. QUERY: "wetting"', name='second.md')
+    directives = list(iter_directives([first, second]))
+    assert [(d.raw_query, d.sort_info) for d in directives] == [
+        ('porous media', None), ('porous media', 'year:desc'), ('wetting', None)]
+    assert [(d.source_file, d.source_line) for d in directives] == [
+        (str(first), 4), (str(first), 7), (str(second), 4)]
+
+
+def test_parsing_is_lazy(tmp_path, capsys):
+    plan = tmp_path / 'plan.md'
+    plan.write_text('1. QUERY: "first"\n', encoding='utf-8')
+    directives = iter_directives([plan, tmp_path / 'missing.md'])
+    assert next(directives).raw_query == 'first'
+    # The second input is not opened until the first one is used up
+    assert 'missing.md' not in capsys.readouterr().err
+    assert list(directives) == []
+    assert 'missing.md' in capsys.readouterr().err
+
+
+def test_bom_and_missing_files(tmp_path, capsys):
+    plan = tmp_path / 'bom.md'
+    plan.write_bytes('1. QUERY: "with bom"\n'.encode('utf-8-sig'))
+    assert [d.raw_query for d in extract_directives_from_md(plan)] == ['with bom']
+    assert extract_directives_from_md(tmp_path / 'missing.md') == []
+    assert 'Failed to extract directives' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('10.1016/j.jcp.2018.10.045', 'DOI:10.1016/j.jcp.2018.10.045'),
+    ('https://doi.org/10.1016/j.jcp.2018.10.045', 'DOI:10.1016/j.jcp.2018.10.045'),
+    ('  ARXIV:1711.10561 ', 'ARXIV:1711.10561'),
+    ('649def34f8be52c8b66281af98ae884c09aef38b', '649def34f8be52c8b66281af98ae884c09aef38b'),
+])
+def test_normalize_paper_id(raw, expected):
+    assert normalize_paper_id(raw) == expected
+
+
+def test_repr():
+    assert repr(SearchDirective('QUERY', 'flow', sort_info='year:desc')) == "QUERY: 'flow' | SORT: 'year:desc'"
+    assert repr(SearchDirective('IDS', 'a b c')) == 'IDS: 3 paper IDs'
+
+
+def test_test_mode_expands_globs(tmp_path):
+    drafts = tmp_path / 'drafts'
+    drafts.mkdir()
+    (drafts / 'a.md').write_text('1. QUERY: "alpha"\n', encoding='utf-8')
+    (drafts / 'b.md').write_text('1. QUERY: "beta"\n2. QUERY: "alpha"\n', encoding='utf-8')
+    result = subprocess.run([sys.executable, str(CRAWLER), '--input', str(drafts / '*.md'), '--test-mode'],
+                            capture_output=True, text=True, encoding='utf-8', timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert "1. QUERY: 'alpha'  [a.md:1]" in result.stdout
+    assert "1. QUERY: 'beta'  [b.md:1]" in result.stdout
+    assert 'Total: 2 directives' in result.stdout
+    assert '1 duplicates skipped' in result.stderr
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from crawler_core import ResponseCache, ScholarCrawler
+
+pytest.importorskip('requests')
+
+
+def test_seed_key_ignores_case_and_punctuation_but_not_order():
+    key = ResponseCache.seed_key('Raissi 2019 "Physics-informed neural networks"', 'https://a')
+    assert key == ResponseCache.seed_key('raissi (2019) physics informed, NEURAL networks', 'https://a')
+    assert key != ResponseCache.seed_key('physics informed neural networks Raissi 2019', 'https://a')
+    # Repeated words are kept too
+    assert key != ResponseCache.seed_key('Raissi Raissi 2019 Physics-informed neural networks', 'https://a')
+    assert key != ResponseCache.seed_key('Raissi 2019 Physics-informed neural networks', 'https://b')
+    assert key != ResponseCache.seed_key('Raissi 2020 Physics-informed neural networks', 'https://a')
+
+
+def test_seed_round_trip_and_expiry(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.set_seed('Raissi 2019 PINN', 'abc', 87, {'title': 'PINN'}, 'https://a')
+    assert cache.get_seed('raissi (2019) pinn', 'https://a') == ('abc', 87, {'title': 'PINN'})
+    assert cache.get_seed('raissi 2019 pinn', 'https://b') is None
+    assert cache.get_seed('pinn raissi 2019', 'https://a') is None
+    cache.close()
+
+    assert ResponseCache(tmp_path, refresh=True).get_seed('Raissi 2019 PINN', 'https://a') is None
+    expired = ResponseCache(tmp_path, ttls={'seed': 0})
+    time.sleep(0.01)
+    assert expired.get_seed('Raissi 2019 PINN', 'https://a') is None
+
+
+def test_seed_resolution_is_reused_across_runs(tmp_path, mock_api, fixture_data):
+    paper = fixture_data['papers'][42]
+    surname = paper['authors'][0]['name'].split()[-1]
+    seed = f"{surname} {paper['year']} {paper['title']}"
+
+    def resolve(seed_info):
+        cache = ResponseCache(tmp_path / 'cache')
+        crawler = ScholarCrawler(delay_range=(0, 0), cache=cache, api_base=mock_api.url)
+        try:
+            return crawler._resolve_seed(seed_info, 'flow', None)
+        finally:
+            crawler.close()
+            cache.close()
+
+    paper_id, seed_paper = resolve(seed)
+    assert paper_id and seed_paper.is_seed_source
+    assert mock_api.snapshot()['by_endpoint'] == {'search': 1, 'paper': 1}
+
+    # A differently written seed string is a different search URL, but the same seed
+    mock_api.reset()
+    reworded = f'"{seed.upper()}"'
+    reused_id, reused_paper = resolve(reworded)
+    assert (reused_id, reused_paper.title) == (paper_id, seed_paper.title)
+    assert mock_api.snapshot()['requests'] == 0
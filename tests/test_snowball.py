@@ -0,0 +1,83 @@
+import pytest
+
+from crawler_core import ScholarCrawler, SnowballConfig
+
+pytest.importorskip('requests')
+
+
+def _seed_string(paper):
+    return f"{paper['authors'][0]['name'].split()[-1]} {paper['year']} {paper['title']}"
+
+
+def _expected_bfs(index, seed_id, depth, level_cap):
+    """Reference forward BFS over the mock graph: the papers each level adds, visited once."""
+    visited = {seed_id}
+    frontier = [seed_id]
+    levels = []
+    for _ in range(depth):
+        new = []
+        for node in frontier:
+            for citing in index.citations.get(node, []):
+                if citing not in visited:
+                    visited.add(citing)
+                    new.append(citing)
+        if not new:
+            break
+        levels.append(new)
+        frontier = sorted(new, key=lambda pid: -index.papers[pid]['citationCount'])[:level_cap]
+    return levels
+
+
+def _snowball(mock_api, seed_id, **config):
+    config.setdefault('max_requests', 100)
+    crawler = ScholarCrawler(delay_range=(0, 0), api_base=mock_api.url,
+                             snowball=SnowballConfig(fanout=1000, **config))
+    papers = crawler.snowball_from_seed(_seed_string(mock_api.index.papers[seed_id]), '', max_results=10000)
+    crawler.close()
+    return papers
+
+
+def _seed_with_shared_citers(index):
+    """The most-cited paper whose level-2 citers overlap papers already visited."""
+    for seed_id in sorted(index.citations, key=lambda pid: -len(index.citations[pid])):
+        level1 = set(index.citations[seed_id])
+        frontier = sorted(level1, key=lambda pid: -index.papers[pid]['citationCount'])[:3]
+        if any(citing in level1 for node in frontier for citing in index.citations.get(node, [])):
+            return seed_id
+    pytest.skip('fixture graph has no overlapping citation levels')
+
+
+def test_depth_limits_the_expansion(mock_api):
+    index = mock_api.index
+    seed_id = _seed_with_shared_citers(index)
+    level1, level2 = _expected_bfs(index, seed_id, depth=2, level_cap=3)[:2]
+
+    papers = _snowball(mock_api, seed_id, depth=1, direction='forward', level_cap=3)
+    assert papers[0].paper_id == seed_id and papers[0].is_seed_source
+    assert sorted(p.paper_id for p in papers[1:]) == sorted(level1)
+    assert mock_api.snapshot()['by_endpoint']['citations'] == 1
+
+    mock_api.reset()
+    papers = _snowball(mock_api, seed_id, depth=2, direction='forward', level_cap=3)
+    assert sorted(p.paper_id for p in papers[1:]) == sorted(level1 + level2)
+    # The seed page plus one page per frontier paper
+    assert mock_api.snapshot()['by_endpoint']['citations'] == 4
+    assert {p.source for p in papers[1:]} == {'Semantic Scholar (SNOWBALL L1 forward)',
+                                              'Semantic Scholar (SNOWBALL L2 forward)'}
+
+
+def test_papers_reached_twice_are_kept_once(mock_api):
+    index = mock_api.index
+    seed_id = _seed_with_shared_citers(index)
+    papers = _snowball(mock_api, seed_id, depth=3, direction='both', level_cap=5)
+    ids = [p.paper_id for p in papers]
+    assert len(ids) == len(set(ids))
+    # Level 1 papers cited again at level 2 keep their level 1 source
+    level1 = set(index.citations[seed_id])
+    assert all(p.source.startswith('Semantic Scholar (SNOWBALL L1') for p in papers if p.paper_id in level1)
+
+
+def test_request_budget_stops_the_expansion(mock_api):
+    seed_id = _seed_with_shared_citers(mock_api.index)
+    _snowball(mock_api, seed_id, depth=3, direction='forward', level_cap=3, max_requests=2)
+    assert mock_api.snapshot()['by_endpoint']['citations'] == 2
@@ -0,0 +1,34 @@
+import json
+import pstats
+
+
+def test_trace_and_profile(tmp_path, mock_api, write_plan, run_crawler):
+    plan = write_plan('1. QUERY: "lattice" AND "boltzmann"', '2. QUERY: "porous" AND "media"')
+    run_crawler('--input', str(plan), '--no-cache', '--concurrency', '2',
+                '--trace', str(tmp_path / 'trace.json'), '--profile', str(tmp_path / 'run.prof'))
+
+    trace = json.loads((tmp_path / 'trace.json').read_text(encoding='utf-8'))
+    events = trace['traceEvents']
+    spans = [e for e in events if e['ph'] == 'X']
+    assert all(e['dur'] >= 0 and {'pid', 'tid', 'ts'} <= e.keys() for e in spans)
+    assert {'process_name', 'thread_name'} <= {e['name'] for e in events if e['ph'] == 'M'}
+
+    by_id = {e['args']['span_id']: e for e in spans}
+    names = [e['name'] for e in spans]
+    assert names.count('crawl') == 1
+    assert {'directive 1', 'directive 2', 'fetch', 'score', 'export'} <= set(names)
+
+    def ancestors(event):
+        while 'parent_id' in event['args']:
+            event = by_id[event['args']['parent_id']]
+            yield event['name']
+
+    # Requests run on worker threads but still nest under their directive and the run
+    requests = [e for e in spans if e['name'] == 'GET search']
+    assert len(requests) == mock_api.snapshot()['requests'] == 2
+    for request in requests:
+        chain = list(ancestors(request))
+        assert chain[-1] == 'crawl' and any(name.startswith('directive ') for name in chain)
+
+    stats = pstats.Stats(str(tmp_path / 'run.prof'))
+    assert stats.total_calls > 0
@@ -0,0 +1,87 @@
+import pytest
+
+import crawler_core
+from crawler_core import METRICS, HttpTransport
+from mock_s2_server import MockS2Server
+
+requests = pytest.importorskip('requests')
+
+
+@pytest.fixture
+def faulty_api(fixture_data):
+    servers = []
+
+    def start(**faults):
+        server = MockS2Server(fixture_data, **faults).start()
+        servers.append(server)
+        return server
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    taken = []
+    monkeypatch.setattr(crawler_core, '_cancellable_sleep', taken.append)
+    return taken
+
+
+def _search(transport, server, query='flow'):
+    return transport.request('GET', server.url + '/paper/search', endpoint='search', params={'query': query})
+
+
+def test_5xx_is_retried_with_jittered_exponential_backoff(faulty_api, sleeps):
+    server = faulty_api(error_5xx=1.0)
+    transport = HttpTransport(max_retries=3, backoff_base=0.5)
+    response = _search(transport, server)
+    assert response.status_code in (500, 502, 503)
+    assert server.snapshot()['requests'] == 4
+    # Full jitter: attempt n sleeps uniformly in [0, base * 2**n]
+    assert len(sleeps) == 3
+    assert all(0 <= wait <= 0.5 * 2 ** n for n, wait in enumerate(sleeps))
+
+
+def test_retry_after_overrides_the_backoff(faulty_api, sleeps):
+    server = faulty_api(error_429=1.0, retry_after=7)
+    feedback = []
+    transport = HttpTransport(max_retries=2, on_response=lambda *args: feedback.append(args))
+    assert _search(transport, server).status_code == 429
+    assert sleeps == [7.0, 7.0]
+    assert feedback == [(429, 7.0)] * 3
+
+
+def test_seeded_faults_are_retried_until_every_request_succeeds(faulty_api, sleeps):
+    server = faulty_api(error_429=0.15, error_5xx=0.15, retry_after=0, seed=3)
+    transport = HttpTransport(max_retries=8, backoff_base=0.01)
+    retries = METRICS.total('scholar_http_retries_total')
+    statuses = [_search(transport, server, f'flow {i}').status_code for i in range(40)]
+
+    assert statuses == [200] * 40
+    counts = server.snapshot()['by_status']
+    failures = sum(n for status, n in counts.items() if status != '200')
+    assert counts['200'] == 40 and failures > 0
+    # Every failed attempt was followed by exactly one retry
+    assert len(sleeps) == failures
+    assert METRICS.total('scholar_http_retries_total') - retries == failures
+
+
+def test_other_errors_are_not_retried(mock_api, sleeps):
+    transport = HttpTransport(max_retries=3)
+    response = transport.request('GET', mock_api.url + '/paper/unknown', endpoint='paper')
+    assert response.status_code == 404
+    assert mock_api.snapshot()['requests'] == 1 and sleeps == []
+
+
+def test_a_wait_beyond_the_budget_ends_the_request(faulty_api, sleeps):
+    server = faulty_api(error_429=1.0, retry_after=30)
+    transport = HttpTransport(max_retries=5, total_timeout=10)
+    assert _search(transport, server).status_code == 429
+    assert server.snapshot()['requests'] == 1 and sleeps == []
+
+
+def test_connection_errors_raise_once_retries_are_spent(sleeps):
+    transport = HttpTransport(max_retries=2, backoff_base=0.01, connect_timeout=1)
+    with pytest.raises(requests.ConnectionError):
+        transport.request('GET', 'http://127.0.0.1:9/graph/v1/paper/search')
+    assert len(sleeps) == 2